@@ -1,10 +1,38 @@
 from __future__ import annotations
+import copy
 from enum import auto
-from typing import Optional
+from typing import Optional, TYPE_CHECKING
 
 from base_enum import BaseEnum
+from elements import EffectivenessCalculator
+from monster_base import MonsterBase
 from team import MonsterTeam
 
+if TYPE_CHECKING:
+    from battle_cache import BattleCache
+    from replay import BattleRecorder
+
+
+# Bump when a change to the battle rules changes the result of any battle, so cached results are not reused.
+ENGINE_VERSION = 1
+
+
+class BattleSnapshot:
+    """
+    Immutable copy of a battle in progress, returned by Battle.snapshot().
+
+    Only plain tuples are stored (see MonsterTeam.snapshot and MonsterBase.snapshot),
+    so a snapshot can be shared and restored many times. Monster instances are only
+    created again when the snapshot is restored.
+    """
+
+    def __init__(self, team1: tuple, team2: tuple, out1: tuple, out2: tuple, turn_number: int) -> None:
+        self.team1 = team1
+        self.team2 = team2
+        self.out1 = out1
+        self.out2 = out2
+        self.turn_number = turn_number
+
 
 class Battle:
 
@@ -18,8 +46,21 @@ class Battle:
         TEAM2 = auto()
         DRAW = auto()
 
-    def __init__(self, verbosity=0) -> None:
+    def __init__(self, verbosity=0, recorder: Optional[BattleRecorder]=None, rules: Optional[EffectivenessCalculator]=None,
+                 cache: Optional[BattleCache]=None) -> None:
+        """
+        :verbosity: Print a trace of the battle when greater than 0.
+        :recorder: Optional replay.BattleRecorder that every battle is written to.
+        :rules: The effectiveness rule set attacks use (see EffectivenessCalculator.load_rules). Defaults to the process-wide one.
+        :cache: Optional battle_cache.BattleCache that battle() looks results up in.
+        """
         self.verbosity = verbosity
+        self.recorder = recorder
+        self.rules = rules
+        self.cache = cache
+        self.recording = False
+        # the actions of the last turn played, see process_turn()
+        self.last_actions: Optional[tuple[Battle.Action, Battle.Action]] = None
 
     def process_turn(self) -> Optional[Battle.Result]:
         """
@@ -45,7 +86,7 @@ class Battle:
                     - All mathematical operations are O(1) complexity as they are basic operations
                     - All other functions used are monster_base() functions which are O(1) complexity
             
-            - alive(), evolve(), get_speed(), get_hp(), set_hp(), level_up() and any other monster_base () functions are all O(1) complexity
+            - alive(), evolve_in_place(), get_speed(), get_hp(), set_hp(), level_up() and any other monster_base () functions are all O(1) complexity
 
         Best case complexity: 
             - Both teams are FRONT or BACK teams and both decide to swap
@@ -103,7 +144,15 @@ class Battle:
         # Process actions for both teams
         action1 = self.team1.choose_action(self.out1, self.out2)
         action2 = self.team2.choose_action(self.out2, self.out1)
-        
+        # kept so the recorder can log the actions once the turn is over
+        self.last_actions = (action1, action2)
+        return self.play_actions(action1, action2)
+
+    def play_actions(self, action1: Battle.Action, action2: Battle.Action) -> Optional[Battle.Result]:
+        """
+        Resolves a turn in which team 1 takes action1 and team 2 takes action2.
+        See process_turn() for the complexity analysis.
+        """
         if action1 == Battle.Action.SWAP:
             self.team1.add_to_team(self.out1)
             self.out1 = self.team1.retrieve_from_team()
@@ -125,25 +174,25 @@ class Battle:
             self.out2 = self.team2.retrieve_from_team()
 
         if action1 == Battle.Action.ATTACK and action2 != Battle.Action.ATTACK:
-            self.out1.attack(self.out2)
+            self.out1.attack(self.out2, self.rules)
 
         if action1 != Battle.Action.ATTACK and action2 == Battle.Action.ATTACK:
-            self.out2.attack(self.out1)
+            self.out2.attack(self.out1, self.rules)
         
         if action1 == Battle.Action.ATTACK and action2 == Battle.Action.ATTACK:
             if self.out1.get_speed() > self.out2.get_speed():
-                self.out1.attack(self.out2)
+                self.out1.attack(self.out2, self.rules)
                 if self.out2.alive():
-                    self.out2.attack(self.out1)
+                    self.out2.attack(self.out1, self.rules)
             elif self.out2.get_speed() > self.out1.get_speed():
-                self.out2.attack(self.out1)
+                self.out2.attack(self.out1, self.rules)
                 if self.out1.alive():
-                    self.out1.attack(self.out2)
+                    self.out1.attack(self.out2, self.rules)
             
             elif self.out1.get_speed() == self.out2.get_speed():
                 # monsters atack simultaneously
-                self.out1.attack(self.out2)
-                self.out2.attack(self.out1)
+                self.out1.attack(self.out2, self.rules)
+                self.out2.attack(self.out1, self.rules)
 
 
         # Check if both monsters still alive
@@ -169,7 +218,7 @@ class Battle:
             if len(self.team2) == 0:
                 return Battle.Result.TEAM1
             self.out1.level_up()
-            self.out1 = self.out1.evolve()
+            self.out1 = self.out1.evolve_in_place()
             self.out2 = self.team2.retrieve_from_team()
         
         # Check if monster 2 fainted
@@ -177,12 +226,95 @@ class Battle:
             if len(self.team1) == 0:
                 return Battle.Result.TEAM2
             self.out2.level_up()
-            self.out2 = self.out2.evolve()
+            self.out2 = self.out2.evolve_in_place()
             self.out1 = self.team1.retrieve_from_team() 
 
             
 
+    def snapshot(self) -> BattleSnapshot:
+        """
+        Captures the current state of a battle in progress.
+
+        O(n) complexity best/worst case where n is the number of monsters in both teams
+        """
+        return BattleSnapshot(
+            self.team1.snapshot(),
+            self.team2.snapshot(),
+            self.out1.snapshot(),
+            self.out2.snapshot(),
+            self.turn_number,
+        )
+
+    def restore(self, snapshot: BattleSnapshot) -> None:
+        """
+        Rewinds this battle (and its two teams) to a snapshot.
+        The teams are given new containers and new monster instances.
+
+        O(n) complexity best/worst case where n is the number of monsters in both teams
+        """
+        self.team1.restore(snapshot.team1)
+        self.team2.restore(snapshot.team2)
+        self.out1 = MonsterBase.from_snapshot(snapshot.out1)
+        self.out2 = MonsterBase.from_snapshot(snapshot.out2)
+        self.turn_number = snapshot.turn_number
+        self.recording = False
+
+    def fork(self, snapshot: Optional[BattleSnapshot]=None) -> Battle:
+        """
+        Returns a new Battle that continues from a snapshot (by default the current state)
+        without affecting this battle. The teams are shallow copies, so their mode, sort key
+        and provided monsters are shared, while their containers and monsters are new.
+        Call release() on the fork once it is no longer needed, so pooled teams get their slots back.
+
+        O(n) complexity best/worst case where n is the number of monsters in both teams
+        """
+        if snapshot is None:
+            snapshot = self.snapshot()
+        forked = Battle(verbosity=self.verbosity, rules=self.rules)
+        forked.team1 = copy.copy(self.team1)
+        forked.team2 = copy.copy(self.team2)
+        forked.restore(snapshot)
+        return forked
+
+    def release(self) -> None:
+        """
+        Returns the pool slots the teams' monsters were restored into, see MonsterTeam.release().
+
+        O(n) complexity best/worst case where n is the number of monsters in both teams
+        """
+        self.team1.release()
+        self.team2.release()
+
     def battle(self, team1: MonsterTeam, team2: MonsterTeam) -> Battle.Result:
+        """
+        Plays a battle between two teams until it finishes.
+        With a cache, a battle between freshly regenerated teams that was played before is not played again
+        (and the teams are left as they are), see battle_cache.BattleCache and skip().
+        """
+        if self.cache is not None:
+            return self.cache.battle(self, team1, team2)
+        self.start(team1, team2)
+        return self.resume()
+
+    def skip(self, team1: MonsterTeam, team2: MonsterTeam) -> None:
+        """
+        Sets the battle's state for a battle between two teams whose result was looked up instead of played
+        (see battle_cache.BattleCache): team1 and team2 are the teams, while the out monsters, turn number
+        and last actions were never played, so they are None rather than left over from the previous battle.
+
+        O(1) complexity best/worst case
+        """
+        self.team1 = team1
+        self.team2 = team2
+        self.out1 = None
+        self.out2 = None
+        self.turn_number = None
+        self.last_actions = None
+
+    def start(self, team1: MonsterTeam, team2: MonsterTeam) -> None:
+        """
+        Sets up a battle between two teams without playing any turns.
+        """
         if self.verbosity > 0:
             print(f"Team 1: {team1} vs. Team 2: {team2}")
         # Add any pregame logic here.
@@ -191,10 +323,29 @@ class Battle:
         self.team2 = team2
         self.out1 = team1.retrieve_from_team()
         self.out2 = team2.retrieve_from_team()
+        # only battles played from the start are written to the recorder
+        self.recording = self.recorder is not None
+        if self.recording:
+            self.recorder.start_battle(team1, team2)
+
+    def resume(self) -> Battle.Result:
+        """
+        Plays the current battle (set up by start(), or restored / forked from a snapshot) until it finishes.
+        """
         result = None
         while result is None:
-            result = self.process_turn()
+            if not self.recording:
+                result = self.process_turn()
+            else:
+                hp1 = self.out1.get_hp()
+                hp2 = self.out2.get_hp()
+                result = self.process_turn()
+                action1, action2 = self.last_actions
+                self.recorder.record_turn(action1, action2, self.out1.get_hp() - hp1, self.out2.get_hp() - hp2)
         # Add any postgame logic here.
+        if self.recording:
+            self.recorder.end_battle(result)
+            self.recording = False
         return result
 
 if __name__ == "__main__":
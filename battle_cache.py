@@ -0,0 +1,202 @@
+"""
+Bounded cache of battle results, with an optional on-disk tier.
+
+A battle between two freshly regenerated teams (see MonsterTeam.fresh) is fully
+determined by the teams' compositions, their policies, the catalog and the
+effectiveness rules, so its result is cached under a key built from:
+
+    battle.ENGINE_VERSION
+    the SHA-256 of the catalog (MonsterRegistry.source_hash)
+    the SHA-256 of the battle's rule set (EffectivenessCalculator.source_hash)
+    both teams' encoding() (see team_encoding) and policy cache_key()
+
+Battles draw no numbers from RandomGen (teams are drawn when they are created,
+see MonsterTeam.select_randomly), so the RNG state is not part of the key and
+a cache hit leaves it exactly as playing the battle would have.
+
+Battles are played (and counted in `bypassed`) instead of looked up when a key
+cannot be built: a team that is not fresh, a monster outside the catalog, a
+policy without a cache_key(), data loaded without a source hash, or a battle
+that is being recorded or printed.
+
+The most recently used `maxsize` results are kept in memory. With a path, every
+result is also written to a `shelve` file, which is looked in on a memory miss,
+so results are reused across runs.
+
+Usage:
+    with BattleCache(maxsize=10_000, path="battles.cache") as cache:
+        battle = Battle(cache=cache)
+        battle.battle(team1, team2)
+        print(cache.hits, cache.disk_hits, cache.misses)
+"""
+from __future__ import annotations
+import hashlib
+import shelve
+import struct
+from collections import OrderedDict
+from typing import Optional, TYPE_CHECKING
+
+from battle import Battle, ENGINE_VERSION
+from elements import EffectivenessCalculator
+from helpers import get_registry
+
+if TYPE_CHECKING:
+    from policies import ActionPolicy
+    from team import MonsterTeam
+
+
+PART_LENGTH = struct.Struct("<I")
+
+
+def pack_parts(parts: tuple[Optional[str | bytes], ...]) -> Optional[bytes]:
+    """
+    Joins strings and bytes, each prefixed with its length so no two different tuples give the same bytes.
+    None if one of the parts is None.
+
+    O(s) complexity best/worst case where s is the total size of the parts
+    """
+    data = bytearray()
+    for part in parts:
+        if part is None:
+            return None
+        if isinstance(part, str):
+            part = part.encode()
+        data += PART_LENGTH.pack(len(part))
+        data += part
+    return bytes(data)
+
+
+def battle_inputs(team1: MonsterTeam, team2: MonsterTeam, policy: Optional[ActionPolicy] = None) -> Optional[bytes]:
+    """
+    The part of a battle's key that depends on its teams: both teams' policy cache_key() and encoding().
+    None if one of them has no cache key or no encoding.
+
+    :policy: The policy that plays both teams, when it is not their own (see lockstep.LockstepBattles).
+
+    O(n) complexity for the first battle of a team where n is the size of the team (see MonsterTeam.encoding())
+    O(1) complexity best/worst case afterwards
+    """
+    policy1 = team1.policy if policy is None else policy
+    policy2 = team2.policy if policy is None else policy
+    return pack_parts((policy1.cache_key(), policy2.cache_key(), team1.encoding(), team2.encoding()))
+
+
+class BattleCache:
+
+    def __init__(self, maxsize: int = 4096, path: Optional[str] = None) -> None:
+        """
+        :maxsize: The number of results kept in memory.
+        :path: Optional shelve file results are also written to (and read back from on a memory miss).
+        """
+        if maxsize < 1:
+            raise ValueError(f"maxsize must be at least 1, not {maxsize}.")
+        self.maxsize = maxsize
+        self.path = path
+        # key -> Battle.Result value, least recently used first
+        self.entries: OrderedDict[bytes, int] = OrderedDict()
+        self.shelf: Optional[shelve.Shelf] = None
+
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.bypassed = 0
+
+    def __len__(self) -> int:
+        """Number of results in memory."""
+        return len(self.entries)
+
+    def __enter__(self) -> BattleCache:
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def key(self, battle: Battle, team1: MonsterTeam, team2: MonsterTeam) -> Optional[bytes]:
+        """
+        The key of a battle between team1 and team2, or None if its result cannot be cached.
+
+        O(n) complexity for the first battle of a team where n is the size of the team (see MonsterTeam.encoding())
+        O(1) complexity best/worst case afterwards
+        """
+        if battle.recorder is not None or battle.verbosity > 0 or not (team1.fresh and team2.fresh):
+            return None
+        rules = battle.rules if battle.rules is not None else EffectivenessCalculator.default()
+        data = pack_parts((str(ENGINE_VERSION), get_registry().source_hash, rules.source_hash))
+        inputs = battle_inputs(team1, team2)
+        if data is None or inputs is None:
+            return None
+        return hashlib.sha256(data + inputs).digest()
+
+    def get(self, key: bytes) -> Optional[Battle.Result]:
+        """
+        The cached result for a key, or None. Counts a hit, disk hit or miss.
+
+        O(1) complexity best/worst case for the memory tier
+        """
+        value = self.entries.get(key)
+        if value is not None:
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return Battle.Result(value)
+        if self.path is not None:
+            value = self._disk().get(key.hex())
+            if value is not None:
+                self._remember(key, value)
+                self.disk_hits += 1
+                return Battle.Result(value)
+        self.misses += 1
+        return None
+
+    def put(self, key: bytes, result: Battle.Result) -> None:
+        """
+        O(1) complexity best/worst case for the memory tier
+        """
+        self._remember(key, result.value)
+        if self.path is not None:
+            self._disk()[key.hex()] = result.value
+
+    def battle(self, battle: Battle, team1: MonsterTeam, team2: MonsterTeam) -> Battle.Result:
+        """
+        The result of battle.battle(team1, team2), played with battle only if it is not cached.
+        On a hit no turn is played, so the teams are left fresh and the battle's out monsters
+        and turn number are None, see Battle.skip().
+        """
+        key = self.key(battle, team1, team2)
+        if key is None:
+            self.bypassed += 1
+        else:
+            result = self.get(key)
+            if result is not None:
+                battle.skip(team1, team2)
+                return result
+        battle.start(team1, team2)
+        result = battle.resume()
+        if key is not None:
+            self.put(key, result)
+        return result
+
+    def clear(self) -> None:
+        """Forgets the results in memory. The disk tier is kept."""
+        self.entries.clear()
+
+    def close(self) -> None:
+        """Closes the disk tier, if it is open. It is opened again when needed."""
+        if self.shelf is not None:
+            self.shelf.close()
+            self.shelf = None
+
+    def _remember(self, key: bytes, value: int) -> None:
+        """
+        Adds a result to the memory tier, evicting the least recently used one if it is full.
+
+        O(1) complexity best/worst case
+        """
+        self.entries[key] = value
+        self.entries.move_to_end(key)
+        if len(self.entries) > self.maxsize:
+            self.entries.popitem(last=False)
+
+    def _disk(self) -> shelve.Shelf:
+        if self.shelf is None:
+            self.shelf = shelve.open(self.path)
+        return self.shelf
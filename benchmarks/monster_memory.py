@@ -0,0 +1,51 @@
+"""
+Memory used by a large population of monster instances.
+
+Builds one million monsters (cycling through the spawnable catalog classes) and
+reports the memory they take, measured with tracemalloc.
+
+Usage:
+    python benchmarks/monster_memory.py [count]
+"""
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from data_structures.referential_array import ArrayR
+from helpers import get_registry
+
+
+def build_population(count: int) -> ArrayR:
+    registry = get_registry()
+    spawnable = registry.spawnable
+    population = ArrayR(count)
+    for i in range(count):
+        population[i] = registry[spawnable[i % len(spawnable)]]()
+    return population
+
+
+def main(count: int) -> None:
+    # load the catalog first so it is not counted
+    get_registry()
+
+    tracemalloc.start()
+    before, _ = tracemalloc.get_traced_memory()
+    start = time.perf_counter()
+    population = build_population(count)
+    elapsed = time.perf_counter() - start
+    after, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    used = after - before
+    print(f"monsters:           {len(population):,}")
+    print(f"memory:             {used / 2**20:,.1f} MiB ({used / count:.1f} bytes per monster, including the array)")
+    print(f"peak:               {(peak - before) / 2**20:,.1f} MiB")
+    print(f"build time:         {elapsed:.2f} s")
+    print(f"instance __dict__:  {hasattr(population[0], '__dict__')}")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000)
@@ -0,0 +1,83 @@
+"""
+Cost of team operations as teams grow past TEAM_LIMIT.
+
+For team sizes from 6 to 100,000 and every team mode, times regenerate_team(),
+special() and get_monster_elements() per monster, so an operation with the documented
+complexity shows up as a flat (O(n) / O(1) per monster) or slowly growing (O(n log n)) column.
+retrieve_from_team() and add_to_team() are timed per call on a full team: up to ADD_SAMPLE
+monsters are retrieved, then added back, so a flat column is O(1) and a growing one O(n).
+
+OPTIMISE monsters are added back in their retrieval order reversed, so every monster goes
+next to the end of the sorted list. Monsters with equal keys keep the order the original
+ArraySortedList.add() gave them, which puts an added monster among the ones with its key
+and shuffles them: with the few distinct keys of these teams, OPTIMISE adds are O(n).
+
+Usage:
+    python benchmarks/team_scaling.py [largest size]
+"""
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from data_structures.bset import BSet
+from data_structures.referential_array import ArrayR
+from helpers import get_registry
+from team import MonsterTeam
+
+SIZES = (6, 100, 1_000, 10_000, 100_000)
+ADD_SAMPLE = 1_000
+
+
+def provided_monsters(n: int) -> ArrayR:
+    registry = get_registry()
+    spawnable = registry.spawnable
+    provided = ArrayR(n)
+    for i in range(n):
+        provided[i] = registry[spawnable[(i * 7) % len(spawnable)]]
+    return provided
+
+
+def timed(operation) -> float:
+    start = time.perf_counter()
+    operation()
+    return time.perf_counter() - start
+
+
+def measure(mode: MonsterTeam.TeamMode, n: int) -> tuple[float, ...]:
+    team = MonsterTeam(mode, MonsterTeam.SelectionMode.PROVIDED, provided_monsters=provided_monsters(n),
+                       sort_key=MonsterTeam.SortMode.HP, team_limit=n)
+    sample = min(n, ADD_SAMPLE)
+    monsters = ArrayR(sample)
+
+    def drain():
+        for i in range(sample):
+            monsters[i] = team.retrieve_from_team()
+
+    def refill():
+        # last retrieved first: OPTIMISE monsters then always go next to the end of the sorted list
+        for i in range(sample - 1, -1, -1):
+            team.add_to_team(monsters[i])
+
+    regenerate = timed(team.regenerate_team) / n
+    special = timed(team.special) / n
+    elements = timed(lambda: team.get_monster_elements(BSet())) / n
+    retrieve = timed(drain) / sample
+    add = timed(refill) / sample
+    return tuple(seconds * 1e6 for seconds in (regenerate, special, elements, retrieve, add))
+
+
+def main(largest: int) -> None:
+    print(f"microseconds per monster (retrieve / add: per call, {ADD_SAMPLE:,} calls at most)")
+    print(f"{'mode':9} {'n':>8} {'regenerate':>11} {'special':>9} {'elements':>9} {'retrieve':>9} {'add':>9}")
+    for mode in MonsterTeam.TeamMode:
+        for n in SIZES:
+            if n > largest:
+                break
+            times = measure(mode, n)
+            print(f"{mode.name:9} {n:>8,} {times[0]:>11.2f} " + " ".join(f"{t:>9.2f}" for t in times[1:]))
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else SIZES[-1])
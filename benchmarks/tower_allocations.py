@@ -0,0 +1,54 @@
+"""
+Memory allocated per battle by the battle tower loop.
+
+Regenerates and fights the same pair of teams many times, once with fresh teams
+(new containers and monsters on every regenerate_team) and once with recycled teams
+(recycle=True, reset in place), and reports the memory regenerate_team() allocates
+per battle, measured with tracemalloc.
+
+Usage:
+    python benchmarks/tower_allocations.py [battles]
+"""
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from battle import Battle
+from random_gen import RandomGen
+from team import MonsterTeam
+
+
+def run(battles: int, recycle: bool) -> tuple[float, float]:
+    RandomGen.set_seed(1)
+    team1 = MonsterTeam(MonsterTeam.TeamMode.BACK, MonsterTeam.SelectionMode.RANDOM, recycle=recycle)
+    team2 = MonsterTeam(MonsterTeam.TeamMode.BACK, MonsterTeam.SelectionMode.RANDOM, recycle=recycle)
+    battle = Battle(verbosity=0)
+
+    tracemalloc.start()
+    start = time.perf_counter()
+    allocated = 0
+    for _ in range(battles):
+        # the peak above the starting point is the memory regenerate_team() needed at once
+        tracemalloc.reset_peak()
+        before, _ = tracemalloc.get_traced_memory()
+        team1.regenerate_team()
+        team2.regenerate_team()
+        _, peak = tracemalloc.get_traced_memory()
+        allocated += peak - before
+        battle.battle(team1, team2)
+    elapsed = time.perf_counter() - start
+    tracemalloc.stop()
+    return allocated / battles, elapsed
+
+
+def main(battles: int) -> None:
+    for recycle in (False, True):
+        allocated, elapsed = run(battles, recycle)
+        print(f"recycle={recycle!s:5}  regenerate_team allocates {allocated:8.1f} bytes per battle   ({elapsed:.2f} s)")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 1000)
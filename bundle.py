@@ -0,0 +1,341 @@
+"""
+Compiled binary bundle of the game data (monster catalog + effectiveness table).
+
+The bundle is built once from monsters.yaml and type_effectiveness.csv, then loaded
+with mmap, so starting from it involves no YAML/CSV parsing and every process on a
+host reading the same bundle shares its pages.
+
+Layout (native byte order, recorded in the header):
+
+    header:         magic (4 bytes) | version (u16) | byte order (u8) | pad (u8)
+                    | monsters (u32) | elements (u32) | formula tokens (u32)
+                    | catalog SHA-256 (32 bytes) | effectiveness SHA-256 (32 bytes)
+    section table:  (offset u64, size u64) for every entry of SECTIONS
+    sections:       each one 8 byte aligned, see SECTIONS
+
+Stats and indices are fixed width columns indexed by catalog index. Strings are
+(offset, length) pairs into one UTF-8 string table. Complex stat formulas are
+compiled to (opcode, operand) token columns, with (first token, token count) per
+formula.
+
+A bundle only stands in for the default data files (monsters.yaml and
+type_effectiveness.csv next to the code): a catalog or effectiveness table given
+explicitly ($MONSTER_CATALOG, helpers.set_catalog_path(), $MONSTER_EFFECTIVENESS)
+is read instead. If the default file is present, it must still be the one the
+bundle was built from (same SHA-256), otherwise loading raises a ValueError.
+
+Usage:
+    python bundle.py build -o game_data.bundle
+    MONSTER_BUNDLE=game_data.bundle python tower.py
+
+    bundle = GameDataBundle("game_data.bundle")
+    registry = bundle.registry()
+    calculator = bundle.effectiveness()
+"""
+from __future__ import annotations
+import argparse
+import math
+import mmap
+import os
+import struct
+import sys
+from array import array
+from typing import Optional
+
+from data_cache import file_hash, load_cached_with_hash
+from data_structures.referential_array import ArrayR
+from elements import EFFECTIVENESS_CSV, EffectivenessCalculator, Element, _parse_csv
+from registry import MonsterBaseFactory, MonsterRegistry, parse_yaml, _set_evolution
+from stats import ComplexStats, SimpleStats, FORMULA_OPERATORS, NUMBER
+
+
+# Read in place of monsters.yaml / type_effectiveness.csv when set, see helpers and elements.
+BUNDLE_PATH: Optional[str] = os.environ.get("MONSTER_BUNDLE")
+
+MAGIC = b"MBDL"
+VERSION = 2
+
+HEADER = struct.Struct("<4sHBxIII32s32s")
+SECTION = struct.Struct("<QQ")
+ALIGNMENT = 8
+
+# (name, array typecode) of every section, in file order
+SECTIONS = (
+    ("attack", "i"),
+    ("defense", "i"),
+    ("speed", "i"),
+    ("max_hp", "i"),
+    ("element", "B"),                 # Element value of the first element
+    ("evolution", "i"),               # catalog index, NO_EVOLUTION if none
+    ("can_be_spawned", "B"),
+    ("spawn_weight", "d"),            # NaN if none
+    ("name", "I"),                    # (offset, length) in strings
+    ("description", "I"),
+    ("element_name", "I"),
+    ("second_element_name", "I"),     # length 0 for single-element monsters
+    ("formula", "I"),                 # (first token, count) for attack, defense, speed, max_hp
+    ("opcode", "B"),
+    ("operand", "d"),
+    ("effectiveness_name", "I"),      # element names in CSV order
+    ("effectiveness", "d"),           # elements * elements values, row = attacker
+    ("strings", "B"),
+)
+
+NO_EVOLUTION = -1
+
+# Formula opcodes, see ComplexStats.from_program.
+OPCODES = {operator: i + 1 for i, operator in enumerate(FORMULA_OPERATORS)}
+
+FORMULA_STATS = ("attack", "defense", "speed", "max_hp")
+
+
+_bundles: dict[str, GameDataBundle] = {}
+
+
+def get_bundle() -> Optional[GameDataBundle]:
+    """
+    Returns the bundle at BUNDLE_PATH (mapped once per process), or None if no bundle is configured.
+    """
+    if BUNDLE_PATH is None:
+        return None
+    bundle = _bundles.get(BUNDLE_PATH)
+    if bundle is None:
+        bundle = _bundles[BUNDLE_PATH] = GameDataBundle(BUNDLE_PATH)
+    return bundle
+
+
+def compile_formula(tokens: list[str]) -> list[tuple[int, float]]:
+    """
+    Compiles a postfix formula into (opcode, operand) pairs. The operand is only used by NUMBER.
+    :raises ValueError: on an unknown operator
+    """
+    compiled = []
+    for token in tokens:
+        if token in OPCODES:
+            compiled.append((OPCODES[token], 0.0))
+            continue
+        try:
+            compiled.append((NUMBER, float(token)))
+        except ValueError:
+            raise ValueError(f"Unknown formula token {token!r}.")
+    return compiled
+
+
+class _StringTable:
+
+    def __init__(self) -> None:
+        self.data = bytearray()
+        self.offsets: dict[str, int] = {}
+
+    def add(self, string: str) -> tuple[int, int]:
+        """Returns the (offset, length) of string, storing each distinct string once."""
+        encoded = string.encode()
+        offset = self.offsets.get(string)
+        if offset is None:
+            offset = self.offsets[string] = len(self.data)
+            self.data += encoded
+        return (offset, len(encoded))
+
+
+def build(catalog_path: str, effectiveness_path: str) -> bytes:
+    """
+    Compiles a catalog and an effectiveness table into bundle bytes.
+
+    O(n + t + e^2) complexity best/worst case
+        - n is the number of monsters, t the number of formula tokens and e the number of elements
+    :raises ValueError: if the catalog is invalid (see MonsterRegistry.from_stream)
+    """
+    records, catalog_hash = load_cached_with_hash(catalog_path, parse_yaml)
+    (names, values), effectiveness_hash = load_cached_with_hash(effectiveness_path, _parse_csv)
+    # building the registry validates the records and resolves evolutions
+    registry = MonsterRegistry.from_records(records)
+
+    n = len(records)
+    columns = {name: array(typecode) for name, typecode in SECTIONS}
+    strings = _StringTable()
+    for i in range(n):
+        record = records[i]
+        simple = record["simple"]
+        for stat in FORMULA_STATS:
+            columns[stat].append(simple[stat])
+        elements = registry[i].get_elements()
+        columns["element"].append(Element.from_string(elements[0]).value)
+        evolution = registry[i].get_evolution()
+        columns["evolution"].append(NO_EVOLUTION if evolution is None else registry.index_of(evolution))
+        columns["can_be_spawned"].append(bool(record.get("can_be_spawned", False)))
+        weight = record.get("spawn_weight", None)
+        columns["spawn_weight"].append(math.nan if weight is None else weight)
+        columns["name"].extend(strings.add(record["name"]))
+        columns["description"].extend(strings.add(record["description"]))
+        columns["element_name"].extend(strings.add(elements[0]))
+        columns["second_element_name"].extend(strings.add(elements[1] if len(elements) == 2 else ""))
+        for stat in FORMULA_STATS:
+            compiled = compile_formula(str(record["complex"][stat]).split())
+            columns["formula"].extend((len(columns["opcode"]), len(compiled)))
+            for opcode, operand in compiled:
+                columns["opcode"].append(opcode)
+                columns["operand"].append(operand)
+
+    for name in names:
+        columns["effectiveness_name"].extend(strings.add(name))
+    columns["effectiveness"].extend(values)
+    columns["strings"].frombytes(bytes(strings.data))
+
+    header = HEADER.pack(
+        MAGIC, VERSION, sys.byteorder == "big", n, len(names), len(columns["opcode"]),
+        bytes.fromhex(catalog_hash), bytes.fromhex(effectiveness_hash),
+    )
+    offset = _align(HEADER.size + SECTION.size * len(SECTIONS))
+    table = bytearray()
+    body = bytearray()
+    for name, _ in SECTIONS:
+        data = columns[name].tobytes()
+        table += SECTION.pack(offset + len(body), len(data))
+        body += data
+        body += bytes(_align(len(body)) - len(body))
+    padding = bytes(offset - HEADER.size - len(table))
+    return header + table + padding + body
+
+
+def write(path: str, catalog_path: str, effectiveness_path: str) -> None:
+    """Builds a bundle and atomically replaces path with it."""
+    data = build(catalog_path, effectiveness_path)
+    temporary = f"{path}.{os.getpid()}.tmp"
+    with open(temporary, "wb") as f:
+        f.write(data)
+    os.replace(temporary, path)
+
+
+def _align(size: int) -> int:
+    return (size + ALIGNMENT - 1) // ALIGNMENT * ALIGNMENT
+
+
+class GameDataBundle:
+    """
+    A bundle file mapped into memory. Every section is exposed as a typed
+    memoryview over the mapping (e.g. bundle.sections["speed"][i]), so nothing is copied or parsed.
+    """
+
+    def __init__(self, path: str) -> None:
+        """
+        O(1) complexity best/worst case (besides mapping the file)
+        :raises ValueError: if the file is not a bundle of this version and byte order
+        """
+        with open(path, "rb") as f:
+            self.mapping = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if len(self.mapping) < HEADER.size:
+            raise ValueError("Not a game data bundle.")
+        magic, version, big_endian, n, e, t, catalog_hash, effectiveness_hash = HEADER.unpack_from(self.mapping, 0)
+        if magic != MAGIC:
+            raise ValueError("Not a game data bundle.")
+        if version != VERSION:
+            raise ValueError(f"Unsupported game data bundle version {version}.")
+        if big_endian != (sys.byteorder == "big"):
+            raise ValueError("The game data bundle was built on a machine with a different byte order.")
+
+        self.path = path
+        self.n_monsters = n
+        self.n_elements = e
+        self.catalog_hash = catalog_hash.hex()
+        self.effectiveness_hash = effectiveness_hash.hex()
+
+        view = memoryview(self.mapping)
+        self.sections: dict[str, memoryview] = {}
+        for i, (name, typecode) in enumerate(SECTIONS):
+            offset, size = SECTION.unpack_from(self.mapping, HEADER.size + i * SECTION.size)
+            if offset + size > len(self.mapping):
+                raise ValueError("Truncated game data bundle.")
+            self.sections[name] = view[offset:offset + size].cast(typecode)
+
+    def string(self, section: str, index: int) -> str:
+        """The index-th string of a string section. O(l) where l is the length of the string"""
+        pairs = self.sections[section]
+        offset = pairs[2 * index]
+        return bytes(self.sections["strings"][offset:offset + pairs[2 * index + 1]]).decode()
+
+    def check_source(self, path: Optional[str], digest: str) -> None:
+        """
+        Checks that a source file the bundle stands in for is the one it was built from.
+        Nothing is checked if there is no such file (e.g. when only the bundle is deployed).
+
+        O(s) complexity best/worst case where s is the size of the file, which is hashed
+        :raises ValueError: if the file has changed since the bundle was built
+        """
+        if path is None or not os.path.exists(path):
+            return
+        if file_hash(path) != digest:
+            raise ValueError(
+                f"{path} has changed since the game data bundle {self.path} was built, "
+                "rebuild it with `python bundle.py build`."
+            )
+
+    def _elements(self, i: int) -> list[str]:
+        second = self.string("second_element_name", i)
+        return [self.string("element_name", i), second] if second else [self.string("element_name", i)]
+
+    def registry(self, catalog_path: Optional[str] = None) -> MonsterRegistry:
+        """
+        Creates the monster classes of the bundled catalog.
+        Evolutions are read from the evolution column rather than resolved by name,
+        and complex stats are built straight from the compiled formulas.
+
+        :catalog_path: The catalog file the bundle stands in for, see check_source().
+
+        O(n + t) complexity best/worst case where n is the number of monsters and t the number of formula tokens
+        :raises ValueError: if catalog_path has changed since the bundle was built
+        """
+        self.check_source(catalog_path, self.catalog_hash)
+        s = self.sections
+        n = self.n_monsters
+        bounds = s["formula"]
+        stride = 2 * len(FORMULA_STATS)
+        monsters = ArrayR(n)
+        for i in range(n):
+            weight = s["spawn_weight"][i]
+            monsters[i] = MonsterBaseFactory(
+                self.string("name", i),
+                self.string("description", i),
+                None,
+                self._elements(i),
+                SimpleStats(s["attack"][i], s["defense"][i], s["speed"][i], s["max_hp"][i]),
+                ComplexStats.from_program(s["opcode"], s["operand"], bounds[stride * i:stride * (i + 1)]),
+                bool(s["can_be_spawned"][i]),
+                None if math.isnan(weight) else weight,
+            )
+        evolution = s["evolution"]
+        for i in range(n):
+            if evolution[i] != NO_EVOLUTION:
+                _set_evolution(monsters[i], monsters[evolution[i]])
+        return MonsterRegistry(monsters, self.catalog_hash)
+
+    def effectiveness(self, effectiveness_path: Optional[str] = None) -> EffectivenessCalculator:
+        """
+        An EffectivenessCalculator reading its values straight from the mapped matrix.
+
+        :effectiveness_path: The effectiveness table the bundle stands in for, see check_source().
+
+        O(e) complexity best/worst case where e is the number of elements
+        :raises ValueError: if effectiveness_path has changed since the bundle was built
+        """
+        self.check_source(effectiveness_path, self.effectiveness_hash)
+        names = ArrayR(self.n_elements)
+        for i in range(self.n_elements):
+            names[i] = self.string("effectiveness_name", i)
+        calculator = EffectivenessCalculator(names, self.sections["effectiveness"])
+        calculator.source_hash = self.effectiveness_hash
+        return calculator
+
+
+if __name__ == "__main__":
+    from helpers import CATALOG_PATH
+
+    p = argparse.ArgumentParser(description="Compile the game data into a binary bundle.")
+    commands = p.add_subparsers(dest="command", required=True)
+    b = commands.add_parser("build", help="Build a bundle from a catalog and an effectiveness table.")
+    b.add_argument("-o", "--output", required=True, help="Where to write the bundle.")
+    b.add_argument("--catalog", default=CATALOG_PATH, help="The monsters.yaml to compile.")
+    b.add_argument("--effectiveness", default=EFFECTIVENESS_CSV, help="The type_effectiveness.csv to compile.")
+    args = p.parse_args()
+
+    write(args.output, args.catalog, args.effectiveness)
+    print(f"Wrote {args.output}")
@@ -0,0 +1,113 @@
+"""
+Column (struct-of-arrays) view of the monster catalog.
+
+Every monster class in a MonsterRegistry is identified by its catalog index, and its
+simple stats, elements and evolution are stored in typed arrays indexed by it.
+Used by the engines and policies that work on arrays of catalog indices
+instead of monster instances.
+"""
+from __future__ import annotations
+import math
+from array import array
+from typing import Optional
+
+from elements import EffectivenessCalculator, Element
+from helpers import get_registry
+from registry import MonsterRegistry
+
+
+NO_MONSTER = -1
+
+
+def speed_column(registry: Optional[MonsterRegistry]=None) -> array:
+    """
+    The simple speed of every monster class of a catalog (helpers.get_registry() by default), by catalog index.
+
+    O(m) complexity best/worst case where m is the number of monster classes
+    """
+    monsters = (registry or get_registry()).monsters
+    speed = array("i", [0]) * len(monsters)
+    for i in range(len(monsters)):
+        speed[i] = monsters[i].get_simple_stats().get_speed()
+    return speed
+
+
+class CatalogColumns:
+    """
+    Per-class stat columns for every monster in the catalog, plus the damage
+    table used by the lockstep engine.
+
+    O(m) complexity to build, where m is the number of monster classes
+    O(m^2) complexity the first time the damage table is used
+        - one damage value is computed per (attacker, defender) pair
+    """
+
+    def __init__(self, registry: Optional[MonsterRegistry]=None, rules: Optional[EffectivenessCalculator]=None) -> None:
+        """
+        :registry: The catalog to build the columns for. Defaults to helpers.get_registry().
+        :rules: The effectiveness rule set the damage table is computed with. Defaults to the process-wide one.
+        """
+        self.registry = registry or get_registry()
+        self.rules = rules
+        monsters = self.registry.monsters
+        n = len(monsters)
+        self.monsters = monsters
+        self.attack = array("i", [0]) * n
+        self.defense = array("i", [0]) * n
+        self.speed = array("i", [0]) * n
+        self.max_hp = array("i", [0]) * n
+        self.element = array("b", [0]) * n
+        # column of the (one or two) elements of each class in EffectivenessCalculator.combined_matrix()
+        self.defending = array("i", [0]) * n
+        self.evolution = array("i", [NO_MONSTER]) * n
+
+        for i in range(n):
+            stats = monsters[i].get_simple_stats()
+            self.attack[i] = stats.get_attack()
+            self.defense[i] = stats.get_defense()
+            self.speed[i] = stats.get_speed()
+            self.max_hp[i] = stats.get_max_hp()
+            self.element[i] = Element.from_string(monsters[i].get_element()).value
+            self.defending[i] = monsters[i].defending_index()
+            evolution = monsters[i].get_evolution()
+            if evolution is not None:
+                self.evolution[i] = self.registry.index_of(evolution)
+
+        self.effectiveness = (rules or EffectivenessCalculator.default()).combined_table()
+        # see damage, built on first use
+        self._damage_table: Optional[array] = None
+
+    @property
+    def damage(self) -> array:
+        """
+        damage[attacker * m + defender], the same formula as MonsterBase.attack, for the m monster classes.
+
+        O(m^2) complexity the first time, O(1) afterwards
+        """
+        if self._damage_table is None:
+            n = len(self.monsters)
+            table = array("i", [0]) * (n * n)
+            for a in range(n):
+                for d in range(n):
+                    table[a * n + d] = self._damage(a, d)
+            self._damage_table = table
+        return self._damage_table
+
+    def _damage(self, attacker: int, defender: int) -> int:
+        attack = self.attack[attacker]
+        defense = self.defense[defender]
+        if defense < (attack / 2):
+            damage = attack - defense
+        elif defense < attack:
+            damage = (attack * 5/8) - (defense / 4)
+        else:
+            damage = attack / 4
+        effectiveness = self.effectiveness[self.monsters[attacker].attacking_offset() + self.defending[defender]]
+        return math.ceil(damage * effectiveness)
+
+    def index_of(self, monster: type) -> int:
+        """
+        The catalog index of a monster class. O(1)
+        :raises ValueError: if the class is not in the catalog
+        """
+        return self.registry.index_of(monster)
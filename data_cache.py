@@ -0,0 +1,75 @@
+"""
+Cache of parsed game data files, shared between processes.
+
+The parsed form of a data file (plain lists / dicts / numbers / strings) is written
+with `marshal` to a cache file named after the SHA-256 of the source bytes. Any later
+load of an identical source file, in any process, reads the cache instead of parsing.
+Editing the source changes its hash, so stale cache files are simply never used again.
+
+Usage:
+    data = load_cached("monsters.yaml", parse_yaml)
+"""
+from __future__ import annotations
+import hashlib
+import marshal
+import os
+from typing import Any, Callable, Optional
+
+
+# Bump when the parsed format of any data file changes.
+CACHE_VERSION = 1
+
+# Where cache files are written. None means a __pycache__ directory next to the source file.
+CACHE_DIR: Optional[str] = os.environ.get("MONSTER_CACHE_DIR")
+
+
+def file_hash(path: str) -> str:
+    """Returns the SHA-256 hex digest of a file's contents."""
+    with open(path, "rb") as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+
+def cache_path(path: str, digest: str) -> str:
+    cache_dir = CACHE_DIR or os.path.join(os.path.dirname(os.path.abspath(path)), "__pycache__")
+    name = os.path.basename(path)
+    return os.path.join(cache_dir, f"{name}.{digest[:20]}.v{CACHE_VERSION}.marshal")
+
+
+def load_cached(path: str, parse: Callable[[bytes], Any]) -> Any:
+    """
+    Returns parse(contents of path), reusing a cached result for identical contents when there is one.
+    """
+    return load_cached_with_hash(path, parse)[0]
+
+
+def load_cached_with_hash(path: str, parse: Callable[[bytes], Any]) -> tuple[Any, str]:
+    """
+    Same as load_cached, but also returns the SHA-256 hex digest of the source file.
+
+    Failing to write the cache (e.g. a read-only directory) is not an error, the result is just not cached.
+
+    O(s) complexity best case (cache hit) where s is the size of the source file, as it still has to be hashed
+    O(s + p) complexity worst case where p is the cost of parsing
+    """
+    with open(path, "rb") as f:
+        source = f.read()
+    digest = hashlib.sha256(source).hexdigest()
+    target = cache_path(path, digest)
+
+    try:
+        with open(target, "rb") as f:
+            return (marshal.load(f), digest)
+    except (OSError, EOFError, ValueError, TypeError):
+        pass
+
+    data = parse(source)
+    try:
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        # write to a temporary file first so other processes never read a half written cache
+        temporary = f"{target}.{os.getpid()}.tmp"
+        with open(temporary, "wb") as f:
+            marshal.dump(data, f)
+        os.replace(temporary, target)
+    except OSError:
+        pass
+    return (data, digest)
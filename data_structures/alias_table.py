@@ -0,0 +1,90 @@
+"""
+    Alias table for sampling from a fixed discrete distribution (Vose's alias method).
+"""
+
+from __future__ import annotations
+from array import array
+
+from data_structures.referential_array import ArrayR
+from random_gen import RandomGen
+
+class AliasTable:
+    """ Samples an index i in [0, n) with probability weights[i] / sum(weights).
+
+        The table is split into n equally likely columns. Column i keeps
+        index i with probability threshold[i] / 2^32 and gives alias[i] otherwise,
+        so a sample is one uniform column pick plus one biased coin flip.
+
+        Attributes:
+        threshold (array): chance (out of 2^32) that column i keeps index i
+        alias (array): the index column i gives when it does not keep i
+    """
+
+    SCALE = 1 << 32
+
+    def __init__(self, weights: ArrayR[float]) -> None:
+        """ Builds the table.
+            :raises ValueError: if a weight is negative or all weights are zero
+            :complexity: O(n) best/worst case where n is the number of weights
+        """
+        n = len(weights)
+        total = 0.0
+        for i in range(n):
+            if weights[i] < 0:
+                raise ValueError(f"Weight {weights[i]} at index {i} is negative.")
+            total += weights[i]
+        if n == 0 or total <= 0:
+            raise ValueError("At least one weight must be positive.")
+
+        self.threshold = array("Q", [self.SCALE]) * n
+        self.alias = array("i", range(n))
+
+        # scaled[i] is weights[i] relative to the average weight, 1.0 fills exactly one column
+        scaled = array("d", [weights[i] * n / total for i in range(n)])
+        small = array("i")
+        large = array("i")
+        for i in range(n):
+            if scaled[i] < 1.0:
+                small.append(i)
+            else:
+                large.append(i)
+
+        while len(small) > 0 and len(large) > 0:
+            s = small.pop()
+            l = large.pop()
+            self.threshold[s] = int(scaled[s] * self.SCALE)
+            self.alias[s] = l
+            # l gives away the rest of column s
+            scaled[l] = (scaled[l] + scaled[s]) - 1.0
+            if scaled[l] < 1.0:
+                small.append(l)
+            else:
+                large.append(l)
+        # anything left over is (up to rounding error) a full column
+        for i in small:
+            self.threshold[i] = self.SCALE
+        for i in large:
+            self.threshold[i] = self.SCALE
+
+    def __len__(self) -> int:
+        return len(self.alias)
+
+    def sample(self) -> int:
+        """ Returns a random index, drawing two numbers from RandomGen.
+            :complexity: O(1) best/worst case
+        """
+        column = RandomGen.randint(0, len(self.alias) - 1)
+        if RandomGen.random() < self.threshold[column]:
+            return column
+        return self.alias[column]
+
+    def probability(self, index: int) -> float:
+        """ The probability of sampling index, recovered from the table.
+            :complexity: O(n) best/worst case where n is the number of weights
+        """
+        n = len(self.alias)
+        p = self.threshold[index] / self.SCALE
+        for i in range(n):
+            if self.alias[i] == index and i != index:
+                p += 1 - self.threshold[i] / self.SCALE
+        return p / n
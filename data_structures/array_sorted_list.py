@@ -3,6 +3,8 @@
     Items to store should be of time ListItem.
 """
 
+from array import array
+
 from data_structures.referential_array import ArrayR
 from data_structures.sorted_list_adt import *
 
@@ -94,6 +96,117 @@ class ArraySortedList(SortedList[T]):
             return pos
         raise ValueError('item not in list')
 
+    def add_reversed(self, item: ListItem) -> None:
+        """ Add new element to a list kept back to front: read from the end with every key
+            negated, the list is what add() would have built. Equal keys go where
+            _index_to_add() puts them, so reading from the end gives the items in the same
+            order as reading a list filled with add() from the front.
+            Only the elements after the new one are shuffled to the right.
+        """
+        if self.is_full():
+            self._resize()
+
+        n = len(self)
+        lower = self._bound(item.key, False)
+        upper = self._bound(item.key, True)
+        # read from the end, n - upper items have a smaller (negated) key and upper - lower the same
+        index = n - _add_position(n - upper, upper - lower, n)
+
+        self._shuffle_right(index)
+        self.array[index] = item
+        self.length += 1
+
+    def fill_reversed(self, items) -> None:
+        """ Replace the contents of the list with items (any sequence of ListItem), in the order
+            calling add_reversed() on an empty list with each of them in turn would leave them.
+            The position add() gives an item only depends on how many items with a smaller and
+            with an equal key were added before it (see _add_position()). Those counts come from a
+            merge sort of the keys, and the final position of every item from its add() position:
+            going from the last item added to the first, each item takes the free position at
+            its add() position, as every item added after it has already taken its own.
+            O(n log n) for n items.
+        """
+        n = len(items)
+        # the list add() builds has the keys negated
+        keys = ArrayR(n)
+        for i in range(n):
+            keys[i] = -items[i].key
+        smaller = array("i", [0]) * n
+        equal = array("i", [0]) * n
+        _count_earlier(keys, smaller, equal)
+
+        # Fenwick tree of the free positions of the list add() builds, all of them free to start with
+        tree = array("i", [0]) * (n + 1)
+        for i in range(1, n + 1):
+            tree[i] = i & -i
+        top = 1
+        while top * 2 <= n:
+            top *= 2
+
+        if len(self.array) < n:
+            self.array = ArrayR(n)
+        for i in range(n - 1, -1, -1):
+            # the free position with _add_position() free positions before it
+            free = _add_position(smaller[i], equal[i], i) + 1
+            position = 0
+            step = top
+            while step > 0:
+                if position + step <= n and tree[position + step] < free:
+                    position += step
+                    free -= tree[position]
+                step //= 2
+            j = position + 1
+            while j <= n:
+                tree[j] -= 1
+                j += j & -j
+            # read back to front
+            self.array[n - 1 - position] = items[i]
+        self.length = n
+
+    def _bound(self, key, after_equal: bool) -> int:
+        """ The first position with a key larger than (after_equal), or at least (not after_equal), the given key. """
+        low = 0
+        high = len(self)
+        while low < high:
+            mid = (low + high) // 2
+            if self.array[mid].key < key or (after_equal and self.array[mid].key == key):
+                low = mid + 1
+            else:
+                high = mid
+        return low
+
+    def position_of(self, item: ListItem) -> int:
+        """ Find the position of this very item (not just an equal key) in the list. """
+        # the first position with the item's key, then the items sharing that key
+        low = 0
+        high = len(self)
+        while low < high:
+            mid = (low + high) // 2
+            if self.array[mid].key < item.key:
+                low = mid + 1
+            else:
+                high = mid
+        for i in range(low, len(self)):
+            if self.array[i] is item:
+                return i
+            if self.array[i].key != item.key:
+                break
+        raise ValueError('item not in list')
+
+    def update_key(self, item: ListItem, key) -> None:
+        """ Change the key of an item in the list, moving it to its new sorted position.
+            Only the items between its old and new positions are shifted.
+        """
+        index = self.position_of(item)
+        item.key = key
+        while index > 0 and self.array[index - 1].key > key:
+            self.array[index] = self.array[index - 1]
+            index -= 1
+        while index < len(self) - 1 and self.array[index + 1].key < key:
+            self.array[index] = self.array[index + 1]
+            index += 1
+        self.array[index] = item
+
     def is_full(self):
         """ Check if the list is full. """
         return len(self) >= len(self.array)
@@ -124,3 +237,66 @@ class ArraySortedList(SortedList[T]):
                 return mid
 
         return low
+
+
+def _add_position(smaller: int, equal: int, length: int) -> int:
+    """ The position _index_to_add() finds for a key in a list of `length` items,
+        of which the first `smaller` have a smaller key and the next `equal` the same key.
+    """
+    low = 0
+    high = length - 1
+    while low <= high:
+        mid = (low + high) // 2
+        if mid < smaller:
+            low = mid + 1
+        elif mid >= smaller + equal:
+            high = mid - 1
+        else:
+            return mid
+    return low
+
+
+def _count_earlier(keys: ArrayR, smaller: array, equal: array) -> None:
+    """ Counts, for every position i of keys, the positions before i with a smaller key
+        (added to smaller[i]) and with an equal key (added to equal[i]).
+        Bottom-up merge sort of the positions by key: when two sorted runs are merged,
+        every position of the right run comes after every position of the left one.
+        O(n log n) for n keys.
+    """
+    n = len(keys)
+    run = array("i", range(n))
+    merged = array("i", [0]) * n
+    width = 1
+    while width < n:
+        for low in range(0, n, 2 * width):
+            middle = min(low + width, n)
+            high = min(low + 2 * width, n)
+            # left positions with a smaller key, and with a key at most as large, as the current right one
+            below = low
+            at_most = low
+            left = low
+            out = low
+            for right in range(middle, high):
+                position = run[right]
+                key = keys[position]
+                while below < middle and keys[run[below]] < key:
+                    below += 1
+                if at_most < below:
+                    at_most = below
+                while at_most < middle and keys[run[at_most]] == key:
+                    at_most += 1
+                smaller[position] += below - low
+                equal[position] += at_most - below
+                # left positions go first on equal keys, which keeps the sort stable
+                while left < middle and keys[run[left]] <= key:
+                    merged[out] = run[left]
+                    left += 1
+                    out += 1
+                merged[out] = position
+                out += 1
+            while left < middle:
+                merged[out] = run[left]
+                left += 1
+                out += 1
+        run, merged = merged, run
+        width *= 2
@@ -124,6 +124,29 @@ class CircularQueue(Queue[T]):
         self.rear = 0
 
 
+class GrowableCircularQueue(CircularQueue[T]):
+    """ CircularQueue that doubles its array when full instead of raising. """
+
+    def is_full(self) -> bool:
+        """ A growable queue is never full. """
+        return False
+
+    def append(self, item: T) -> None:
+        """ Adds an element to the rear of the queue, growing the array if needed.
+            Amortised O(1): the elements are unwrapped into an array twice the size.
+        """
+        if len(self) == len(self.array):
+            new_array = ArrayR(2 * len(self.array))
+            for i in range(len(self)):
+                new_array[i] = self.array[(self.front + i) % len(self.array)]
+            self.array = new_array
+            self.front = 0
+            self.rear = len(self)
+        self.array[self.rear] = item
+        self.length += 1
+        self.rear = (self.rear + 1) % len(self.array)
+
+
 class TestQueue(unittest.TestCase):
     """ Tests for the above class."""
     EMPTY = 0
@@ -108,6 +108,24 @@ class ArrayStack(Stack[T]):
    
 
 
+class GrowableArrayStack(ArrayStack[T]):
+    """ ArrayStack that doubles its array when full instead of raising. """
+
+    def is_full(self) -> bool:
+        """ A growable stack is never full. """
+        return False
+
+    def push(self, item: T) -> None:
+        """ Pushes an element to the top of the stack, growing the array if needed.
+            Amortised O(1): the array doubles, so n pushes copy at most 2n elements.
+        """
+        if len(self) == len(self.array):
+            new_array = ArrayR(2 * len(self.array))
+            for i in range(len(self)):
+                new_array[i] = self.array[i]
+            self.array = new_array
+        self.array[len(self)] = item
+        self.length += 1
 
 
 class TestStack(unittest.TestCase):
@@ -0,0 +1,141 @@
+"""
+Packed, memory-mapped element effectiveness matrix.
+
+A compiled form of type_effectiveness.csv that EffectivenessCalculator can use
+without parsing anything: the values are read straight out of the mapped file.
+
+Layout (native byte order, recorded in the header):
+
+    header:         magic (4 bytes) | version (u16) | byte order (u8) | pad (u8)
+                    | elements e (u32) | enum size m (u32) | CSV SHA-256 (32 bytes)
+    permutation:    m x i32, the matrix row of the element with enum value v + 1 (-1 if absent)
+    names:          e x (offset u32, length u32) into the name bytes
+    name bytes:     UTF-8, padded to 8 bytes
+    matrix:         e x e f64, row = attacker, in CSV order
+
+Usage:
+    python effectiveness_matrix.py build -o type_effectiveness.mat
+    MONSTER_EFFECTIVENESS=type_effectiveness.mat python tower.py
+"""
+from __future__ import annotations
+import argparse
+import mmap
+import os
+import struct
+import sys
+from array import array
+
+from data_cache import load_cached_with_hash
+from data_structures.referential_array import ArrayR
+from elements import EFFECTIVENESS_CSV, EffectivenessCalculator, Element, _parse_csv
+
+
+MAGIC = b"MBEF"
+VERSION = 1
+# Files with this extension are loaded with load() by EffectivenessCalculator.make_singleton
+SUFFIX = ".mat"
+
+HEADER = struct.Struct("<4sHBxII32s")
+NOT_PRESENT = -1
+
+
+def build(csv_file: str) -> bytes:
+    """
+    Compiles an effectiveness CSV into matrix file bytes.
+
+    O(e^2 + m * e) complexity best/worst case
+        - e is the number of elements in the CSV and m the number of Element values
+        - every CSV header is looked up with Element.from_string once, here rather than at load time
+    """
+    (names, values), digest = load_cached_with_hash(csv_file, _parse_csv)
+    e = len(names)
+    m = len(Element)
+
+    permutation = array("i", [NOT_PRESENT]) * m
+    name_refs = array("I")
+    name_bytes = bytearray()
+    for row in range(e):
+        permutation[Element.from_string(names[row]).value - 1] = row
+        encoded = names[row].encode()
+        name_refs.extend((len(name_bytes), len(encoded)))
+        name_bytes += encoded
+    name_bytes += bytes(_align(len(name_bytes)) - len(name_bytes))
+
+    header = HEADER.pack(MAGIC, VERSION, sys.byteorder == "big", e, m, bytes.fromhex(digest))
+    data = bytearray(header)
+    data += permutation.tobytes()
+    data += name_refs.tobytes()
+    data += bytes(_align(len(data)) - len(data))
+    data += name_bytes
+    data += array("d", values).tobytes()
+    return bytes(data)
+
+
+def write(path: str, csv_file: str) -> None:
+    """Builds a matrix file and atomically replaces path with it."""
+    data = build(csv_file)
+    temporary = f"{path}.{os.getpid()}.tmp"
+    with open(temporary, "wb") as f:
+        f.write(data)
+    os.replace(temporary, path)
+
+
+def _align(size: int) -> int:
+    return (size + 7) // 8 * 8
+
+
+def load(path: str) -> EffectivenessCalculator:
+    """
+    Maps a matrix file and returns an EffectivenessCalculator reading from it.
+    The permutation and matrix are memoryviews over the mapping, nothing is copied.
+
+    O(e) complexity best/worst case where e is the number of elements (to decode their names)
+    :raises ValueError: if the file is not a matrix file of this version and byte order,
+        or was built for a different set of Element values
+    """
+    with open(path, "rb") as f:
+        mapping = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    if len(mapping) < HEADER.size:
+        raise ValueError("Not an effectiveness matrix file.")
+    magic, version, big_endian, e, m, digest = HEADER.unpack_from(mapping, 0)
+    if magic != MAGIC:
+        raise ValueError("Not an effectiveness matrix file.")
+    if version != VERSION:
+        raise ValueError(f"Unsupported effectiveness matrix version {version}.")
+    if big_endian != (sys.byteorder == "big"):
+        raise ValueError("The effectiveness matrix was built on a machine with a different byte order.")
+    if m != len(Element):
+        raise ValueError(f"The effectiveness matrix was built for {m} elements, not {len(Element)}.")
+
+    view = memoryview(mapping)
+    offset = HEADER.size
+    permutation = view[offset:offset + 4 * m].cast("i")
+    offset += 4 * m
+    name_refs = view[offset:offset + 8 * e].cast("I")
+    offset = _align(offset + 8 * e)
+    names = ArrayR(e)
+    end = offset
+    for i in range(e):
+        start = offset + name_refs[2 * i]
+        names[i] = bytes(view[start:start + name_refs[2 * i + 1]]).decode()
+        end = max(end, start + name_refs[2 * i + 1])
+    offset = _align(end)
+    if offset + 8 * e * e > len(mapping):
+        raise ValueError("Truncated effectiveness matrix file.")
+    values = view[offset:offset + 8 * e * e].cast("d")
+
+    calculator = EffectivenessCalculator(names, values, element_index_map=permutation)
+    calculator.source_hash = digest.hex()
+    return calculator
+
+
+if __name__ == "__main__":
+    p = argparse.ArgumentParser(description="Compile the effectiveness table into a packed matrix file.")
+    commands = p.add_subparsers(dest="command", required=True)
+    b = commands.add_parser("build", help="Build a matrix file from an effectiveness CSV.")
+    b.add_argument("-o", "--output", required=True, help=f"Where to write the matrix (use a {SUFFIX} extension).")
+    b.add_argument("--csv", default=EFFECTIVENESS_CSV, help="The type_effectiveness.csv to compile.")
+    args = p.parse_args()
+
+    write(args.output, args.csv)
+    print(f"Wrote {args.output}")
@@ -1,12 +1,24 @@
 from __future__ import annotations
 
+import os
+from array import array
 from enum import auto
 from typing import Optional
 
 from base_enum import BaseEnum
 
+from data_cache import load_cached_with_hash
 from data_structures.referential_array import ArrayR
 
+
+# The effectiveness table shipped next to this file.
+EFFECTIVENESS_CSV = os.path.join(os.path.dirname(os.path.abspath(__file__)), "type_effectiveness.csv")
+
+# The effectiveness table is read from here the first time it is needed.
+# Defaults to EFFECTIVENESS_CSV, or $MONSTER_EFFECTIVENESS (a CSV or a compiled .mat file) if it is set.
+EFFECTIVENESS_PATH = os.environ.get("MONSTER_EFFECTIVENESS", EFFECTIVENESS_CSV)
+
+
 class Element(BaseEnum):
     """
     Element Class to store all different elements as constants, and associate indicies with them.
@@ -54,13 +66,20 @@ class EffectivenessCalculator:
 
     Usage:
         EffectivenessCalculator.get_effectiveness(elem1, elem2)
+
+    Other rule sets can be loaded side by side with the default one, and queried through their instances:
+        rules = EffectivenessCalculator.load_rules("rebalanced", "rebalanced.csv")
+        rules.effectiveness(elem1, elem2)
     """
 
     # Optional[EffectivenessCalculator] is a type hint that says that this variable can be either None or an EffectivenessCalculator
     # instance is a class variable that stores the singleton instance of EffectivenessCalculator
     instance: Optional[EffectivenessCalculator] = None
 
-    def __init__(self, element_names: ArrayR[str], effectiveness_values: ArrayR[float]) -> None:
+    # named rule sets loaded with load_rules(), see also default()
+    rule_sets: dict[str, EffectivenessCalculator] = {}
+
+    def __init__(self, element_names: ArrayR[str], effectiveness_values: ArrayR[float], element_index_map: Optional[ArrayR[int]]=None) -> None:
         """
         Initialise the Effectiveness Calculator.
 
@@ -76,6 +95,9 @@ class EffectivenessCalculator:
         Fire is half effective to Fire and Water, and double effective to Grass [0.5, 0.5, 2]
         Water is double effective to Fire, and half effective to Water and Grass [2, 0.5, 0.5]
         Grass is half effective to Fire and Grass, and double effective to Water [0.5, 2, 0.5]
+
+        The optional third parameter is a precomputed element_index_map (see below), e.g. read from a
+        compiled matrix file (see effectiveness_matrix). When given, the element names are not looked up.
         """
 
 
@@ -85,6 +107,17 @@ class EffectivenessCalculator:
         #ArrayR of size n*n, containing all effectiveness values
         self.effectiveness_values = effectiveness_values
 
+        # name given to load_rules(), None for the default rule set
+        self.name: Optional[str] = None
+
+        # SHA-256 of the file the values were loaded from, if known
+        self.source_hash: Optional[str] = None
+
+        # the table in Element enum order, see matrix()
+        self.enum_matrix: Optional[array] = None
+        # the multipliers against element pairs, see combined_matrix(), built at the end of __init__
+        self.combined: Optional[array] = None
+
 
 
                                                         ##### COMPLEXITY ANALYSIS #####
@@ -106,12 +139,18 @@ class EffectivenessCalculator:
     
         # This is a map that maps the index of the element to the index of the effectiveness value
         # [element enum value] -> [index of element name value in element_names array]
-        self.element_index_map = ArrayR(len(self.element_names))
-        for i in range(len(self.element_names)):
-
-            # set the index of the element to the index of the element name in the element_names array
-                # this is done by the from_string method which returns the element enum value
-            self.element_index_map[Element.from_string(self.element_names[i]).value-1] = i
+        if element_index_map is not None:
+            self.element_index_map = element_index_map
+        else:
+            self.element_index_map = ArrayR(len(self.element_names))
+            for i in range(len(self.element_names)):
+
+                # set the index of the element to the index of the element name in the element_names array
+                    # this is done by the from_string method which returns the element enum value
+                self.element_index_map[Element.from_string(self.element_names[i]).value-1] = i
+
+        # precomputed at load time so attacks never pay for it, O(m^3) for the m Element values (see combined_table())
+        self.combined_table()
     
     
     @classmethod
@@ -146,6 +185,10 @@ class EffectivenessCalculator:
             # This allows us to access the instance/object of EffectivenessCalculator
             # cls.instance is an object with two attributes: element_names and effectiveness_values that are managed in the from_csv function
         instance = cls.instance
+        if instance is None:
+            # the table is loaded on first use
+            cls.make_singleton()
+            instance = cls.instance
 
         # # Here we are getting the array of effectives values from the instance variable
         effectiveness_values = instance.effectiveness_values
@@ -165,6 +208,162 @@ class EffectivenessCalculator:
 
 
 
+    @classmethod
+    def default(cls) -> EffectivenessCalculator:
+        """Returns the process-wide calculator used when no rule set is given, loading it on the first call."""
+        if cls.instance is None:
+            cls.make_singleton()
+        return cls.instance
+
+    @classmethod
+    def load_rules(cls, name: str, path: str) -> EffectivenessCalculator:
+        """
+        Loads a named rule set (an effectiveness CSV or compiled .mat file), alongside the default one.
+        Rule sets are cached by name: loading a name again returns the rule set already loaded.
+        """
+        rules = cls.rule_sets.get(name)
+        if rules is None:
+            rules = cls.rule_sets[name] = _load(path)
+            rules.name = name
+        return rules
+
+    @classmethod
+    def get_rules(cls, name: str) -> EffectivenessCalculator:
+        """
+        Returns a rule set loaded with load_rules().
+        :raises KeyError: if no rule set has that name
+        """
+        return cls.rule_sets[name]
+
+    def effectiveness(self, type1: Element, type2: Element) -> float:
+        """The effectiveness of type1 attacking type2 under this rule set. O(1)"""
+        return self.enum_table()[(type1.value - 1) * len(Element) + (type2.value - 1)]
+
+    def combined_effectiveness(self, attacker: Element, defenders: tuple[Element, ...]) -> float:
+        """The effectiveness of attacker against one or two defending elements under this rule set. O(1)"""
+        return self.combined_table()[self.attacking_offset(attacker) + self.defending_index(defenders)]
+
+    def enum_table(self) -> array:
+        """
+        This rule set's table in Element enum order, see matrix().
+
+        O(m^2) complexity on the first call where m is the number of Element values, O(1) after that
+        """
+        if self.enum_matrix is None:
+            m = len(Element)
+            n = len(self.element_names)
+            rows = self.element_index_map
+            values = self.effectiveness_values
+            enum_matrix = array("d", [0.0]) * (m * m)
+            for a in range(m):
+                for d in range(m):
+                    enum_matrix[a * m + d] = values[rows[a] * n + rows[d]]
+            self.enum_matrix = enum_matrix
+        return self.enum_matrix
+
+    def combined_table(self) -> array:
+        """
+        This rule set's multipliers against element sets, see combined_matrix().
+
+        O(m^3) complexity on the first call where m is the number of Element values, O(1) after that
+        """
+        if self.combined is None:
+            m = len(Element)
+            table = self.enum_table()
+            combined = array("d", [0.0]) * (m * m * (m + 1))
+            for a in range(m):
+                row = a * m * (m + 1)
+                for first in range(m):
+                    single = table[a * m + first]
+                    column = first * (m + 1)
+                    combined[row + column] = single
+                    for second in range(m):
+                        combined[row + column + second + 1] = single * table[a * m + second]
+            self.combined = combined
+        return self.combined
+
+    @classmethod
+    def matrix(cls) -> array:
+        """
+        Returns the whole default table in Element enum order: the effectiveness of the element with
+        value a attacking the element with value d is at index (a-1) * len(Element) + (d-1).
+
+        The table is remapped from file order once per instance and the same array is returned
+        on every call, so it must not be modified.
+
+        O(m^2) complexity on the first call where m is the number of Element values, O(1) after that
+        """
+        return cls.default().enum_table()
+
+    @classmethod
+    def defending_index(cls, elements: tuple[Element, ...]) -> int:
+        """
+        The column of a defending element set (one or two elements) in combined_matrix().
+        Single elements use the sentinel 0 as their second element.
+
+        O(1) complexity best/worst case
+        :raises ValueError: for an empty set or more than two elements
+        """
+        if len(elements) == 0 or len(elements) > 2:
+            raise ValueError(f"A monster has one or two elements, not {len(elements)}.")
+        second = elements[1].value if len(elements) == 2 else 0
+        return (elements[0].value - 1) * (len(Element) + 1) + second
+
+    @classmethod
+    def attacking_offset(cls, element: Element) -> int:
+        """The offset of an attacking element's row in combined_matrix(). O(1)"""
+        m = len(Element)
+        return (element.value - 1) * m * (m + 1)
+
+    @classmethod
+    def combined_matrix(cls) -> array:
+        """
+        Returns the effectiveness of every attacking element against every defending
+        element set of one or two elements, which is the product of its effectiveness
+        against each defending element (default rule set).
+
+        The multiplier of attacker against defenders is at
+        attacking_offset(attacker) + defending_index(defenders), so a hit costs a single lookup.
+        Built once per instance from matrix(), and the same array is returned on every call.
+
+        O(m^3) complexity on the first call where m is the number of Element values, O(1) after that
+        """
+        return cls.default().combined_table()
+
+    @classmethod
+    def get_combined_effectiveness(cls, attacker: Element, defenders: tuple[Element, ...]) -> float:
+        """
+        Returns the effectiveness of attacker against a monster with one or two elements.
+
+        O(1) complexity best/worst case (after the first call to combined_matrix())
+        """
+        return cls.combined_matrix()[cls.attacking_offset(attacker) + cls.defending_index(defenders)]
+
+    @classmethod
+    def get_effectiveness_many(cls, attackers, defenders) -> array:
+        """
+        Returns the effectiveness of attackers[i] attacking defenders[i] for every i.
+        Both sequences must have the same length and hold either Element members or their values.
+
+        O(n) complexity best/worst case where n is the number of pairs (after the first call to matrix())
+        :raises ValueError: if the sequences have different lengths
+        """
+        if len(attackers) != len(defenders):
+            raise ValueError(f"Got {len(attackers)} attackers but {len(defenders)} defenders.")
+        table = cls.matrix()
+        m = len(Element)
+        n = len(attackers)
+        result = array("d", [0.0]) * n
+        for i in range(n):
+            a = attackers[i]
+            d = defenders[i]
+            if isinstance(a, Element):
+                a = a.value
+            if isinstance(d, Element):
+                d = d.value
+            result[i] = table[(a - 1) * m + (d - 1)]
+        return result
+
     @classmethod
     def from_csv(cls, csv_file: str) -> EffectivenessCalculator:
         # NOTE: This is a terrible way to open csv files, if writing your own code use the `csv` module.
@@ -176,25 +375,47 @@ class EffectivenessCalculator:
         rest is the rest of the csv file (the effectiveness values)
         """
         
-        with open(csv_file, "r") as file:
-            header, rest = file.read().strip().split("\n", maxsplit=1)
-            header = header.split(",")
-            rest = rest.replace("\n", ",").split(",")
-            a_header = ArrayR(len(header))
-            a_all = ArrayR(len(rest))
-            for i in range(len(header)):
-                a_header[i] = header[i]
-            for i in range(len(rest)):
-                a_all[i] = float(rest[i])
-            return EffectivenessCalculator(a_header, a_all)
+        # the split header and float values are cached across processes (see data_cache)
+        (header, rest), digest = load_cached_with_hash(csv_file, _parse_csv)
+        a_header = ArrayR(len(header))
+        a_all = ArrayR(len(rest))
+        for i in range(len(header)):
+            a_header[i] = header[i]
+        for i in range(len(rest)):
+            a_all[i] = rest[i]
+        calculator = EffectivenessCalculator(a_header, a_all)
+        calculator.source_hash = digest
+        return calculator
         
 
     # Over here we just make an instance of the class where it has the element names and effectiveness values as attributes
+    # This now happens on the first call to get_effectiveness, not on import
     @classmethod
-    def make_singleton(cls):
-        cls.instance = EffectivenessCalculator.from_csv("type_effectiveness.csv")
-
-EffectivenessCalculator.make_singleton()
+    def make_singleton(cls, csv_file: Optional[str]=None):
+        if csv_file is None and EFFECTIVENESS_PATH == EFFECTIVENESS_CSV:
+            # a compiled bundle ($MONSTER_BUNDLE), if there is one, replaces the default csv file
+            # but not one given with $MONSTER_EFFECTIVENESS
+            from bundle import get_bundle
+            game_data = get_bundle()
+            if game_data is not None:
+                cls.instance = game_data.effectiveness(EFFECTIVENESS_CSV)
+                return
+        cls.instance = _load(csv_file or EFFECTIVENESS_PATH)
+
+
+def _load(path: str) -> EffectivenessCalculator:
+    if path.endswith(".mat"):
+        # a compiled matrix file, see effectiveness_matrix
+        from effectiveness_matrix import load
+        return load(path)
+    return EffectivenessCalculator.from_csv(path)
+
+
+def _parse_csv(source: bytes) -> tuple[list[str], list[float]]:
+    header, rest = source.decode().strip().split("\n", maxsplit=1)
+    header = header.split(",")
+    rest = rest.replace("\n", ",").split(",")
+    return (header, [float(value) for value in rest])
 
 
 if __name__ == "__main__":
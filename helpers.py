@@ -1,71 +1,79 @@
 from __future__ import annotations
-import yaml
-from typing import TYPE_CHECKING
+import os
+from typing import Optional, TYPE_CHECKING
 
 from data_structures.referential_array import ArrayR
+from registry import MonsterBaseFactory, MonsterRegistry
 
 if TYPE_CHECKING:
     from monster_base import MonsterBase
 
 
-_monsters: ArrayR[MonsterBase] = None
+# The catalog shipped next to this file.
+DEFAULT_CATALOG_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "monsters.yaml")
 
+# The catalog is read from here the first time it is needed.
+# Defaults to DEFAULT_CATALOG_PATH, or $MONSTER_CATALOG if it is set.
+CATALOG_PATH = os.environ.get("MONSTER_CATALOG", DEFAULT_CATALOG_PATH)
+
+_registry: Optional[MonsterRegistry] = None
+
+
+def set_catalog_path(path: str) -> None:
+    """
+    Use a different catalog file. It is loaded lazily, on the next call to get_all_monsters().
+    """
+    global CATALOG_PATH, _registry
+    CATALOG_PATH = path
+    _registry = None
+
+
+def load_catalog(path: str, streaming: bool=False) -> MonsterRegistry:
+    """
+    Loads a catalog into its own registry, independent of the default one.
+    :streaming: Read the file one record at a time (see MonsterRegistry.stream_file), for very large catalogs.
+    """
+    if streaming:
+        return MonsterRegistry.stream_file(path)
+    return MonsterRegistry.from_file(path)
+
+
+def get_registry() -> MonsterRegistry:
+    """
+    Returns the registry of the default catalog (CATALOG_PATH, or the bundle at bundle.BUNDLE_PATH
+    if one is set and no other catalog was given), loading it on the first call.
+    :raises ValueError: if the bundle was built from another version of the catalog file
+    """
+    global _registry
+    if _registry is None:
+        # a compiled bundle ($MONSTER_BUNDLE), if there is one, replaces the default catalog file
+        # but not one given with $MONSTER_CATALOG or set_catalog_path()
+        from bundle import get_bundle
+        game_data = get_bundle() if CATALOG_PATH == DEFAULT_CATALOG_PATH else None
+        if game_data is not None:
+            _registry = game_data.registry(CATALOG_PATH)
+        else:
+            _registry = MonsterRegistry.from_file(CATALOG_PATH)
+    return _registry
 
-def MonsterBaseFactory(name, description, evolution, element, simple_stats, complex_stats, can_be_spawned) -> type[MonsterBase]:
-    from monster_base import MonsterBase
-    return type(name, (MonsterBase, ), {
-        "get_name": classmethod(lambda s: name),
-        "get_description": classmethod(lambda s: description),
-        # This will be defined later when we have all names.
-        "get_evolution": classmethod(lambda s: None),
-        "get_element": classmethod(lambda s: element),
-        "get_simple_stats": classmethod(lambda s: simple_stats),
-        "get_complex_stats": classmethod(lambda s: complex_stats),
-        "can_be_spawned": classmethod(lambda s: can_be_spawned),
-    })
 
 def get_all_monsters():
-    if _monsters is None:
-        _make_all_monster_classes()
-    return _monsters
-
-def _make_all_monster_classes():
-    from stats import SimpleStats, ComplexStats
-    global _monsters
-    with open("monsters.yaml", "r") as f:
-        monsters_yaml = yaml.safe_load(f)
-    _monsters = ArrayR(len(monsters_yaml))
-    idx = 0
-    for monster in monsters_yaml:
-        simple = monster["simple"]
-        complex = monster["complex"]
-        new_class = MonsterBaseFactory(
-            monster["name"],
-            monster["description"],
-            monster.get("evolution", None),
-            monster["element"],
-            SimpleStats(simple["attack"], simple["defense"], simple["speed"], simple["max_hp"]),
-            ComplexStats(
-                ArrayR.from_list(str(complex["attack"]).split()),
-                ArrayR.from_list(str(complex["defense"]).split()),
-                ArrayR.from_list(str(complex["speed"]).split()),
-                ArrayR.from_list(str(complex["max_hp"]).split()),
-            ),
-            monster.get("can_be_spawned", False)
-        )
-        globals()[monster["name"]] = new_class
-        _monsters[idx] = new_class
-        idx += 1
-    # Now assign evolution
-    for monster in monsters_yaml:
-        evolution = monster.get("evolution", None)
-        if evolution is None:
-            continue
-        evolution_class = globals()[evolution]
-        globals()[monster["name"]].evolution_class = evolution_class
-        globals()[monster["name"]].get_evolution = classmethod(lambda s: s.evolution_class)
-
-get_all_monsters()
+    """
+    Returns every monster class in the default catalog, loading the catalog on the first call.
+    """
+    return get_registry().monsters
+
+def __getattr__(name: str) -> type[MonsterBase]:
+    """
+    Called for names that are not module globals, so that
+    `from helpers import Flamikin` finds Flamikin in the default catalog.
+    """
+    if not name.startswith("__"):
+        try:
+            return get_registry().get(name)
+        except KeyError:
+            pass
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 if TYPE_CHECKING:
     # Makes no sense but fixes the red squigglies
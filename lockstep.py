@@ -0,0 +1,292 @@
+"""
+Lockstep engine for running many independent battles at once.
+
+Instead of one `Battle` object per fight with live monster instances, every
+battle's state is kept in flat typed arrays (struct-of-arrays), indexed by
+
+    side index:  b * 2 + s              (s = 0 for team 1, 1 for team 2)
+    slot index:  (b * 2 + s) * L + k    (k = position of the monster in the team, L = team capacity)
+
+Each turn advances every unfinished battle through the same phases as
+`Battle.process_turn` (choose actions, swap, attack, bleed, faint / level up /
+evolve, retrieve), each phase being a pass over the columns of all active battles.
+
+Actions for all active battles are chosen with one batched call to an
+ActionPolicy. By default this is policies.HeuristicPolicy, and every team's own
+policy must make the same decisions (see ActionPolicy.cache_key), as the teams'
+policies are not asked one by one. A batch-capable policy given to the engine
+plays both teams of every battle instead of their own policies.
+Only FRONT/BACK teams, simple-mode stats and catalog monsters are supported. With simple stats every
+monster's attack, defense and speed are fixed by its class, so the damage of any
+attacker class against any defender class is computed once up front.
+
+Usage:
+    engine = LockstepBattles(pairs)   # ArrayR of (team1, team2) tuples
+    results = engine.run()            # ArrayR[Battle.Result]
+"""
+from __future__ import annotations
+from array import array
+from typing import Optional
+
+from battle import Battle
+from catalog import CatalogColumns, NO_MONSTER
+from elements import EffectivenessCalculator
+from policies import ActionPolicy, HeuristicPolicy, HEURISTIC_KEY
+from team import MonsterTeam
+
+from data_structures.referential_array import ArrayR
+
+
+ACTION_ATTACK = Battle.Action.ATTACK.value
+ACTION_SWAP = Battle.Action.SWAP.value
+
+RESULT_NONE = 0
+RESULT_TEAM1 = Battle.Result.TEAM1.value
+RESULT_TEAM2 = Battle.Result.TEAM2.value
+RESULT_DRAW = Battle.Result.DRAW.value
+
+
+class LockstepBattles:
+
+    def __init__(
+        self,
+        pairs: ArrayR[tuple[MonsterTeam, MonsterTeam]],
+        columns: Optional[CatalogColumns]=None,
+        policy: Optional[ActionPolicy]=None,
+        rules: Optional[EffectivenessCalculator]=None,
+    ) -> None:
+        """
+        Loads the starting state of every (team1, team2) pair.
+
+        :policy: Plays both teams of every battle instead of their own policies. By default the teams
+            are played by policies.HeuristicPolicy, and their own policies must decide the same way.
+        :rules: The effectiveness rule set the battles are fought under. Defaults to the process-wide one.
+            If columns are given, they must have been built with the same rule set.
+
+        Battles start from each team's regenerated state (its provided monsters,
+        in order). The MonsterTeam objects themselves are not modified.
+
+        O(b * L) complexity best/worst case where b is the number of battles and L the team capacity
+        :raises ValueError: on an unsupported team, on a team whose policy is not played (see :policy:),
+            or on a policy that cannot choose actions in batches
+        """
+        if columns is not None and columns.rules is not rules:
+            raise ValueError("The catalog columns were built with a different rule set.")
+        self.columns = columns or CatalogColumns(rules=rules)
+        if policy is None:
+            for b in range(len(pairs)):
+                for team in pairs[b]:
+                    if team.policy.cache_key() != HEURISTIC_KEY:
+                        raise ValueError(
+                            f"Battle {b} has a team played by {type(team.policy).__name__}, "
+                            "the lockstep engine only plays the default policy unless one is given."
+                        )
+        self.policy = policy or HeuristicPolicy(self.columns)
+        if not self.policy.supports_batch():
+            raise ValueError(f"{type(self.policy).__name__} cannot choose actions in batches.")
+        self.n_battles = len(pairs)
+        # room for the largest team (teams can be given a team_limit above TEAM_LIMIT)
+        L = MonsterTeam.TEAM_LIMIT
+        for b in range(self.n_battles):
+            for team in pairs[b]:
+                L = max(L, team.team_limit)
+        self.capacity = L
+        sides = self.n_battles * 2
+
+        # per slot
+        self.cls = array("i", [NO_MONSTER]) * (sides * L)
+        self.hp = array("i", [0]) * (sides * L)
+        self.level = array("i", [0]) * (sides * L)
+
+        # per side: the container is a ring of slot numbers
+        self.order = array("i", [0]) * (sides * L)
+        self.head = array("i", [0]) * sides
+        self.count = array("i", [0]) * sides
+        self.is_back = array("b", [0]) * sides
+        self.out = array("i", [0]) * sides
+
+        # per battle
+        self.result = array("b", [RESULT_NONE]) * self.n_battles
+        self.turns = array("i", [0]) * self.n_battles
+        self.active = array("i", range(self.n_battles))
+
+        for b in range(self.n_battles):
+            team1, team2 = pairs[b]
+            self._load_side(b * 2, team1)
+            self._load_side(b * 2 + 1, team2)
+
+        # Battle.battle retrieves both out monsters before the first turn
+        for side in range(sides):
+            self.out[side] = self._retrieve(side)
+
+    def _load_side(self, side: int, team: MonsterTeam) -> None:
+        if team.team_mode == MonsterTeam.TeamMode.BACK:
+            self.is_back[side] = 1
+        elif team.team_mode != MonsterTeam.TeamMode.FRONT:
+            raise ValueError(f"Team mode {team.team_mode} is not supported by the lockstep engine.")
+
+        columns = self.columns
+        L = self.capacity
+        k = 0
+        for monster in team.provided_monsters:
+            if monster is None:
+                break
+            cls = columns.index_of(monster)
+            slot = side * L + k
+            self.cls[slot] = cls
+            self.hp[slot] = columns.max_hp[cls]
+            self.level[slot] = 1
+            # both containers start in provided order (the top of a FRONT stack is the last one)
+            self.order[slot] = k
+            k += 1
+        self.count[side] = k
+
+    def _retrieve(self, side: int) -> int:
+        """Serve (BACK) or pop (FRONT) a slot number from a side's container. O(1)"""
+        L = self.capacity
+        self.count[side] -= 1
+        if self.is_back[side]:
+            k = self.order[side * L + self.head[side]]
+            self.head[side] = (self.head[side] + 1) % L
+        else:
+            k = self.order[side * L + self.count[side]]
+        return k
+
+    def _add(self, side: int, k: int) -> None:
+        """Append (BACK) or push (FRONT) a slot number onto a side's container. O(1)"""
+        L = self.capacity
+        if self.is_back[side]:
+            self.order[side * L + (self.head[side] + self.count[side]) % L] = k
+        else:
+            self.order[side * L + self.count[side]] = k
+        self.count[side] += 1
+
+    def step(self) -> int:
+        """
+        Advances every unfinished battle by one turn.
+        Returns the number of battles still running.
+
+        Every phase is a pass over columns with one entry per active side (team 1 of
+        battle i at position 2i, team 2 at 2i + 1), so the partner of position i is i ^ 1.
+
+        O(b) complexity best/worst case where b is the number of active battles
+            - every phase is a constant number of passes over the active sides
+            - every per-side operation is an O(1) array access
+        """
+        columns = self.columns
+        damage = columns.damage
+        speed = columns.speed
+        n_cls = len(columns.monsters)
+        L = self.capacity
+        cls = self.cls
+        hp = self.hp
+        out = self.out
+        count = self.count
+        active = self.active
+        n_sides = len(active) * 2
+
+        for b in active:
+            self.turns[b] += 1
+
+        sides = array("i", [0]) * n_sides
+        sides[0::2] = array("i", [b * 2 for b in active])
+        sides[1::2] = array("i", [b * 2 + 1 for b in active])
+
+        # Phase 1: choose actions for both sides of every active battle in one policy call
+        slots = array("i", [side * L + out[side] for side in sides])
+        out_cls = array("i", [cls[slot] for slot in slots])
+        out_hp = array("i", [hp[slot] for slot in slots])
+        enemy_cls = array("i", [0]) * n_sides
+        enemy_cls[0::2] = out_cls[1::2]
+        enemy_cls[1::2] = out_cls[0::2]
+        enemy_hp = array("i", [0]) * n_sides
+        enemy_hp[0::2] = out_hp[1::2]
+        enemy_hp[1::2] = out_hp[0::2]
+        actions = self.policy.choose_actions(out_cls, out_hp, enemy_cls, enemy_hp)
+
+        # Phase 2: swaps, masked on action == SWAP
+        for i in [i for i in range(n_sides) if actions[i] == ACTION_SWAP]:
+            side = sides[i]
+            self._add(side, out[side])
+            out[side] = self._retrieve(side)
+            slots[i] = side * L + out[side]
+
+        # Phase 3: attacks, masked on action == ATTACK. An attacker strikes first unless both attack
+        # and its enemy is faster (equal speeds strike together), in which case it strikes back if still alive.
+        out_cls = array("i", [cls[slot] for slot in slots])
+        attacks = [action == ACTION_ATTACK for action in actions]
+        first = [
+            attacks[i] and (not attacks[i ^ 1] or speed[out_cls[i]] >= speed[out_cls[i ^ 1]])
+            for i in range(n_sides)
+        ]
+        for i in [i for i in range(n_sides) if first[i]]:
+            hp[slots[i ^ 1]] -= damage[out_cls[i] * n_cls + out_cls[i ^ 1]]
+        for i in [i for i in range(n_sides) if attacks[i] and not first[i]]:
+            if hp[slots[i]] > 0:
+                hp[slots[i ^ 1]] -= damage[out_cls[i] * n_cls + out_cls[i ^ 1]]
+
+        # Phase 4: bleed when both out monsters are alive
+        alive = [hp[slot] > 0 for slot in slots]
+        for i in [i for i in range(0, n_sides, 2) if alive[i] and alive[i + 1]]:
+            hp[slots[i]] -= 1
+            hp[slots[i + 1]] -= 1
+        alive = [hp[slot] > 0 for slot in slots]
+
+        # Phase 5: results. A side loses when its out monster fainted and its team is empty
+        lost = [not alive[i] and count[sides[i]] == 0 for i in range(n_sides)]
+        still_active = array("i")
+        for i in range(0, n_sides, 2):
+            b = sides[i] // 2
+            if lost[i] and lost[i + 1]:
+                self.result[b] = RESULT_DRAW
+            elif lost[i]:
+                self.result[b] = RESULT_TEAM2
+            elif lost[i + 1]:
+                self.result[b] = RESULT_TEAM1
+            else:
+                still_active.append(b)
+
+        # Phase 6: in unfinished battles a monster that made its enemy faint levels up / evolves,
+        # and fainted monsters are replaced
+        running = [self.result[side // 2] == RESULT_NONE for side in sides]
+        for i in [i for i in range(n_sides) if running[i] and alive[i] and not alive[i ^ 1]]:
+            self._level_up(slots[i])
+        for i in [i for i in range(n_sides) if running[i] and not alive[i]]:
+            side = sides[i]
+            out[side] = self._retrieve(side)
+
+        self.active = still_active
+        return len(still_active)
+
+    def _level_up(self, slot: int) -> None:
+        """
+        MonsterBase.level_up followed by MonsterBase.evolve.
+        Simple stats do not depend on the level, so levelling only changes the level.
+        Evolving keeps the difference between max HP and current HP.
+        """
+        columns = self.columns
+        self.level[slot] += 1
+        cls = self.cls[slot]
+        evolution = columns.evolution[cls]
+        if evolution != NO_MONSTER:
+            difference = columns.max_hp[cls] - self.hp[slot]
+            self.cls[slot] = evolution
+            self.hp[slot] = columns.max_hp[evolution] - difference
+
+    def run(self, max_turns: Optional[int]=None) -> ArrayR[Optional[Battle.Result]]:
+        """
+        Steps until every battle is finished (or max_turns turns have been played).
+        Battles that have not finished have a result of None.
+        """
+        turn = 0
+        while len(self.active) > 0 and (max_turns is None or turn < max_turns):
+            self.step()
+            turn += 1
+        return self.get_results()
+
+    def get_results(self) -> ArrayR[Optional[Battle.Result]]:
+        results = ArrayR(self.n_battles)
+        for b in range(self.n_battles):
+            if self.result[b] != RESULT_NONE:
+                results[b] = Battle.Result(self.result[b])
+        return results
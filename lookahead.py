@@ -0,0 +1,239 @@
+"""
+Search-based action policy.
+
+LookaheadPolicy tries every action (ATTACK, SWAP, SPECIAL) for its own team a few
+turns ahead on a forked copy of the battle, assuming the enemy plays its team's
+choose_action, and picks the action with the best outcome.
+
+Evaluated positions are cached in a fixed-size transposition table keyed by a
+Zobrist hash of both teams (out monsters, HP, levels and container order) and of
+the team the position is searched for, as values are relative to that team.
+Every decision has a node budget and a time budget, after which unexplored
+positions are scored with the static evaluation instead of being searched.
+Positions whose search was cut short by a budget are not stored in the table.
+
+Usage:
+    battle = Battle()
+    team1 = MonsterTeam(..., policy=LookaheadPolicy(battle, depth=2))
+    battle.battle(team1, team2)
+"""
+from __future__ import annotations
+import random
+import time
+from typing import Optional
+
+from battle import Battle, BattleSnapshot
+from monster_base import MonsterBase
+from policies import ActionPolicy, DEFAULT_POLICY
+
+from data_structures.referential_array import ArrayR
+
+
+WIN = 2.0
+LOSS = -2.0
+DRAW = 0.0
+
+
+class TranspositionTable:
+    """
+    Fixed-size hash table of evaluated positions. Each slot holds (hash, depth, value)
+    and a new entry always replaces whatever was in its slot.
+
+    O(1) complexity best/worst case for get and put
+    """
+
+    def __init__(self, size: int) -> None:
+        self.size = size
+        self.entries: ArrayR[Optional[tuple[int, int, float]]] = ArrayR(size)
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: int, depth: int) -> Optional[float]:
+        """Returns the stored value of a position if it was searched at least `depth` turns deep."""
+        entry = self.entries[key % self.size]
+        if entry is not None and entry[0] == key and entry[1] >= depth:
+            self.hits += 1
+            return entry[2]
+        self.misses += 1
+        return None
+
+    def put(self, key: int, depth: int, value: float) -> None:
+        self.entries[key % self.size] = (key, depth, value)
+
+
+class ZobristHasher:
+    """
+    Zobrist hashing of battle snapshots.
+
+    Every (team, position, feature, value) combination is given its own random
+    64 bit key the first time it is seen, and the hash of a position is the XOR of
+    the keys of all of its features. Position 0 is the out monster, positions 1..n
+    follow the container order.
+    """
+
+    def __init__(self, seed: int = 0x5EED) -> None:
+        # A private generator so hashing never consumes numbers from RandomGen.
+        self.random = random.Random(seed)
+        self.keys: dict[tuple, int] = {}
+
+    def _key(self, feature: tuple) -> int:
+        key = self.keys.get(feature)
+        if key is None:
+            key = self.keys[feature] = self.random.getrandbits(64)
+        return key
+
+    def _hash_monster(self, side: int, position: int, state: tuple) -> int:
+        cls, _, level, hp, evolve_ready = state
+        return (
+            self._key((side, position, "class", cls))
+            ^ self._key((side, position, "hp", hp))
+            ^ self._key((side, position, "level", level, evolve_ready))
+        )
+
+    def _hash_team(self, side: int, out: tuple, team: tuple) -> int:
+        sort_direction, monsters = team
+        h = self._key((side, "direction", sort_direction)) ^ self._hash_monster(side, 0, out)
+        for position in range(len(monsters)):
+            state = monsters[position]
+            if len(state) == 2:
+                # OPTIMISE teams store (monster, key) pairs
+                state = state[0]
+            h ^= self._hash_monster(side, position + 1, state)
+        return h
+
+    def hash(self, snapshot: BattleSnapshot, side: int = 0) -> int:
+        """
+        :side: The team the position is searched for (0 for none). Values are relative to that team,
+            so the same position searched for each team hashes differently.
+
+        O(n) complexity best/worst case where n is the number of monsters in both teams
+        """
+        return (
+            self._key(("side", side))
+            ^ self._hash_team(1, snapshot.out1, snapshot.team1)
+            ^ self._hash_team(2, snapshot.out2, snapshot.team2)
+        )
+
+
+class LookaheadPolicy(ActionPolicy):
+
+    ACTIONS = (Battle.Action.ATTACK, Battle.Action.SWAP, Battle.Action.SPECIAL)
+
+    def __init__(
+        self,
+        battle: Battle,
+        depth: int = 2,
+        max_nodes: int = 500,
+        time_budget: float = 0.01,
+        table_size: int = 1 << 14,
+    ) -> None:
+        """
+        :battle: The battle this policy plays in.
+        :depth: How many turns ahead to search.
+        :max_nodes: Maximum number of turns simulated per decision.
+        :time_budget: Maximum seconds spent per decision.
+        :table_size: Number of slots in the transposition table.
+        """
+        self.battle = battle
+        self.depth = depth
+        self.max_nodes = max_nodes
+        self.time_budget = time_budget
+        self.table = TranspositionTable(table_size)
+        self.hasher = ZobristHasher()
+        self.nodes = 0
+        self.deadline = 0.0
+        # number of positions scored statically because a budget ran out, see _search()
+        self.cutoffs = 0
+
+    def choose_action(self, currently_out: MonsterBase, enemy: MonsterBase) -> Battle.Action:
+        """
+        Searches for the best action of the team whose out monster is currently_out.
+
+        O(min(max_nodes, 3^depth) * n) complexity where n is the number of monsters in both teams
+            - every simulated turn restores and hashes a snapshot of both teams
+        """
+        battle = self.battle
+        if currently_out is battle.out1:
+            side = 1
+        elif currently_out is battle.out2:
+            side = 2
+        else:
+            # not called from this battle (e.g. from inside another search), fall back to the heuristic
+            return DEFAULT_POLICY.choose_action(currently_out, enemy)
+
+        self.nodes = 0
+        self.deadline = time.perf_counter() + self.time_budget
+        root = battle.snapshot()
+        scratch = battle.fork(root)
+
+        best_action = Battle.Action.ATTACK
+        best_value = None
+        try:
+            for action in self.ACTIONS:
+                value = self._play(scratch, root, side, action, self.depth - 1)
+                if best_value is None or value > best_value:
+                    best_action = action
+                    best_value = value
+        finally:
+            scratch.release()
+        return best_action
+
+    def _play(self, scratch: Battle, snapshot: BattleSnapshot, side: int, action: Battle.Action, depth: int) -> float:
+        """Plays one turn from `snapshot` with our team taking `action`, then searches on from there."""
+        self.nodes += 1
+        scratch.restore(snapshot)
+        if side == 1:
+            enemy_action = scratch.team2.choose_action(scratch.out2, scratch.out1)
+            result = scratch.play_actions(action, enemy_action)
+        else:
+            enemy_action = scratch.team1.choose_action(scratch.out1, scratch.out2)
+            result = scratch.play_actions(enemy_action, action)
+
+        if result is not None:
+            if result == Battle.Result.DRAW:
+                return DRAW
+            won = (result == Battle.Result.TEAM1) == (side == 1)
+            return WIN if won else LOSS
+        return self._search(scratch, scratch.snapshot(), side, depth)
+
+    def _search(self, scratch: Battle, snapshot: BattleSnapshot, side: int, depth: int) -> float:
+        if depth <= 0:
+            return self.evaluate(snapshot, side)
+        if self.nodes >= self.max_nodes or time.perf_counter() >= self.deadline:
+            self.cutoffs += 1
+            return self.evaluate(snapshot, side)
+
+        key = self.hasher.hash(snapshot, side)
+        cached = self.table.get(key, depth)
+        if cached is not None:
+            return cached
+
+        cutoffs = self.cutoffs
+        best = LOSS
+        for action in self.ACTIONS:
+            best = max(best, self._play(scratch, snapshot, side, action, depth - 1))
+        # a value is only exact (and worth reusing) if no budget ran out below this position
+        if self.cutoffs == cutoffs:
+            self.table.put(key, depth, best)
+        return best
+
+    @staticmethod
+    def evaluate(snapshot: BattleSnapshot, side: int) -> float:
+        """
+        Static evaluation in (-1, 1): the share of the remaining HP on the board that belongs to our team.
+
+        O(n) complexity best/worst case where n is the number of monsters in both teams
+        """
+        hp1 = _team_hp(snapshot.out1, snapshot.team1)
+        hp2 = _team_hp(snapshot.out2, snapshot.team2)
+        score = (hp1 - hp2) / (hp1 + hp2 + 1)
+        return score if side == 1 else -score
+
+
+def _team_hp(out: tuple, team: tuple) -> int:
+    total = max(out[3], 0)
+    for state in team[1]:
+        if len(state) == 2:
+            state = state[0]
+        total += max(state[3], 0)
+    return total
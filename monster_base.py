@@ -1,12 +1,17 @@
 from __future__ import annotations
 import abc
 import math
+from typing import Optional
 from elements import EffectivenessCalculator, Element
 
 from stats import Stats
 
 class MonsterBase(abc.ABC):
 
+    # Instances only hold their own state. Class-level data (stats, element, evolution...)
+    # is shared through the class. Subclasses made by registry.MonsterBaseFactory add no slots.
+    __slots__ = ("simple_mode", "level", "evolve_ready", "stats", "hp", "observer")
+
     def __init__(self, simple_mode=True, level:int=1) -> None:
         """
         Initialise an instance of a monster.
@@ -18,6 +23,9 @@ class MonsterBase(abc.ABC):
         self.simple_mode = simple_mode
         self.level = level
 
+        # told about every HP change with observer.monster_changed(self), see MonsterTeam.monster_changed
+        self.observer = None
+
         # set that the monster is not ready to evolve (lvl needs be different to original)
         self.evolve_ready = False
 
@@ -63,6 +71,9 @@ class MonsterBase(abc.ABC):
 
         #we just set the hp to the value passed in
         self.hp = val
+        # level_up() and evolve_in_place() end with set_hp(), so level and stat changes are reported here too
+        if self.observer is not None:
+            self.observer.monster_changed(self)
 
     def get_attack(self):
         """Get the attack of this monster instance"""
@@ -89,8 +100,11 @@ class MonsterBase(abc.ABC):
   
 
 
-    def attack(self, other: MonsterBase):
-        """Attack another monster instance"""
+    def attack(self, other: MonsterBase, rules: Optional[EffectivenessCalculator]=None):
+        """
+        Attack another monster instance.
+        :rules: The effectiveness rule set to use. Defaults to the process-wide one.
+        """
         # Step 1: Compute attack stat vs. defense stat
         # Step 2: Apply type effectiveness
         # Step 3: Ceil to int
@@ -103,7 +117,9 @@ class MonsterBase(abc.ABC):
         else:
             damage = self.get_attack() / 4
 
-        effective_damage = damage * EffectivenessCalculator.get_effectiveness(Element.from_string(self.get_element()), Element.from_string(other.get_element()))
+        # the multiplier against all of the other monster's elements is precomputed, see EffectivenessCalculator.combined_matrix()
+        table = EffectivenessCalculator.combined_matrix() if rules is None else rules.combined_table()
+        effective_damage = damage * table[self.attacking_offset() + other.defending_index()]
         
         effective_damage = math.ceil(effective_damage)
 
@@ -128,9 +144,86 @@ class MonsterBase(abc.ABC):
             evolved_monster.set_hp(evolved_monster.get_max_hp() - difference)
             return evolved_monster
         return self
-    
 
-            
+    def evolve_in_place(self) -> MonsterBase:
+        """
+        Evolve this monster instance without creating a new one: the instance switches to the
+        evolved class (and its shared stats), keeping its level and the HP missing from max HP.
+        Returns the evolved monster, which is this instance unless one of the classes adds
+        instance attributes of its own (then it falls back to evolve()).
+
+        O(1) complexity best/worst case
+        """
+        if not self.ready_to_evolve():
+            return self
+        evolution = self.get_evolution()
+        if not self._can_become(evolution):
+            return self.evolve()
+        difference = self.get_max_hp() - self.get_hp()
+        self.__class__ = evolution
+        self.stats = evolution.get_simple_stats() if self.simple_mode else evolution.get_complex_stats()
+        self.evolve_ready = False
+        self.set_hp(self.get_max_hp() - difference)
+        return self
+
+    def respawn(self, monster_class: type[MonsterBase], level: int=1) -> MonsterBase:
+        """
+        Resets this instance to a freshly spawned monster_class(simple_mode, level), reusing the instance.
+        Returns the reset monster, which is a new instance if this one cannot change to monster_class
+        (see evolve_in_place()).
+
+        O(1) complexity best/worst case
+        """
+        if not self._can_become(monster_class):
+            return monster_class(simple_mode=self.simple_mode, level=level)
+        self.__class__ = monster_class
+        self.level = level
+        self.evolve_ready = False
+        self.stats = monster_class.get_simple_stats() if self.simple_mode else monster_class.get_complex_stats()
+        self.hp = self.get_max_hp()
+        return self
+
+    def _can_become(self, monster_class: type[MonsterBase]) -> bool:
+        """
+        Whether this instance can switch its class to monster_class. Both classes must lay their
+        instances out like MonsterBase (no __dict__, no extra slots).
+
+        O(1) complexity best/worst case
+        """
+        cls = type(self)
+        if cls is monster_class:
+            return True
+        return not (cls.__dictoffset__ or monster_class.__dictoffset__) and cls.__basicsize__ == monster_class.__basicsize__
+
+    def snapshot(self) -> tuple:
+        """
+        Returns an immutable copy of the state of this monster instance.
+        The stats objects are shared by every monster of the same class, so only the class is stored.
+
+        O(1) complexity best/worst case
+        """
+        return (type(self), self.simple_mode, self.level, self.hp, self.evolve_ready)
+
+    @staticmethod
+    def from_snapshot(state: tuple) -> MonsterBase:
+        """
+        Creates a new monster instance from a state returned by snapshot().
+        __init__ is skipped as every attribute is restored directly.
+
+        O(1) complexity best/worst case
+        """
+        cls, simple_mode, level, hp, evolve_ready = state
+        monster = cls.__new__(cls)
+        monster.simple_mode = simple_mode
+        monster.level = level
+        monster.evolve_ready = evolve_ready
+        monster.stats = cls.get_simple_stats() if simple_mode else cls.get_complex_stats()
+        monster.hp = hp
+        monster.observer = None
+        return monster
+
+
+
     #method for str(obj)
     def __str__(self) -> str:
         return f"LV.{self.get_level()} {self.get_name()}, {self.get_hp()}/{self.get_max_hp()} HP"
@@ -170,6 +263,51 @@ class MonsterBase(abc.ABC):
         """
         pass
 
+    @classmethod
+    def get_elements(cls) -> tuple[str, ...]:
+        """
+        Returns the one or two elements of the Monster. The first one is get_element().
+        Same for all monsters of the same type.
+        """
+        return (cls.get_element(), )
+
+    @classmethod
+    def element_values(cls) -> tuple[int, ...]:
+        """
+        The Element values of get_elements(). Cached on the class after the first call,
+        so every monster of a type returns the same tuple.
+        """
+        values = cls.__dict__.get("_element_values")
+        if values is None:
+            values = tuple(Element.from_string(element).value for element in cls.get_elements())
+            cls._element_values = values
+        return values
+
+    @classmethod
+    def attacking_offset(cls) -> int:
+        """
+        The row of this monster type's attacks in EffectivenessCalculator.combined_matrix().
+        Attacks use the first element only. Cached on the class after the first call.
+        """
+        offset = cls.__dict__.get("_attacking_offset")
+        if offset is None:
+            offset = EffectivenessCalculator.attacking_offset(Element.from_string(cls.get_element()))
+            cls._attacking_offset = offset
+        return offset
+
+    @classmethod
+    def defending_index(cls) -> int:
+        """
+        The column of this monster type's elements in EffectivenessCalculator.combined_matrix().
+        Cached on the class after the first call.
+        """
+        index = cls.__dict__.get("_defending_index")
+        if index is None:
+            elements = tuple(Element.from_string(element) for element in cls.get_elements())
+            index = EffectivenessCalculator.defending_index(elements)
+            cls._defending_index = index
+        return index
+
     @classmethod
     @abc.abstractmethod
     def can_be_spawned(cls) -> bool:
@@ -179,6 +317,15 @@ class MonsterBase(abc.ABC):
         """
         pass
 
+    @classmethod
+    def get_spawn_weight(cls) -> Optional[float]:
+        """
+        Returns how likely this monster type is to be spawned, relative to the other
+        spawnable types, or None if the catalog does not give it a weight.
+        Same for all monsters of the same type.
+        """
+        return None
+
     @classmethod
     @abc.abstractmethod
     def get_simple_stats(cls) -> Stats:
@@ -0,0 +1,182 @@
+"""
+Action policies used by MonsterTeam to decide what to do each turn.
+
+A policy answers the same question as MonsterTeam.choose_action, either for a
+single pair of monsters, or for many (currently_out, enemy) pairs at once given
+as arrays of catalog indices and HP values:
+
+    policy.choose_action(currently_out, enemy)                     -> Battle.Action
+    policy.choose_actions(out_cls, out_hp, enemy_cls, enemy_hp)    -> array of Battle.Action values
+
+Batch evaluation assumes simple stats, where a monster's speed only depends on its class.
+Policies built without catalog columns use the current default catalog, and read
+it again once helpers.set_catalog_path() has replaced it.
+"""
+from __future__ import annotations
+import abc
+from array import array
+from typing import Optional, TYPE_CHECKING
+
+from catalog import CatalogColumns, speed_column
+from helpers import get_registry
+
+if TYPE_CHECKING:
+    from battle import Battle
+    from monster_base import MonsterBase
+    from registry import MonsterRegistry
+
+
+# cache_key() of HeuristicPolicy and TablePolicy, which make the same decisions
+HEURISTIC_KEY = "heuristic"
+
+
+class ActionPolicy(abc.ABC):
+
+    @abc.abstractmethod
+    def choose_action(self, currently_out: MonsterBase, enemy: MonsterBase) -> Battle.Action:
+        """Choose the action of the team whose out monster is currently_out."""
+        pass
+
+    def supports_batch(self) -> bool:
+        """Whether choose_actions is implemented."""
+        return False
+
+    def cache_key(self) -> Optional[str]:
+        """
+        A name shared by every policy that makes the same decisions, for caching battle results
+        (see battle_cache.BattleCache). None if the decisions depend on more than the two monsters
+        (e.g. a search with a time budget), in which case battles of the team are never cached.
+        """
+        return None
+
+    def choose_actions(self, out_cls: array, out_hp: array, enemy_cls: array, enemy_hp: array) -> array:
+        """
+        Choose actions for many (currently_out, enemy) pairs at once.
+        Pair i is described by the catalog index and HP of both monsters at position i of the arrays.
+        Returns an array of Battle.Action values.
+        """
+        raise NotImplementedError(f"{type(self).__name__} cannot choose actions in batches.")
+
+
+class HeuristicPolicy(ActionPolicy):
+    """
+    The default policy: attack when at least as fast as, or with at least as much HP as, the enemy. Swap otherwise.
+    """
+
+    def __init__(self, columns: CatalogColumns | None = None) -> None:
+        # Batches only need the speed of every catalog class. Without columns it is read
+        # from the default catalog on first use, and again whenever that catalog changes.
+        self.follows_catalog = columns is None
+        self.registry = None if columns is None else columns.registry
+        self.speed = None if columns is None else columns.speed
+
+    def choose_action(self, currently_out: MonsterBase, enemy: MonsterBase) -> Battle.Action:
+        """
+        O(1) complexity best/worst case
+        """
+        from battle import Battle
+        if currently_out.get_speed() >= enemy.get_speed() or currently_out.get_hp() >= enemy.get_hp():
+            return Battle.Action.ATTACK
+        return Battle.Action.SWAP
+
+    def supports_batch(self) -> bool:
+        return True
+
+    def cache_key(self) -> Optional[str]:
+        return HEURISTIC_KEY
+
+    def choose_actions(self, out_cls: array, out_hp: array, enemy_cls: array, enemy_hp: array) -> array:
+        """
+        O(n) complexity best/worst case where n is the number of pairs
+        O(m) complexity more the first time, and after the default catalog changed, for a catalog of m monster classes
+        """
+        from battle import Battle
+        if self.follows_catalog and self.registry is not get_registry():
+            self.registry = get_registry()
+            self.speed = speed_column(self.registry)
+        speed = self.speed
+        attack = Battle.Action.ATTACK.value
+        swap = Battle.Action.SWAP.value
+        n = len(out_cls)
+        actions = array("b", [0]) * n
+        for i in range(n):
+            if speed[out_cls[i]] >= speed[enemy_cls[i]] or out_hp[i] >= enemy_hp[i]:
+                actions[i] = attack
+            else:
+                actions[i] = swap
+        return actions
+
+
+class TablePolicy(ActionPolicy):
+    """
+    The default heuristic, with the speed comparison of every (out class, enemy class)
+    pair in the catalog precomputed into a table. Only the HP comparison is left to do per decision.
+
+    Monsters whose class is not in the catalog fall back to HeuristicPolicy.
+
+    O(m^2) complexity to build where m is the number of monster classes in the catalog
+    """
+
+    def __init__(self, columns: CatalogColumns | None = None) -> None:
+        # without columns, the table is built for the default catalog and again whenever it changes
+        self.follows_catalog = columns is None
+        if columns is None:
+            registry = get_registry()
+            self._build(registry, speed_column(registry))
+        else:
+            self._build(columns.registry, columns.speed)
+        self.fallback = HeuristicPolicy()
+
+    def _build(self, registry: MonsterRegistry, speed: array) -> None:
+        m = len(speed)
+        self.registry = registry
+        self.n_classes = m
+        self.class_index = registry.class_index
+        # faster_or_equal[out * m + enemy] is 1 if the out class is at least as fast as the enemy class
+        self.faster_or_equal = array("b", [0]) * (m * m)
+        for o in range(m):
+            for e in range(m):
+                self.faster_or_equal[o * m + e] = speed[o] >= speed[e]
+
+    def choose_action(self, currently_out: MonsterBase, enemy: MonsterBase) -> Battle.Action:
+        """
+        O(1) complexity best/worst case
+        """
+        from battle import Battle
+        o = self.class_index.get(type(currently_out))
+        e = self.class_index.get(type(enemy))
+        if o is None or e is None or not currently_out.simple_mode or not enemy.simple_mode:
+            return self.fallback.choose_action(currently_out, enemy)
+        if self.faster_or_equal[o * self.n_classes + e] or currently_out.get_hp() >= enemy.get_hp():
+            return Battle.Action.ATTACK
+        return Battle.Action.SWAP
+
+    def supports_batch(self) -> bool:
+        return True
+
+    def cache_key(self) -> Optional[str]:
+        return HEURISTIC_KEY
+
+    def choose_actions(self, out_cls: array, out_hp: array, enemy_cls: array, enemy_hp: array) -> array:
+        """
+        O(n) complexity best/worst case where n is the number of pairs
+        """
+        from battle import Battle
+        if self.follows_catalog and self.registry is not get_registry():
+            registry = get_registry()
+            self._build(registry, speed_column(registry))
+        m = self.n_classes
+        table = self.faster_or_equal
+        attack = Battle.Action.ATTACK.value
+        swap = Battle.Action.SWAP.value
+        n = len(out_cls)
+        actions = array("b", [0]) * n
+        for i in range(n):
+            if table[out_cls[i] * m + enemy_cls[i]] or out_hp[i] >= enemy_hp[i]:
+                actions[i] = attack
+            else:
+                actions[i] = swap
+        return actions
+
+
+DEFAULT_POLICY = HeuristicPolicy()
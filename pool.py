@@ -0,0 +1,304 @@
+"""
+Struct-of-arrays storage for monster instances.
+
+A MonsterPool keeps the state of many monsters in parallel typed arrays
+(class index, level, HP, max HP, evolve_ready, simple_mode), one slot per monster.
+PooledMonster handles give a slot the MonsterBase API (get_hp, set_hp, attack,
+level_up, evolve, ...), so teams and battles can use them in place of monster
+instances, while bulk operations work on whole arrays at once:
+
+    pool = MonsterPool()
+    team = MonsterTeam(..., pool=pool)
+    pool.heal_all()                 # one slice assignment: hp[:] = max_hp[:]
+
+Pooled monsters read their stats from their class's stats objects. Methods
+overridden on a monster class (e.g. a subclass redefining get_max_hp) are not used.
+"""
+from __future__ import annotations
+from array import array
+from typing import Optional, TYPE_CHECKING
+
+from monster_base import MonsterBase
+
+if TYPE_CHECKING:
+    from stats import Stats
+
+
+class MonsterPool:
+
+    def __init__(self) -> None:
+        # class table: slot class index -> monster class
+        self.classes: list[type[MonsterBase]] = []
+        self.class_index: dict[type[MonsterBase], int] = {}
+
+        # per slot
+        self.cls = array("i")
+        self.level = array("i")
+        self.hp = array("i")
+        self.max_hp = array("i")
+        self.evolve_ready = array("b")
+        self.simple_mode = array("b")
+        self.in_use = array("b")
+        self.handles: list[PooledMonster] = []
+        # the observer of each slot, see MonsterBase.observer
+        self.observers: list = []
+
+        # slots released by free(), reused before the arrays grow
+        self.free_slots = array("i")
+
+    def __len__(self) -> int:
+        """Number of monsters currently in the pool. O(1)"""
+        return len(self.cls) - len(self.free_slots)
+
+    def _class_index(self, monster_class: type[MonsterBase]) -> int:
+        index = self.class_index.get(monster_class)
+        if index is None:
+            index = self.class_index[monster_class] = len(self.classes)
+            self.classes.append(monster_class)
+        return index
+
+    def spawn(self, monster_class: type[MonsterBase], simple_mode: bool=True, level: int=1) -> PooledMonster:
+        """
+        Adds a monster with full HP to the pool, like monster_class(simple_mode, level).
+
+        O(1) complexity (amortised, the arrays grow by appending)
+        """
+        handle = self._allocate(monster_class, simple_mode, level, 0, False)
+        self.max_hp[handle.slot] = self.hp[handle.slot] = handle._compute_max_hp()
+        return handle
+
+    def from_snapshot(self, state: tuple) -> PooledMonster:
+        """Adds a monster restored from a MonsterBase.snapshot() / PooledMonster.snapshot() state. O(1) amortised"""
+        monster_class, simple_mode, level, hp, evolve_ready = state
+        handle = self._allocate(monster_class, simple_mode, level, hp, evolve_ready)
+        self.max_hp[handle.slot] = handle._compute_max_hp()
+        return handle
+
+    def _allocate(self, monster_class: type[MonsterBase], simple_mode: bool, level: int, hp: int, evolve_ready: bool) -> PooledMonster:
+        cls = self._class_index(monster_class)
+        if len(self.free_slots) > 0:
+            slot = self.free_slots.pop()
+            self.cls[slot] = cls
+            self.level[slot] = level
+            self.hp[slot] = hp
+            self.evolve_ready[slot] = evolve_ready
+            self.simple_mode[slot] = simple_mode
+            self.in_use[slot] = True
+            self.observers[slot] = None
+            return self.handles[slot]
+        slot = len(self.cls)
+        self.cls.append(cls)
+        self.level.append(level)
+        self.hp.append(hp)
+        self.max_hp.append(0)
+        self.evolve_ready.append(evolve_ready)
+        self.simple_mode.append(simple_mode)
+        self.in_use.append(True)
+        self.observers.append(None)
+        handle = PooledMonster(self, slot)
+        self.handles.append(handle)
+        return handle
+
+    def get(self, slot: int) -> PooledMonster:
+        """
+        The handle of a slot. There is one handle per slot, so handles can be compared with `is`. O(1)
+        """
+        return self.handles[slot]
+
+    def free(self, monster: PooledMonster) -> None:
+        """
+        Releases a monster's slot for reuse. Its handle must not be used afterwards
+        (it will be handed out again by a later spawn). O(1) amortised
+        """
+        if monster.pool is not self or not self.in_use[monster.slot]:
+            raise ValueError(f"{monster} is not in this pool.")
+        self.in_use[monster.slot] = False
+        self.observers[monster.slot] = None
+        self.free_slots.append(monster.slot)
+
+    def heal_all(self) -> None:
+        """
+        Restores every slot to full HP with a single array write. Free slots are healed too, harmlessly.
+        Then the observer of every observed slot (e.g. the team it is in) is told its monster changed.
+
+        O(n) complexity best/worst case where n is the number of slots, done by one slice assignment
+        plus a scan of the observers (and one monster_changed() call per observed monster)
+        """
+        self.hp[:] = self.max_hp
+        observers = self.observers
+        for slot in range(len(observers)):
+            if observers[slot] is not None:
+                observers[slot].monster_changed(self.handles[slot])
+
+    def heal(self, monsters) -> None:
+        """Restores some monsters to full HP, telling their observers. O(k) for k monsters"""
+        for monster in monsters:
+            if monster is None:
+                break
+            self.hp[monster.slot] = self.max_hp[monster.slot]
+            monster._changed()
+
+
+class PooledMonster:
+    """
+    Handle to one slot of a MonsterPool, with the API of a MonsterBase instance.
+    """
+
+    __slots__ = ("pool", "slot")
+
+    def __init__(self, pool: MonsterPool, slot: int) -> None:
+        self.pool = pool
+        self.slot = slot
+
+    def get_class(self) -> type[MonsterBase]:
+        """The monster class this slot currently holds. O(1)"""
+        return self.pool.classes[self.pool.cls[self.slot]]
+
+    @property
+    def observer(self):
+        return self.pool.observers[self.slot]
+
+    @observer.setter
+    def observer(self, observer) -> None:
+        self.pool.observers[self.slot] = observer
+
+    def _changed(self) -> None:
+        observer = self.pool.observers[self.slot]
+        if observer is not None:
+            observer.monster_changed(self)
+
+    @property
+    def simple_mode(self) -> bool:
+        return bool(self.pool.simple_mode[self.slot])
+
+    @property
+    def stats(self) -> Stats:
+        monster_class = self.get_class()
+        return monster_class.get_simple_stats() if self.simple_mode else monster_class.get_complex_stats()
+
+    def _stat(self, name: str) -> int:
+        stats = self.stats
+        if self.pool.simple_mode[self.slot]:
+            return getattr(stats, name)()
+        return getattr(stats, name)(self.pool.level[self.slot])
+
+    def _compute_max_hp(self) -> int:
+        return self._stat("get_max_hp")
+
+    def get_level(self) -> int:
+        return self.pool.level[self.slot]
+
+    def level_up(self) -> None:
+        """MonsterBase.level_up: the level goes up by one, keeping the HP missing from max HP. O(1)"""
+        pool = self.pool
+        slot = self.slot
+        difference = pool.max_hp[slot] - pool.hp[slot]
+        pool.level[slot] += 1
+        pool.max_hp[slot] = self._compute_max_hp()
+        pool.hp[slot] = pool.max_hp[slot] - difference
+        pool.evolve_ready[slot] = True
+        self._changed()
+
+    def get_hp(self) -> int:
+        return self.pool.hp[self.slot]
+
+    def set_hp(self, val: int) -> None:
+        self.pool.hp[self.slot] = val
+        self._changed()
+
+    def get_attack(self) -> int:
+        return self._stat("get_attack")
+
+    def get_defense(self) -> int:
+        return self._stat("get_defense")
+
+    def get_speed(self) -> int:
+        return self._stat("get_speed")
+
+    def get_max_hp(self) -> int:
+        return self.pool.max_hp[self.slot]
+
+    def alive(self) -> bool:
+        return self.pool.hp[self.slot] > 0
+
+    # the same damage formula and single table lookup as a monster instance
+    attack = MonsterBase.attack
+
+    def ready_to_evolve(self) -> bool:
+        return self.get_evolution() is not None and bool(self.pool.evolve_ready[self.slot])
+
+    def evolve(self) -> PooledMonster:
+        """
+        Evolves this monster in place: the slot changes class, keeping its level and the
+        HP missing from max HP. Returns this handle, like MonsterBase.evolve returns the evolved monster.
+
+        O(1) complexity best/worst case
+        """
+        if not self.ready_to_evolve():
+            return self
+        pool = self.pool
+        slot = self.slot
+        difference = pool.max_hp[slot] - pool.hp[slot]
+        pool.cls[slot] = pool._class_index(self.get_evolution())
+        pool.evolve_ready[slot] = False
+        pool.max_hp[slot] = self._compute_max_hp()
+        pool.hp[slot] = pool.max_hp[slot] - difference
+        self._changed()
+        return self
+
+    def respawn(self, monster_class: type[MonsterBase], level: int=1) -> PooledMonster:
+        """MonsterBase.respawn: resets this slot to a freshly spawned monster_class with full HP. Returns this handle. O(1)"""
+        pool = self.pool
+        slot = self.slot
+        pool.cls[slot] = pool._class_index(monster_class)
+        pool.level[slot] = level
+        pool.evolve_ready[slot] = False
+        pool.max_hp[slot] = pool.hp[slot] = self._compute_max_hp()
+        return self
+
+    # handles always evolve in place
+    evolve_in_place = evolve
+
+    def snapshot(self) -> tuple:
+        """The same state tuple as MonsterBase.snapshot(). O(1)"""
+        pool = self.pool
+        slot = self.slot
+        return (self.get_class(), self.simple_mode, pool.level[slot], pool.hp[slot], bool(pool.evolve_ready[slot]))
+
+    def __str__(self) -> str:
+        return f"LV.{self.get_level()} {self.get_name()}, {self.get_hp()}/{self.get_max_hp()} HP"
+
+    # class level information comes from the monster class
+
+    def get_name(self) -> str:
+        return self.get_class().get_name()
+
+    def get_description(self) -> str:
+        return self.get_class().get_description()
+
+    def get_evolution(self) -> Optional[type[MonsterBase]]:
+        return self.get_class().get_evolution()
+
+    def get_element(self) -> str:
+        return self.get_class().get_element()
+
+    def get_elements(self) -> tuple[str, ...]:
+        return self.get_class().get_elements()
+
+    def element_values(self) -> tuple[int, ...]:
+        return self.get_class().element_values()
+
+    def can_be_spawned(self) -> bool:
+        return self.get_class().can_be_spawned()
+
+    def get_simple_stats(self) -> Stats:
+        return self.get_class().get_simple_stats()
+
+    def get_complex_stats(self) -> Stats:
+        return self.get_class().get_complex_stats()
+
+    def attacking_offset(self) -> int:
+        return self.get_class().attacking_offset()
+
+    def defending_index(self) -> int:
+        return self.get_class().defending_index()
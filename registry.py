@@ -0,0 +1,387 @@
+"""
+Registry of the monster classes generated from a catalog.
+
+Each catalog gets its own MonsterRegistry, so several catalogs can be loaded side
+by side without their classes clobbering each other. Classes can be looked up in
+O(1) by name, by catalog index, or (for a class) its catalog index.
+
+Usage:
+    registry = MonsterRegistry.from_file("monsters.yaml")
+    registry = MonsterRegistry.stream_file("huge.jsonl")      # one record in memory at a time
+    Flamikin = registry.get("Flamikin")
+    registry.index_of(Flamikin)        # 0
+    registry[0]                        # Flamikin
+    registry.spawnable                 # ArrayR of the catalog indices of spawnable monsters
+    registry.sample_spawnable()        # a random spawnable class, see spawn_weight below
+    registry.final_form_of(Flamikin)   # Infernox, see the evolution chain table below
+
+The `element` of a catalog entry is either one element name or a list of two for
+dual-element monsters, see MonsterBase.get_elements().
+
+Catalog entries may give an optional `spawn_weight`. If any spawnable monster has
+one, spawns are drawn in proportion to the weights (monsters without one weigh 1.0)
+from an alias table built at load time. Otherwise every spawnable monster is equally likely.
+"""
+from __future__ import annotations
+from array import array
+from typing import BinaryIO, Iterator, Optional, TYPE_CHECKING
+
+from data_cache import load_cached_with_hash
+from data_structures.alias_table import AliasTable
+from data_structures.referential_array import ArrayR
+from elements import Element
+from random_gen import RandomGen
+
+if TYPE_CHECKING:
+    from monster_base import MonsterBase
+
+# evolution chain table markers, see MonsterRegistry._build_evolution_chains
+NO_EVOLUTION = -1
+UNRESOLVED = -1
+WALKING = -2
+
+
+def MonsterBaseFactory(name, description, evolution, element, simple_stats, complex_stats, can_be_spawned, spawn_weight=None) -> type[MonsterBase]:
+    """
+    :element: The element name, or a list of one or two element names for dual-element monsters.
+    """
+    from monster_base import MonsterBase
+    elements = (element, ) if isinstance(element, str) else tuple(element)
+    return type(name, (MonsterBase, ), {
+        # keep instances free of a __dict__, see MonsterBase.__slots__
+        "__slots__": (),
+        "get_name": classmethod(lambda s: name),
+        "get_description": classmethod(lambda s: description),
+        # This will be defined later when we have all names.
+        "get_evolution": classmethod(lambda s: None),
+        "get_element": classmethod(lambda s: elements[0]),
+        "get_elements": classmethod(lambda s: elements),
+        "get_simple_stats": classmethod(lambda s: simple_stats),
+        "get_complex_stats": classmethod(lambda s: complex_stats),
+        "can_be_spawned": classmethod(lambda s: can_be_spawned),
+        "get_spawn_weight": classmethod(lambda s: spawn_weight),
+    })
+
+
+def parse_yaml(source: bytes) -> list[dict]:
+    # PyYAML is only imported when a catalog actually has to be parsed (not when it is cached)
+    import yaml
+    return yaml.safe_load(source)
+
+
+def iter_yaml_records(stream: BinaryIO) -> Iterator[dict]:
+    """
+    Yields the entries of a YAML catalog (a top level sequence) one at a time.
+    Only the node tree of the current entry is held in memory, never the whole document.
+    """
+    import yaml
+    loader = yaml.SafeLoader(stream)
+    try:
+        loader.get_event()      # StreamStartEvent
+        if loader.check_event(yaml.StreamEndEvent):
+            return
+        loader.get_event()      # DocumentStartEvent
+        if not loader.check_event(yaml.SequenceStartEvent):
+            raise ValueError("A monster catalog must be a list of monsters.")
+        loader.get_event()
+        while not loader.check_event(yaml.SequenceEndEvent):
+            node = loader.compose_node(None, None)
+            yield loader.construct_object(node, deep=True)
+            # forget the entry once it has been handed over
+            loader.constructed_objects.clear()
+            loader.anchors.clear()
+    finally:
+        loader.dispose()
+
+
+def iter_jsonl_records(stream: BinaryIO) -> Iterator[dict]:
+    """Yields the entries of a JSON Lines catalog (one JSON object per line), skipping blank lines."""
+    import json
+    for line in stream:
+        if line.strip():
+            yield json.loads(line)
+
+
+REQUIRED_FIELDS = ("name", "description", "element", "simple", "complex")
+STAT_FIELDS = ("attack", "defense", "speed", "max_hp")
+
+
+def _make_class(record: dict, position: int) -> type[MonsterBase]:
+    """
+    Creates the class for one catalog entry (without its evolution).
+    :raises ValueError: if the entry is missing fields
+    """
+    from stats import SimpleStats, ComplexStats
+
+    if not isinstance(record, dict):
+        raise ValueError(f"Catalog entry {position} is not a mapping.")
+    for field in REQUIRED_FIELDS:
+        if field not in record:
+            raise ValueError(f"Catalog entry {position} has no {field}.")
+    simple = record["simple"]
+    complex = record["complex"]
+    for field in STAT_FIELDS:
+        if field not in simple or field not in complex:
+            raise ValueError(f"Monster {record['name']} has no {field} stat.")
+    elements = record["element"]
+    if isinstance(elements, str):
+        elements = [elements]
+    if not isinstance(elements, list) or not 1 <= len(elements) <= 2:
+        raise ValueError(f"Monster {record['name']} must have one or two elements.")
+    # raises ValueError for unknown elements
+    values = [Element.from_string(element) for element in elements]
+    if len(values) == 2 and values[0] == values[1]:
+        # the multiplier against the pair would be the element's one squared
+        raise ValueError(f"Monster {record['name']} has the element {elements[0]} twice.")
+
+    return MonsterBaseFactory(
+        record["name"],
+        record["description"],
+        record.get("evolution", None),
+        elements,
+        SimpleStats(simple["attack"], simple["defense"], simple["speed"], simple["max_hp"]),
+        ComplexStats(
+            ArrayR.from_list(str(complex["attack"]).split()),
+            ArrayR.from_list(str(complex["defense"]).split()),
+            ArrayR.from_list(str(complex["speed"]).split()),
+            ArrayR.from_list(str(complex["max_hp"]).split()),
+        ),
+        record.get("can_be_spawned", False),
+        record.get("spawn_weight", None),
+    )
+
+
+def _set_evolution(monster: type[MonsterBase], evolution: type[MonsterBase]) -> None:
+    monster.evolution_class = evolution
+    monster.get_evolution = classmethod(lambda s: s.evolution_class)
+
+
+def _resize(array: ArrayR, size: int) -> ArrayR:
+    """Copies the first min(len(array), size) items into a new array of the given size. O(size)"""
+    resized = ArrayR(size)
+    for i in range(min(len(array), size)):
+        resized[i] = array[i]
+    return resized
+
+
+class MonsterRegistry:
+
+    def __init__(self, monsters: ArrayR[type[MonsterBase]], source_hash: Optional[str]=None) -> None:
+        """
+        Indexes a complete set of monster classes (evolutions already assigned).
+        Use from_file / from_records to build one from a catalog.
+
+        O(n) complexity best/worst case where n is the number of monster classes
+        """
+        self.monsters = monsters
+        # SHA-256 of the catalog file this registry was loaded from, if any
+        self.source_hash = source_hash
+        self.by_name: dict[str, type[MonsterBase]] = {}
+        self.class_index: dict[type[MonsterBase], int] = {}
+
+        n_spawnable = 0
+        for i in range(len(monsters)):
+            monster = monsters[i]
+            if monster.get_name() in self.by_name:
+                raise ValueError(f"Monster {monster.get_name()} is defined twice.")
+            self.by_name[monster.get_name()] = monster
+            self.class_index[monster] = i
+            if monster.can_be_spawned():
+                n_spawnable += 1
+
+        # catalog indices of the spawnable and non-spawnable monsters, in catalog order
+        self.spawnable: ArrayR[int] = ArrayR(n_spawnable)
+        self.non_spawnable: ArrayR[int] = ArrayR(len(monsters) - n_spawnable)
+        s = 0
+        for i in range(len(monsters)):
+            if monsters[i].can_be_spawned():
+                self.spawnable[s] = i
+                s += 1
+            else:
+                self.non_spawnable[i - s] = i
+
+        self._build_evolution_chains()
+
+        # alias table over the positions of self.spawnable, None for uniform spawns
+        self.spawn_table: Optional[AliasTable] = None
+        weights = ArrayR(n_spawnable)
+        weighted = False
+        for s in range(n_spawnable):
+            weight = monsters[self.spawnable[s]].get_spawn_weight()
+            if weight is not None:
+                weighted = True
+            weights[s] = 1.0 if weight is None else weight
+        if weighted:
+            self.spawn_table = AliasTable(weights)
+
+    def _build_evolution_chains(self) -> None:
+        """
+        Precomputes, for every catalog index, the evolution chain table:
+            - evolution[i]:  catalog index of the monster i evolves into, NO_EVOLUTION if none
+            - chain_depth[i]: number of evolutions left before i reaches its final form
+            - final_form[i]: catalog index of the last monster of i's chain (i itself if it does not evolve)
+
+        O(n) complexity best/worst case where n is the number of monster classes
+            - every chain is walked once, later walks stop at the first monster already resolved
+        :raises ValueError: if a monster evolves into a monster outside the catalog, or the evolutions form a cycle
+        """
+        n = len(self.monsters)
+        self.evolution = array("i", [NO_EVOLUTION]) * n
+        self.chain_depth = array("i", [UNRESOLVED]) * n
+        self.final_form = array("i", [NO_EVOLUTION]) * n
+        for i in range(n):
+            evolution = self.monsters[i].get_evolution()
+            if evolution is not None:
+                if evolution not in self.class_index:
+                    raise ValueError(f"Monster {self.monsters[i].get_name()} evolves into {evolution}, which is not in the catalog.")
+                self.evolution[i] = self.class_index[evolution]
+
+        walk = array("i")
+        for i in range(n):
+            # follow the chain until a resolved monster or a final form
+            j = i
+            while self.chain_depth[j] == UNRESOLVED:
+                self.chain_depth[j] = WALKING
+                walk.append(j)
+                if self.evolution[j] == NO_EVOLUTION:
+                    break
+                j = self.evolution[j]
+            if self.chain_depth[j] == WALKING and self.evolution[j] != NO_EVOLUTION:
+                raise ValueError(f"The evolutions of {self.monsters[j].get_name()} form a cycle.")
+            # then resolve the walked monsters from the end of the chain back
+            while len(walk) > 0:
+                k = walk.pop()
+                following = self.evolution[k]
+                if following == NO_EVOLUTION:
+                    self.chain_depth[k] = 0
+                    self.final_form[k] = k
+                else:
+                    self.chain_depth[k] = self.chain_depth[following] + 1
+                    self.final_form[k] = self.final_form[following]
+
+    def evolution_of(self, monster: type[MonsterBase]) -> Optional[type[MonsterBase]]:
+        """The class a catalog monster evolves into, None if it does not evolve. O(1)"""
+        following = self.evolution[self.index_of(monster)]
+        return None if following == NO_EVOLUTION else self.monsters[following]
+
+    def final_form_of(self, monster: type[MonsterBase]) -> type[MonsterBase]:
+        """The last monster of a catalog monster's evolution chain. O(1)"""
+        return self.monsters[self.final_form[self.index_of(monster)]]
+
+    @classmethod
+    def from_records(cls, records: list[dict], source_hash: Optional[str]=None) -> MonsterRegistry:
+        """
+        Creates the monster classes for a list of catalog entries (as found in monsters.yaml).
+
+        O(n) complexity best/worst case where n is the number of records, see from_stream
+        """
+        return cls.from_stream(iter(records), source_hash)
+
+    @classmethod
+    def from_stream(cls, records: Iterator[dict], source_hash: Optional[str]=None) -> MonsterRegistry:
+        """
+        Validates and registers catalog entries one at a time, as they are produced.
+        Only the monster classes are kept, so records can be read lazily from a file
+        (see iter_yaml_records / iter_jsonl_records) without holding the whole catalog.
+
+        An evolution may name a monster defined later in the catalog. Such references
+        are kept in a pending table (evolution name -> classes waiting for it) and
+        resolved as soon as that monster is registered.
+
+        O(n) complexity best/worst case where n is the number of records
+            - the monsters array doubles when full, so appending is amortised O(1)
+            - evolutions are resolved by name with a dictionary lookup
+        :raises ValueError: if a record is invalid, a name is defined twice or an evolution is never defined
+        """
+        monsters = ArrayR(16)
+        count = 0
+        by_name: dict[str, type[MonsterBase]] = {}
+        pending: dict[str, list[type[MonsterBase]]] = {}
+
+        for record in records:
+            new_class = _make_class(record, count)
+            name = record["name"]
+            if name in by_name:
+                raise ValueError(f"Monster {name} is defined twice.")
+            by_name[name] = new_class
+
+            if count == len(monsters):
+                monsters = _resize(monsters, 2 * count)
+            monsters[count] = new_class
+            count += 1
+
+            evolution = record.get("evolution", None)
+            if evolution is not None:
+                if evolution in by_name:
+                    _set_evolution(new_class, by_name[evolution])
+                else:
+                    pending.setdefault(evolution, []).append(new_class)
+            for waiting in pending.pop(name, ()):
+                _set_evolution(waiting, new_class)
+
+        for evolution, waiting in pending.items():
+            raise ValueError(f"Monster {waiting[0].get_name()} evolves into unknown monster {evolution}.")
+
+        return MonsterRegistry(_resize(monsters, count), source_hash)
+
+    @classmethod
+    def from_file(cls, path: str) -> MonsterRegistry:
+        """Loads a catalog file (parsed once and cached, see data_cache)."""
+        records, source_hash = load_cached_with_hash(path, parse_yaml)
+        return cls.from_records(records, source_hash)
+
+    @classmethod
+    def stream_file(cls, path: str) -> MonsterRegistry:
+        """
+        Loads a catalog file one record at a time, for catalogs too large to parse into memory at once.
+        Files ending in .jsonl are read as one JSON record per line, anything else as YAML.
+        The parsed records are not cached.
+        """
+        with open(path, "rb") as f:
+            records = iter_jsonl_records(f) if path.endswith(".jsonl") else iter_yaml_records(f)
+            return cls.from_stream(records)
+
+    def __len__(self) -> int:
+        return len(self.monsters)
+
+    def __getitem__(self, index: int) -> type[MonsterBase]:
+        """The monster class at a catalog index. O(1)"""
+        return self.monsters[index]
+
+    def __iter__(self) -> Iterator[type[MonsterBase]]:
+        return iter(self.monsters)
+
+    def __contains__(self, monster: type[MonsterBase]) -> bool:
+        return monster in self.class_index
+
+    def get(self, name: str) -> type[MonsterBase]:
+        """
+        The monster class with the given name. O(1)
+        :raises KeyError: if there is no such monster
+        """
+        return self.by_name[name]
+
+    def sample_spawnable(self) -> type[MonsterBase]:
+        """
+        Returns a random spawnable monster class, drawn from RandomGen.
+        Uniform spawns draw one number, exactly like RandomGen.random_choice; weighted spawns draw two.
+
+        O(1) complexity best/worst case
+        :raises ValueError: if no monster can be spawned
+        """
+        if len(self.spawnable) == 0:
+            raise ValueError("No monster in the catalog can be spawned.")
+        if self.spawn_table is None:
+            return self.monsters[self.spawnable[RandomGen.randint(0, len(self.spawnable)-1)]]
+        return self.monsters[self.spawnable[self.spawn_table.sample()]]
+
+    def index_of(self, monster: type[MonsterBase]) -> int:
+        """
+        The catalog index of a monster class. O(1)
+        Subclasses of catalog monsters are not in the catalog themselves.
+        :raises ValueError: if the class is not in this registry
+        """
+        try:
+            return self.class_index[monster]
+        except KeyError:
+            raise ValueError(f"Monster {monster} is not in the catalog.")
@@ -0,0 +1,234 @@
+"""
+Compact binary battle replay log.
+
+A log is a stream header followed by one record per battle:
+
+    stream header:  magic (4 bytes) | version (u8)
+    battle header:  seed (u64) | number of turns (u32) | result (u8)
+    team (x2):      the team's encoding (see team_encoding): team mode (u8) | sort key (u8, 0 = none)
+                    | index width (u8) | size (u32) | size x catalog index (u16, or u32 for large catalogs)
+    turn (xN):      action codes (u8) | team 1 HP delta (i16) | team 2 HP delta (i16)
+
+The action byte packs both teams' `Battle.Action` values as `action1 | action2 << 2`.
+The HP delta of a team is the HP of its out monster at the end of the turn minus
+the HP of its out monster at the start of the turn (which may be a different monster).
+
+Usage:
+    recorder = BattleRecorder(open("battles.bin", "wb"))
+    Battle(recorder=recorder).battle(team1, team2)
+
+    for record in BattleLogReader(open("battles.bin", "rb")):
+        assert record.verify()
+"""
+from __future__ import annotations
+import struct
+from io import BytesIO
+from typing import BinaryIO, Iterator, TYPE_CHECKING
+
+import team_encoding
+from data_structures.referential_array import ArrayR
+from random_gen import RandomGen
+
+if TYPE_CHECKING:
+    from battle import Battle
+    from team import MonsterTeam
+
+
+MAGIC = b"MBRL"
+VERSION = 2
+
+STREAM_HEADER = struct.Struct("<4sB")
+BATTLE_HEADER = struct.Struct("<QIB")
+TURN = struct.Struct("<Bhh")
+
+HP_DELTA_MIN = -(1 << 15)
+HP_DELTA_MAX = (1 << 15) - 1
+
+
+class TeamRecord:
+    """
+    The composition of a team as stored in the log: its mode, sort key and the
+    catalog indices (see registry.MonsterRegistry) of its provided monsters.
+    """
+
+    def __init__(self, team_mode: int, sort_key: int, monster_indices: ArrayR[int]) -> None:
+        self.team_mode = team_mode
+        self.sort_key = sort_key
+        self.monster_indices = monster_indices
+
+    @classmethod
+    def from_team(cls, team: MonsterTeam) -> TeamRecord:
+        """
+        O(n) complexity best/worst case where n is the number of provided monsters
+        :raises ValueError: if one of the provided monsters is not in the catalog
+        """
+        indices = team_encoding.catalog_indices(team)
+        if indices is None:
+            raise ValueError("The team has monsters that are not in the catalog.")
+        sort_key = 0 if team.sort_key is None else team.sort_key.value
+        return TeamRecord(team.team_mode.value, sort_key, indices)
+
+    def to_team(self) -> MonsterTeam:
+        """
+        Rebuilds a fresh team with the recorded composition, see team_encoding.build_team().
+
+        O(n) complexity best/worst case where n is the number of monsters in the team
+        """
+        return team_encoding.build_team(self.team_mode, self.sort_key, self.monster_indices)
+
+    def pack(self) -> bytes:
+        return team_encoding.pack(self.team_mode, self.sort_key, self.monster_indices)
+
+    @classmethod
+    def unpack_from(cls, stream: BinaryIO) -> TeamRecord:
+        """
+        O(n) complexity best/worst case where n is the number of monsters in the team
+        :raises ValueError: if the stream does not hold a team encoding
+        """
+        header = _read_exactly(stream, team_encoding.HEADER.size)
+        _, _, width, size = team_encoding.HEADER.unpack(header)
+        team_mode, sort_key, indices = team_encoding.unpack(header + _read_exactly(stream, width * size))
+        return TeamRecord(team_mode, sort_key, indices)
+
+
+class BattleRecord:
+    """A single battle read back from a log."""
+
+    def __init__(self, seed: int, team1: TeamRecord, team2: TeamRecord, turns: bytes, result: int) -> None:
+        self.seed = seed
+        self.team1 = team1
+        self.team2 = team2
+        # Packed turn records, see `TURN`.
+        self.turns = turns
+        self.result = result
+
+    def __len__(self) -> int:
+        """Number of turns in the battle."""
+        return len(self.turns) // TURN.size
+
+    def get_turn(self, index: int) -> tuple[Battle.Action, Battle.Action, int, int]:
+        """
+        Returns (action1, action2, hp_delta1, hp_delta2) for a turn.
+
+        O(1) complexity best/worst case
+        """
+        from battle import Battle
+        actions, delta1, delta2 = TURN.unpack_from(self.turns, index * TURN.size)
+        return (Battle.Action(actions & 0b11), Battle.Action(actions >> 2), delta1, delta2)
+
+    def get_result(self) -> Battle.Result:
+        from battle import Battle
+        return Battle.Result(self.result)
+
+    def pack(self) -> bytes:
+        return (
+            BATTLE_HEADER.pack(self.seed, len(self), self.result)
+            + self.team1.pack()
+            + self.team2.pack()
+            + self.turns
+        )
+
+    def replay(self, verbosity: int = 0, recorder: BattleRecorder | None = None) -> Battle.Result:
+        """
+        Re-runs the battle from the recorded seed and team compositions.
+
+        The global RandomGen seed is set to the recorded seed for the battle and put back afterwards.
+
+        O(t) complexity where t is the cost of running the battle itself
+        """
+        from battle import Battle
+
+        team1 = self.team1.to_team()
+        team2 = self.team2.to_team()
+        seed = RandomGen.seed
+        RandomGen.set_seed(self.seed)
+        try:
+            return Battle(verbosity=verbosity, recorder=recorder).battle(team1, team2)
+        finally:
+            RandomGen.set_seed(seed)
+
+    def verify(self) -> bool:
+        """
+        Re-runs the battle and checks every turn (actions and HP deltas)
+        and the result match the recorded ones.
+        """
+        recorder = BattleRecorder(BytesIO(), write_header=False)
+        self.replay(recorder=recorder)
+        return recorder.last_record == self.pack()
+
+
+class BattleRecorder:
+    """
+    Writes battles to a binary stream as they are fought.
+
+    The recorder is driven by `Battle`:
+        * start_battle() before the first turn
+        * record_turn() after every turn
+        * end_battle() once the result is known
+
+    Turns are buffered in memory until the battle finishes, so each battle is
+    written with a single call to `stream.write`.
+    """
+
+    def __init__(self, stream: BinaryIO, write_header: bool = True) -> None:
+        self.stream = stream
+        self.last_record: bytes | None = None
+        self.battles_recorded = 0
+        self._seed = 0
+        self._teams = b""
+        self._turns = bytearray()
+        if write_header:
+            stream.write(STREAM_HEADER.pack(MAGIC, VERSION))
+
+    def start_battle(self, team1: MonsterTeam, team2: MonsterTeam) -> None:
+        self._seed = RandomGen.seed
+        self._teams = TeamRecord.from_team(team1).pack() + TeamRecord.from_team(team2).pack()
+        self._turns = bytearray()
+
+    def record_turn(self, action1: Battle.Action, action2: Battle.Action, hp_delta1: int, hp_delta2: int) -> None:
+        """
+        O(1) complexity best/worst case (amortised append to the turn buffer)
+        """
+        if not (HP_DELTA_MIN <= hp_delta1 <= HP_DELTA_MAX and HP_DELTA_MIN <= hp_delta2 <= HP_DELTA_MAX):
+            raise ValueError(f"HP deltas ({hp_delta1}, {hp_delta2}) do not fit in the replay log.")
+        self._turns += TURN.pack(action1.value | action2.value << 2, hp_delta1, hp_delta2)
+
+    def end_battle(self, result: Battle.Result) -> None:
+        n_turns = len(self._turns) // TURN.size
+        self.last_record = BATTLE_HEADER.pack(self._seed, n_turns, result.value) + self._teams + bytes(self._turns)
+        self.stream.write(self.last_record)
+        self.battles_recorded += 1
+
+
+class BattleLogReader:
+    """
+    Iterates over the battles stored in a log written by `BattleRecorder`.
+    """
+
+    def __init__(self, stream: BinaryIO) -> None:
+        self.stream = stream
+        magic, version = STREAM_HEADER.unpack(_read_exactly(stream, STREAM_HEADER.size))
+        if magic != MAGIC:
+            raise ValueError("Not a battle replay log.")
+        if version != VERSION:
+            raise ValueError(f"Unsupported replay log version {version}.")
+
+    def __iter__(self) -> Iterator[BattleRecord]:
+        while True:
+            header = self.stream.read(BATTLE_HEADER.size)
+            if not header:
+                return
+            if len(header) != BATTLE_HEADER.size:
+                raise ValueError("Truncated battle record.")
+            seed, n_turns, result = BATTLE_HEADER.unpack(header)
+            team1 = TeamRecord.unpack_from(self.stream)
+            team2 = TeamRecord.unpack_from(self.stream)
+            turns = _read_exactly(self.stream, n_turns * TURN.size)
+            yield BattleRecord(seed, team1, team2, turns, result)
+
+
+def _read_exactly(stream: BinaryIO, size: int) -> bytes:
+    data = stream.read(size)
+    if len(data) != size:
+        raise ValueError("Truncated battle record.")
+    return data
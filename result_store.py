@@ -0,0 +1,243 @@
+"""
+Persistent store of battle and battle tower results, in an SQLite file.
+
+Every entry is keyed by what its result depends on:
+
+    kind            BATTLE or TOWER
+    inputs          battles: both teams' policy cache_key() and encoding() (see battle_cache.battle_inputs)
+                    towers: the seed, the number of enemy teams, the player team's policy cache_key() and encoding()
+    catalog_hash    SHA-256 of the catalog (monsters.yaml, see MonsterRegistry.source_hash)
+    rules_hash      SHA-256 of the effectiveness rule set (type_effectiveness.csv, see EffectivenessCalculator.source_hash)
+    engine_version  battle.ENGINE_VERSION
+
+Lookups always use the current catalog, rule set and engine version, so entries
+computed from other versions of any of them are never returned: editing a data
+file or bumping ENGINE_VERSION invalidates exactly the results that depended on it.
+prune() deletes those entries from the file.
+
+Results that cannot be keyed (see battle_cache.BattleCache) are computed and not stored.
+Writes are committed by commit() and close() (and leaving a `with` block).
+
+Usage:
+    with ResultStore("results.sqlite") as store:
+        results = compare_rules(rules, n_battles=1000, seed=42, store=store)
+        tower_results = store.tower(seed=7, my_team=team, n_teams=5)
+"""
+from __future__ import annotations
+import sqlite3
+import struct
+from array import array
+from typing import Optional, TYPE_CHECKING
+
+from battle import Battle, ENGINE_VERSION
+from battle_cache import battle_inputs, pack_parts
+from elements import EffectivenessCalculator
+from helpers import get_registry
+from random_gen import RandomGen
+
+from data_structures.referential_array import ArrayR
+
+if TYPE_CHECKING:
+    from policies import ActionPolicy
+    from team import MonsterTeam
+
+
+BATTLE = 1
+TOWER = 2
+
+# tower inputs: seed (u64) | number of enemy teams (u32)
+TOWER_INPUTS = struct.Struct("<QI")
+# tower results: RandomGen seed after the tower (u64) | one Battle.Result value (i8) per battle
+TOWER_SEED = struct.Struct("<Q")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS results (
+    kind INTEGER NOT NULL,
+    inputs BLOB NOT NULL,
+    catalog_hash TEXT NOT NULL,
+    rules_hash TEXT NOT NULL,
+    engine_version INTEGER NOT NULL,
+    result BLOB NOT NULL,
+    PRIMARY KEY (kind, inputs, catalog_hash, rules_hash, engine_version)
+) WITHOUT ROWID
+"""
+
+
+class ResultStore:
+
+    def __init__(self, path: str) -> None:
+        """
+        :path: The SQLite file, created if it does not exist (":memory:" for a store that is not saved).
+        """
+        self.path = path
+        self.connection = sqlite3.connect(path)
+        self.connection.execute(SCHEMA)
+        self.hits = 0
+        self.misses = 0
+        self.bypassed = 0
+
+    def __len__(self) -> int:
+        """Number of entries, including stale ones (see prune())."""
+        return self.connection.execute("SELECT COUNT(*) FROM results").fetchone()[0]
+
+    def __enter__(self) -> ResultStore:
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def get(self, kind: int, inputs: bytes, rules: Optional[EffectivenessCalculator] = None) -> Optional[bytes]:
+        """
+        The stored result for inputs under the current catalog and engine version and the given rule set
+        (the default one if None), or None. Counts a hit or miss.
+
+        O(log(e)) complexity best/worst case where e is the number of entries (primary key lookup)
+        """
+        versions = _versions(rules)
+        row = None
+        if versions is not None:
+            row = self.connection.execute(
+                "SELECT result FROM results WHERE kind = ? AND inputs = ? AND catalog_hash = ? AND rules_hash = ? "
+                "AND engine_version = ?",
+                (kind, inputs, *versions, ENGINE_VERSION),
+            ).fetchone()
+        if row is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return row[0]
+
+    def put(self, kind: int, inputs: bytes, result: bytes, rules: Optional[EffectivenessCalculator] = None) -> None:
+        """
+        Stores a result, see get(). Nothing is stored if the catalog or rule set has no source hash.
+
+        O(log(e)) complexity best/worst case where e is the number of entries
+        """
+        versions = _versions(rules)
+        if versions is None:
+            return
+        self.connection.execute(
+            "INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?, ?, ?)",
+            (kind, inputs, *versions, ENGINE_VERSION, result),
+        )
+
+    def get_battle(self, team1: MonsterTeam, team2: MonsterTeam, rules: Optional[EffectivenessCalculator] = None,
+                   policy: Optional[ActionPolicy] = None) -> Optional[Battle.Result]:
+        """
+        The stored result of a battle between freshly regenerated team1 and team2, or None.
+
+        :policy: The policy that plays both teams, when it is not their own (see lockstep.LockstepBattles).
+        """
+        inputs = battle_inputs(team1, team2, policy)
+        if inputs is None:
+            self.bypassed += 1
+            return None
+        result = self.get(BATTLE, inputs, rules)
+        return None if result is None else Battle.Result(result[0])
+
+    def put_battle(self, team1: MonsterTeam, team2: MonsterTeam, result: Battle.Result,
+                   rules: Optional[EffectivenessCalculator] = None, policy: Optional[ActionPolicy] = None) -> None:
+        """Stores the result of a battle, see get_battle()."""
+        inputs = battle_inputs(team1, team2, policy)
+        if inputs is not None:
+            self.put(BATTLE, inputs, bytes((result.value, )), rules)
+
+    def battle(self, battle: Battle, team1: MonsterTeam, team2: MonsterTeam) -> Battle.Result:
+        """
+        The result of battle.battle(team1, team2), played only if it is not stored.
+        On a hit no turn is played, so the teams are left as they are and the battle's
+        out monsters and turn number are None, see Battle.skip().
+        """
+        stored = battle.recorder is None and battle.verbosity == 0 and team1.fresh and team2.fresh
+        if not stored:
+            self.bypassed += 1
+        else:
+            result = self.get_battle(team1, team2, battle.rules)
+            if result is not None:
+                battle.skip(team1, team2)
+                return result
+        result = battle.battle(team1, team2)
+        if stored:
+            self.put_battle(team1, team2, result, battle.rules)
+        return result
+
+    def tower(self, seed: int, my_team: MonsterTeam, n_teams: int,
+              rules: Optional[EffectivenessCalculator] = None) -> ArrayR[Battle.Result]:
+        """
+        The results of every battle of a battle tower, in order. The tower is run only if it is not stored:
+        RandomGen is seeded with seed, then my_team is given its lives and n_teams enemy teams are generated
+        (see tower.BattleTower). Either way RandomGen is left as running the tower would leave it.
+
+        O(1) store lookup on a hit, plus O(b) to unpack the b battle results
+        """
+        from tower import BattleTower
+
+        inputs = pack_parts((TOWER_INPUTS.pack(seed, n_teams), my_team.policy.cache_key(), my_team.encoding()))
+        stored = None
+        if inputs is None:
+            self.bypassed += 1
+        else:
+            stored = self.get(TOWER, inputs, rules)
+
+        if stored is not None:
+            RandomGen.set_seed(TOWER_SEED.unpack_from(stored)[0])
+            values = stored[TOWER_SEED.size:]
+        else:
+            RandomGen.set_seed(seed)
+            tower = BattleTower(Battle(verbosity=0, rules=rules))
+            tower.set_my_team(my_team)
+            tower.generate_teams(n_teams)
+            played = array("b")
+            while tower.battles_remaining():
+                played.append(tower.next_battle()[0].value)
+            values = played.tobytes()
+            if inputs is not None:
+                self.put(TOWER, inputs, TOWER_SEED.pack(RandomGen.seed) + values, rules)
+
+        results = ArrayR(len(values))
+        for i in range(len(values)):
+            results[i] = Battle.Result(values[i])
+        return results
+
+    def prune(self, rules: Optional[ArrayR[EffectivenessCalculator]] = None) -> int:
+        """
+        Deletes the entries that can no longer be returned: those of another catalog or engine version,
+        or of a rule set other than the given ones (by default only the default rule set is kept).
+        Returns the number of entries deleted.
+
+        O(e) complexity best/worst case where e is the number of entries
+        """
+        if rules is None:
+            rules = ArrayR.from_list([EffectivenessCalculator.default()])
+        kept = [calculator.source_hash for calculator in rules if calculator.source_hash is not None]
+        placeholders = ", ".join("?" for _ in kept)
+        cursor = self.connection.execute(
+            f"DELETE FROM results WHERE catalog_hash IS NOT ? OR engine_version != ? "
+            f"OR rules_hash NOT IN ({placeholders})",
+            (get_registry().source_hash, ENGINE_VERSION, *kept),
+        )
+        self.connection.commit()
+        return cursor.rowcount
+
+    def clear(self) -> None:
+        """Deletes every entry."""
+        self.connection.execute("DELETE FROM results")
+        self.connection.commit()
+
+    def commit(self) -> None:
+        """Writes the results stored since the last commit to the file."""
+        self.connection.commit()
+
+    def close(self) -> None:
+        self.connection.commit()
+        self.connection.close()
+
+
+def _versions(rules: Optional[EffectivenessCalculator]) -> Optional[tuple[str, str]]:
+    """(catalog hash, rules hash) of the current catalog and a rule set (the default one if None), or None if one is unknown."""
+    if rules is None:
+        rules = EffectivenessCalculator.default()
+    catalog_hash = get_registry().source_hash
+    if catalog_hash is None or rules.source_hash is None:
+        return None
+    return (catalog_hash, rules.source_hash)
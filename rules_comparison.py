@@ -0,0 +1,133 @@
+"""
+Runs the same battles under several effectiveness rule sets, for A/B testing balance tables.
+
+The teams are generated once and shared by every rule set, and RandomGen is reset to
+the same per-battle seed before each battle is fought under each rule set, so any
+difference between the results comes from the rule sets alone.
+
+Usage:
+    rules = ArrayR.from_list([
+        EffectivenessCalculator.default(),
+        EffectivenessCalculator.load_rules("rebalanced", "rebalanced.csv"),
+    ])
+    results = compare_rules(rules, n_battles=1000, seed=42)
+    summarise(results[1])     # (team 1 wins, team 2 wins, draws) under "rebalanced"
+
+    # re-running the report only fights the battles the store has no result for
+    with ResultStore("results.sqlite") as store:
+        results = compare_rules(rules, n_battles=1000, seed=42, store=store)
+"""
+from __future__ import annotations
+from typing import Optional, TYPE_CHECKING
+
+from battle import Battle
+from elements import EffectivenessCalculator
+from random_gen import RandomGen
+from team import MonsterTeam
+
+from data_structures.referential_array import ArrayR
+
+if TYPE_CHECKING:
+    from result_store import ResultStore
+
+
+def compare_rules(
+    rules: ArrayR[EffectivenessCalculator],
+    n_battles: int,
+    seed: int,
+    team_mode: Optional[MonsterTeam.TeamMode]=None,
+    lockstep: bool=False,
+    store: Optional[ResultStore]=None,
+) -> ArrayR[ArrayR[Battle.Result]]:
+    """
+    Fights n_battles random battles under every rule set.
+    Returns results[r][b], the result of battle b under rules[r].
+
+    :team_mode: The mode of every team. Defaults to BACK.
+    :lockstep: Fight every rule set's battles with lockstep.LockstepBattles (FRONT / BACK teams only).
+    :store: Optional result_store.ResultStore. Battles it has a result for (under the same catalog,
+        rule set and engine version) are not fought again, and new results are added to it.
+
+    O(r * b * t) complexity where r is the number of rule sets, b the number of battles
+    and t the cost of a battle. The teams are only generated once (O(b * n) for teams of size n).
+    """
+    RandomGen.set_seed(seed)
+    teams = ArrayR(2 * n_battles)
+    i = 0
+    for team in MonsterTeam.random_teams(2 * n_battles, team_mode):
+        teams[i] = team
+        i += 1
+    # every battle gets its own seed, shared by all rule sets
+    battle_seeds = ArrayR(n_battles)
+    for b in range(n_battles):
+        battle_seeds[b] = RandomGen.random()
+
+    results = ArrayR(len(rules))
+    for r in range(len(rules)):
+        if lockstep:
+            results[r] = _run_lockstep(rules[r], teams, n_battles, store)
+            continue
+        battle = Battle(rules=rules[r])
+        results[r] = ArrayR(n_battles)
+        for b in range(n_battles):
+            team1, team2 = teams[2 * b], teams[2 * b + 1]
+            team1.regenerate_team()
+            team2.regenerate_team()
+            RandomGen.set_seed(battle_seeds[b])
+            if store is None:
+                results[r][b] = battle.battle(team1, team2)
+            else:
+                results[r][b] = store.battle(battle, team1, team2)
+    if store is not None:
+        store.commit()
+    return results
+
+
+def _run_lockstep(
+    rules: EffectivenessCalculator, teams: ArrayR[MonsterTeam], n_battles: int, store: Optional[ResultStore]=None,
+) -> ArrayR[Battle.Result]:
+    """
+    Fights the battles of one rule set with lockstep.LockstepBattles.
+    With a store, only the battles it has no result for are fought.
+    """
+    from lockstep import LockstepBattles
+
+    results = ArrayR(n_battles)
+    # the battles still to fight, by index in results
+    missing = ArrayR(n_battles)
+    n_missing = 0
+    for b in range(n_battles):
+        if store is not None:
+            results[b] = store.get_battle(teams[2 * b], teams[2 * b + 1], rules)
+        if results[b] is None:
+            missing[n_missing] = b
+            n_missing += 1
+
+    pairs = ArrayR(n_missing)
+    for i in range(n_missing):
+        b = missing[i]
+        pairs[i] = (teams[2 * b], teams[2 * b + 1])
+    fought = LockstepBattles(pairs, rules=rules).run()
+    for i in range(n_missing):
+        b = missing[i]
+        results[b] = fought[i]
+        if store is not None:
+            store.put_battle(teams[2 * b], teams[2 * b + 1], fought[i], rules)
+    return results
+
+
+def summarise(results: ArrayR[Battle.Result]) -> tuple[int, int, int]:
+    """
+    Counts (team 1 wins, team 2 wins, draws) in one rule set's results.
+
+    O(b) complexity best/worst case where b is the number of battles
+    """
+    team1 = team2 = draws = 0
+    for result in results:
+        if result == Battle.Result.TEAM1:
+            team1 += 1
+        elif result == Battle.Result.TEAM2:
+            team2 += 1
+        elif result == Battle.Result.DRAW:
+            draws += 1
+    return (team1, team2, draws)
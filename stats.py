@@ -6,7 +6,31 @@ from data_structures.referential_array import ArrayR
 from data_structures.sorted_list_adt import ListItem
 from data_structures.stack_adt import ArrayStack
 
+# Compiled formulas (see ComplexStats.from_program) are (opcode, operand) pairs:
+# NUMBER pushes its operand, opcode i > 0 is the operator FORMULA_OPERATORS[i - 1].
+NUMBER = 0
+FORMULA_OPERATORS = ("level", "+", "-", "*", "sqrt", "middle", "power")
+
 class Stats(abc.ABC):
+    """
+    Stats are shared: every monster of a class refers to the one stats object of that class
+    (see MonsterBase.get_simple_stats / get_complex_stats), so they are immutable once created.
+    Copying a stats object returns the same object.
+    """
+
+    __slots__ = ()
+
+    def __setattr__(self, name, value):
+        raise AttributeError(f"{type(self).__name__} is immutable, it is shared by every monster of a class.")
+
+    def __delattr__(self, name):
+        raise AttributeError(f"{type(self).__name__} is immutable, it is shared by every monster of a class.")
+
+    def __copy__(self):
+        return self
+
+    def __deepcopy__(self, memo):
+        return self
 
     @abc.abstractmethod
     def get_attack(self):
@@ -27,12 +51,17 @@ class Stats(abc.ABC):
 
 class SimpleStats(Stats):
 
+    __slots__ = ("attack", "defense", "speed", "max_hp")
+
     def __init__(self, attack, defense, speed, max_hp) -> None:
-        # TODO: Implement
-        self.attack = attack
-        self.defense = defense
-        self.speed = speed
-        self.max_hp = max_hp
+        # attributes are set once here, see Stats.__setattr__
+        object.__setattr__(self, "attack", attack)
+        object.__setattr__(self, "defense", defense)
+        object.__setattr__(self, "speed", speed)
+        object.__setattr__(self, "max_hp", max_hp)
+
+    def __reduce__(self):
+        return (SimpleStats, (self.attack, self.defense, self.speed, self.max_hp))
 
 
     def get_attack(self):
@@ -49,6 +78,8 @@ class SimpleStats(Stats):
 
 class ComplexStats(Stats):
 
+    __slots__ = ("attack_formula", "defense_formula", "speed_formula", "max_hp_formula")
+
     def __init__(
         self,
         attack_formula: ArrayR[str],
@@ -56,11 +87,36 @@ class ComplexStats(Stats):
         speed_formula: ArrayR[str],
         max_hp_formula: ArrayR[str],
     ) -> None:
-        # TODO: Implement
-        self.attack_formula = attack_formula
-        self.defense_formula = defense_formula
-        self.speed_formula = speed_formula
-        self.max_hp_formula = max_hp_formula
+        # the formulas are copied into tuples so they cannot change either, see Stats.__setattr__
+        object.__setattr__(self, "attack_formula", tuple(attack_formula))
+        object.__setattr__(self, "defense_formula", tuple(defense_formula))
+        object.__setattr__(self, "speed_formula", tuple(speed_formula))
+        object.__setattr__(self, "max_hp_formula", tuple(max_hp_formula))
+
+    def __reduce__(self):
+        return (ComplexStats, (self.attack_formula, self.defense_formula, self.speed_formula, self.max_hp_formula))
+
+    @classmethod
+    def from_program(cls, opcodes, operands, bounds) -> "ComplexStats":
+        """
+        Builds the stats from compiled formulas without going through token strings:
+        numbers are kept as floats and operators are the shared FORMULA_OPERATORS strings.
+
+        :opcodes: The opcode of every token of the program (see NUMBER and FORMULA_OPERATORS).
+        :operands: The operand of every token, only read for NUMBER.
+        :bounds: (first token, token count) of the attack, defense, speed and max_hp formulas, flattened.
+
+        O(t) complexity best/worst case where t is the number of tokens in the four formulas
+        """
+        formulas = []
+        for stat in range(4):
+            first = bounds[2 * stat]
+            formula = ArrayR(bounds[2 * stat + 1])
+            for i in range(len(formula)):
+                opcode = opcodes[first + i]
+                formula[i] = operands[first + i] if opcode == NUMBER else FORMULA_OPERATORS[opcode - 1]
+            formulas.append(formula)
+        return cls(*formulas)
 
 
     """
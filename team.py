@@ -1,6 +1,7 @@
 from __future__ import annotations
+from array import array
 from enum import auto
-from typing import Optional, TYPE_CHECKING
+from typing import Iterator, Optional, TYPE_CHECKING
 
 from base_enum import BaseEnum
 from data_structures.bset import BSet
@@ -9,15 +10,17 @@ from data_structures.sorted_list_adt import ListItem
 from elements import Element
 from monster_base import MonsterBase
 from random_gen import RandomGen
-from helpers import get_all_monsters
+from helpers import get_all_monsters, get_registry
+from policies import ActionPolicy, DEFAULT_POLICY
+import team_encoding
 
 from data_structures.referential_array import ArrayR
 
 
 # for front team
-from data_structures.stack_adt import ArrayStack as Stack
+from data_structures.stack_adt import ArrayStack as Stack, GrowableArrayStack
 # for back team
-from data_structures.queue_adt import CircularQueue
+from data_structures.queue_adt import CircularQueue, GrowableCircularQueue
 # for optimised team
 from data_structures.array_sorted_list import ArraySortedList
 
@@ -25,6 +28,11 @@ from data_structures.array_sorted_list import ArraySortedList
 
 if TYPE_CHECKING:
     from battle import Battle
+    from pool import MonsterPool
+
+# encoding() has not been computed yet (None means the team has no encoding)
+_NOT_ENCODED = object()
+
 
 class MonsterTeam:
 
@@ -65,18 +73,46 @@ class MonsterTeam:
         self.kwargs = kwargs
         self.provided_monsters_index = 0
 
+        # the largest size of this team, TEAM_LIMIT unless given with team_limit=...
+            # the containers grow as needed, so large teams only pay for the monsters they have
+        self.team_limit: int = self.kwargs.get("team_limit", self.TEAM_LIMIT)
+
         # create the provided monsters array (we use this for regenerating the team)
             # monsters are added to this on initialisation in chosen selection mode
-        self.provided_monsters: ArrayR[MonsterBase] = self.kwargs.get("provided_monsters", ArrayR(self.TEAM_LIMIT))
+        self.provided_monsters: ArrayR[MonsterBase] = self.kwargs.get("provided_monsters", None)
+        if self.provided_monsters is None:
+            self.provided_monsters = ArrayR(self.team_limit)
 
         self.sort_key: self.SortMode = self.kwargs.get("sort_key", None)
 
+        # the policy that choose_action() asks every turn
+        self.policy: ActionPolicy = self.kwargs.get("policy", DEFAULT_POLICY)
+
+        # with pool=MonsterPool(), the team's monsters are handles to slots of the pool
+        self.pool: Optional[MonsterPool] = self.kwargs.get("pool", None)
+        # handles taken from the pool by restore(), freed on the next restore(), regenerate_team() or release()
+        self.pooled = []
+
+        # OPTIMISE items collected while the team is being filled, None otherwise
+        self.bulk_items = None
+
+        # with recycle=True, regenerate_team() resets the team's containers and monsters in place
+        self.recycle: bool = self.kwargs.get("recycle", False)
+        # the monsters spawned for provided_monsters, in the same order
+        self.spawned = []
+
+        # see encoding(), computed on first use
+        self._encoding = _NOT_ENCODED
+
+        # whether the team is as regenerate_team() left it (no monster retrieved, added or changed since)
+        self.fresh = False
+
         # create the team based on the team mode
         self.regenerate_team()
 
         # Whenever creating a team and the length of the team is greater than the team limit, raise a ValueError
-        if len(self) > self.TEAM_LIMIT:
-            raise ValueError(f"Team size {len(self)} exceeds limit {self.TEAM_LIMIT}.")
+        if len(self) > self.team_limit:
+            raise ValueError(f"Team size {len(self)} exceeds limit {self.team_limit}.")
 
     def __len__(self) -> int:
         """
@@ -103,9 +139,62 @@ class MonsterTeam:
         elif self.team_mode == self.TeamMode.BACK:
             return f"Back Team: {str(self.back_team)}"
         elif self.team_mode == self.TeamMode.OPTIMISE:
-            return f"Optimised Team: {str(self.optimised_team)}"
+            # in retrieval order, the opposite of the sorted list's order
+            items = self.optimised_team
+            return f"Optimised Team: [{', '.join(str(items[i]) for i in range(len(items) - 1, -1, -1))}]"
         
 
+    def encoding(self) -> Optional[bytes]:
+        """
+        The canonical encoding of the team's composition (mode, sort key and provided monsters, see team_encoding),
+        or None if one of the provided monsters is not in the catalog.
+        Computed on the first call, as the provided monsters do not change after the team is created.
+
+        O(n) complexity for the first call where n is the number of provided monsters
+        O(1) complexity best/worst case afterwards
+        """
+        if self._encoding is _NOT_ENCODED:
+            self._encoding = team_encoding.encode(self)
+        return self._encoding
+
+    @classmethod
+    def from_encoding(cls, data: bytes, **kwargs) -> MonsterTeam:
+        """
+        Builds a fresh team from encoding(). kwargs are passed on to the team, see team_encoding.build_team().
+
+        O(n) complexity best/worst case where n is the size of the team
+        :raises ValueError: if data is not a team encoding
+        """
+        return team_encoding.decode(data, **kwargs)
+
+    def __eq__(self, other: object) -> bool:
+        """
+        Teams are equal if they have the same encoding(). Teams without one are only equal to themselves.
+        The state of the monsters (HP, level, ...) is not compared.
+
+        O(n) complexity for the first comparison where n is the number of provided monsters
+        O(1) complexity best case afterwards (different hashes or the same encoding object)
+        O(n) complexity worst case afterwards (equal encodings are compared byte by byte)
+        """
+        if not isinstance(other, MonsterTeam):
+            return NotImplemented
+        if self is other:
+            return True
+        mine, theirs = self.encoding(), other.encoding()
+        if mine is None or theirs is None:
+            return False
+        return mine == theirs
+
+    def __hash__(self) -> int:
+        """
+        O(n) complexity for the first call where n is the number of provided monsters
+        O(1) complexity best/worst case afterwards (bytes cache their hash)
+        """
+        data = self.encoding()
+        if data is None:
+            return object.__hash__(self)
+        return hash(data)
+
            
     def _get_monster_key(self, monster: MonsterBase) -> int:
         """
@@ -125,6 +214,15 @@ class MonsterTeam:
         elif self.sort_key == self.SortMode.LEVEL:
             key = monster.get_level()
         return key
+
+    def _item_key(self, monster: MonsterBase) -> int:
+        """
+        The key of a monster's item in optimised_team. The list is sorted in ascending order of these keys
+        and the last item is the next one retrieved, so the first monster in self.sort_direction order comes last.
+
+        O(1) complexity best/worst case
+        """
+        return - self._get_monster_key(monster) * self.sort_direction
     
     
     def get_monster_elements(self, element_set: BSet) -> BSet:
@@ -132,16 +230,16 @@ class MonsterTeam:
         This function gets the element enum values of monsters 
 
         O(n) complexity best/worst case where n is the size of the team
+            - the element values of every monster class are cached, see MonsterBase.element_values()
         """
 
         # for monster in this team, set element_set at index 1
         for monster in self.provided_monsters:
             if monster is None: break
             # print(monster)
-            # get the element enum value of the monster
-            monster_element = Element.from_string(monster.get_element())
-            monster_enum = monster_element.value
-            element_set.add(monster_enum)
+            # get the element enum values of the monster (dual-element monsters have two)
+            for element in monster.element_values():
+                element_set.add(element)
 
         return element_set
 
@@ -161,39 +259,209 @@ class MonsterTeam:
 
     def add_to_team(self, monster: MonsterBase):
         """
-        O(1) complexity best/worst case for FRONT and BACK team modes
+        O(1) complexity best/worst case for FRONT and BACK team modes (amortised, the containers grow when full)
             - push() and append() are O(1) complexity
         
-        O(log(n)) complexity best/worst case for OPTIMISE team mode
-            - add() is O(log(n)) complexity due to binary search
+        O(log(n)) complexity best case, O(n) worst case for OPTIMISE team mode
+            - add_reversed() finds the position with a binary search, then shuffles the items after it to the right
+                - best case the monster goes last (it is the next one retrieved) and nothing shuffles
+                - monsters with equal keys keep the order add() gave them, so a monster with the same key
+                    as others may go among them and shuffle the ones retrieved before it
+            - so with few distinct keys (e.g. large teams of a few monster classes) adds are O(n),
+                see benchmarks/team_scaling.py
+
+        The team becomes the monster's observer and counts it in the aggregates, see _track()
         """
+        self.fresh = False
+        self._track(monster)
         if self.team_mode == self.TeamMode.FRONT:
             self.front_team.push(monster)
         elif self.team_mode == self.TeamMode.BACK:
             self.back_team.append(monster)
         elif self.team_mode == self.TeamMode.OPTIMISE:
-            key = self._get_monster_key(monster)
-            # multiply by self.sort_direction in case a monster is added to the team after special() is called
+            # the key depends on self.sort_direction in case a monster is added to the team after special() is called
                 # this is because the direction changes when special() is called 
                     #i.e descending to ascending or vice versa
-            self.optimised_team.add(ListItem(monster, key * self.sort_direction))
+            item = ListItem(monster, self._item_key(monster))
+            if self.bulk_items is not None:
+                # the team is being filled, see _sort_bulk_items()
+                self.bulk_items.append(item)
+            else:
+                self.optimised_team.add_reversed(item)
+            # keep the item sorted if the monster's key changes while it waits in the team
+            self.optimised_items[monster] = item
 
     def retrieve_from_team(self) -> MonsterBase:
         """
-        O(1) complexity best/worst case for FRONT and BACK team modes
+        O(1) complexity best/worst case for every team mode
             - pop() and serve() are O(1) complexity
-        O(n) complexity best/worst case for OPTIMISE team mode
-            - delete_at_index() is O(n) complexity where n is the size of the optimised team 
-                - this is because all the items have to shuffle in the direction the index is deleted
-                    - so if the index is 0, all the items have to shuffle to the left
+            - OPTIMISE teams keep the next monster as the last item of the sorted list,
+                so delete_at_index() has nothing to shuffle
+
+        Removing the monster from the aggregates is O(log(d) + d), see _untrack()
         """
 
         if self.team_mode == self.TeamMode.FRONT:
-            return self.front_team.pop()
+            monster = self.front_team.pop()
         elif self.team_mode == self.TeamMode.BACK:
-            return self.back_team.serve()
+            monster = self.back_team.serve()
         elif self.team_mode == self.TeamMode.OPTIMISE:
-            return self.optimised_team.delete_at_index(0).value
+            # the next monster is the last item, so nothing has to shuffle
+            monster = self.optimised_team.delete_at_index(len(self.optimised_team) - 1).value
+            del self.optimised_items[monster]
+        self._untrack(monster)
+        self.fresh = False
+        return monster
+
+    def monster_changed(self, monster: MonsterBase) -> None:
+        """
+        Called by a monster in the team when its HP changes (which includes levelling up and evolving).
+        Updates the team aggregates, and for OPTIMISE teams moves the monster to its new position if its sort key changed.
+
+        O(log(n) + d) complexity where n is the size of the team and d the number of positions the monster moves
+            - items are found by binary search on their old key, see ArraySortedList.update_key()
+        O(1) complexity best/worst case for monsters that are no longer in the team
+        """
+        member = self.members.get(monster)
+        if member is None:
+            return
+        self.fresh = False
+        old_hp, old_elements, speed = member
+        hp = monster.get_hp()
+        elements = monster.element_values()
+        self._total_hp += hp - old_hp
+        self._alive_count += (hp > 0) - (old_hp > 0)
+        if elements is not old_elements:
+            # evolved into a monster with other elements
+            for element in old_elements:
+                self._remove_element(element)
+            for element in elements:
+                self._add_element(element)
+        new_speed = monster.get_speed()
+        if new_speed != speed:
+            self._remove_speed(speed)
+            self._add_speed(new_speed)
+        self.members[monster] = (hp, elements, new_speed)
+
+        item = self.optimised_items.get(monster)
+        if item is None:
+            return
+        key = self._item_key(monster)
+        if key != item.key:
+            self.optimised_team.update_key(item, key)
+
+    @property
+    def total_hp(self) -> int:
+        """The sum of the current HP of the monsters in the team. O(1)"""
+        return self._total_hp
+
+    @property
+    def alive_count(self) -> int:
+        """The number of monsters in the team with HP left. O(1)"""
+        return self._alive_count
+
+    @property
+    def max_speed(self) -> Optional[int]:
+        """The highest speed of the monsters in the team, None for an empty team. O(1)"""
+        if len(self.speeds) == 0:
+            return None
+        return self.speeds[len(self.speeds) - 1].key
+
+    @property
+    def element_mask(self) -> int:
+        """
+        The elements of the monsters in the team as a bit mask, in the same layout as BSet.elems
+        (bit value - 1 is set for every Element value present). O(1)
+        """
+        return self._element_mask
+
+    def _track(self, monster: MonsterBase) -> None:
+        """
+        Adds a monster joining the team to the aggregates, and observes it.
+
+        O(log(d)) complexity best case, O(d) worst case where d is the number of different speeds in the team
+            - O(1) when another monster of the team already has the same speed
+        """
+        hp = monster.get_hp()
+        elements = monster.element_values()
+        speed = monster.get_speed()
+        self._total_hp += hp
+        self._alive_count += hp > 0
+        for element in elements:
+            self._add_element(element)
+        self._add_speed(speed)
+        self.members[monster] = (hp, elements, speed)
+        monster.observer = self
+
+    def _untrack(self, monster: MonsterBase) -> None:
+        """
+        Removes a monster leaving the team from the aggregates, and stops observing it.
+
+        O(1) complexity best case, O(log(d) + d) worst case where d is the number of different speeds in the team
+            - the worst case is the last monster with its speed leaving, see _remove_speed()
+        """
+        hp, elements, speed = self.members.pop(monster)
+        self._total_hp -= hp
+        self._alive_count -= hp > 0
+        for element in elements:
+            self._remove_element(element)
+        self._remove_speed(speed)
+        monster.observer = None
+
+    def _add_speed(self, speed: int) -> None:
+        item = self.speed_counts.get(speed)
+        if item is None:
+            item = self.speed_counts[speed] = ListItem(0, speed)
+            self.speeds.add(item)
+        item.value += 1
+
+    def _remove_speed(self, speed: int) -> None:
+        item = self.speed_counts[speed]
+        item.value -= 1
+        if item.value == 0:
+            del self.speed_counts[speed]
+            self.speeds.delete_at_index(self.speeds.position_of(item))
+
+    def _add_element(self, element: int) -> None:
+        self.element_counts[element] += 1
+        self._element_mask |= 1 << (element - 1)
+
+    def _remove_element(self, element: int) -> None:
+        self.element_counts[element] -= 1
+        if self.element_counts[element] == 0:
+            self._element_mask &= ~(1 << (element - 1))
+
+    def _make_aggregates(self) -> None:
+        """
+        Creates new, empty team aggregates (new containers, so a shallow copy of the team can get its own).
+
+        O(e) complexity best/worst case where e is the number of elements
+        """
+        # monster -> (HP, element values, speed) as last counted
+        self.members: dict[MonsterBase, tuple] = {}
+        # the different speeds in the team, sorted, each with the number of monsters that have it
+        self.speeds = ArraySortedList(self.TEAM_LIMIT)
+        self.speed_counts: dict[int, ListItem] = {}
+        # how many monsters of the team have each element, by Element value
+        self.element_counts = array("i", [0]) * (len(Element) + 1)
+        self._total_hp = 0
+        self._alive_count = 0
+        self._element_mask = 0
+
+    def _clear_aggregates(self) -> None:
+        """
+        Empties the team aggregates in place.
+
+        O(e) complexity best/worst case where e is the number of elements
+        """
+        self.members.clear()
+        self.speeds.clear()
+        self.speed_counts.clear()
+        for i in range(len(self.element_counts)):
+            self.element_counts[i] = 0
+        self._total_hp = 0
+        self._alive_count = 0
+        self._element_mask = 0
     
 
     def special(self) -> None:
@@ -205,6 +473,7 @@ class MonsterTeam:
         """ 
         ########### FRONT TEAM COMPLEXITY ###########    
 
+        self.fresh = False
 
         # if team mode is front
         if self.team_mode == self.TeamMode.FRONT:
@@ -260,24 +529,25 @@ class MonsterTeam:
         """
         Both best and worse case complexity is O(n * logn)
             - where n is the size of the optimised team 
-            - logn is due to the add() method which uses binary search
+            - the items are added back in retrieval order with negated keys, see ArraySortedList.fill_reversed()
         """ 
         ########### OPTIMISE TEAM COMPLEXITY ###########   
 
 
         if self.team_mode == self.TeamMode.OPTIMISE:
-            temp_list = ArraySortedList(len(self.optimised_team))
             # update the sort direction
             self.sort_direction *= -1
 
-            # iterate through the optimised team and add the monsters with the updated sort direction to the temp list
+            # add the items back in retrieval order with their keys negated
                 # this will change the sort direction from whatever it is 
                     # if its descending (-1) it will change to ascending (1)
-            for i in range(len(self.optimised_team)):
-                item = self.optimised_team[i]
-                item.key = item.key * -1
-                temp_list.add(item)
-            self.optimised_team = temp_list
+            sorted_list = self.optimised_team
+            n = len(sorted_list)
+            items = ArrayR(n)
+            for i in range(n):
+                items[i] = sorted_list.array[n - 1 - i]
+                items[i].key = - items[i].key
+            sorted_list.fill_reversed(items)
 
     
  
@@ -297,17 +567,26 @@ class MonsterTeam:
         On regenerating teams:
             - Best/Worse case complexity = O(n) where n is the number of monsters in the provided monsters array
             - This is because we populate self.provided_monsters with monsters that are chosen on initialisation no matter the selection mode
+            - With recycle=True nothing is allocated: the containers are emptied and every monster is reset in place
         """
 
-        self.front_team = Stack(self.TEAM_LIMIT)
-        self.back_team = CircularQueue(self.TEAM_LIMIT)
-        self.optimised_team = ArraySortedList(self.TEAM_LIMIT)
+        self._free_pooled()
+        if self.recycle and len(self.spawned) > 0:
+            self._recycle_team()
+            self.fresh = True
+            return
+
+        self._make_containers()
+        self._free_spawned()
+        # provided_monsters is (re)filled below
+        self._encoding = _NOT_ENCODED
 
         # initial sort direction is -1 as we want to sort in descending order as a default
             # this will occur for regenerating teams as well
         self.sort_direction = - 1
 
         # create provided_monsters
+        self.bulk_items = []
         if self.selection_mode == self.SelectionMode.RANDOM:
             self.select_randomly()
         elif self.selection_mode == self.SelectionMode.MANUAL:
@@ -316,38 +595,223 @@ class MonsterTeam:
             self.select_provided(self.provided_monsters)
         else:
             raise ValueError(f"self.selection_mode {self.selection_mode} not supported.")
+        self._sort_bulk_items()
         
         # switch to provided so we can regenerate teams to initial state (this will occur on innitialisation)
         self.selection_mode = self.SelectionMode.PROVIDED
+        self.fresh = True
+
+
 
 
+    def _make_containers(self) -> None:
+        """
+        Creates new, empty containers for every team mode.
 
+        O(1) complexity best/worst case (the containers start with a capacity of at most TEAM_LIMIT and grow as needed)
+        """
+        capacity = min(self.team_limit, self.TEAM_LIMIT)
+        self.front_team = GrowableArrayStack(capacity)
+        self.back_team = GrowableCircularQueue(capacity)
+        self.optimised_team = ArraySortedList(capacity)
+        # monster -> its item in optimised_team
+        self.optimised_items: dict[MonsterBase, ListItem] = {}
+        self._make_aggregates()
+
+    def _recycle_team(self) -> None:
+        """
+        Resets the team to its provided monsters without allocating: the containers are emptied
+        and every spawned monster goes back to its provided class (if it evolved), level 1 and full HP.
+
+        O(n) complexity best/worst case for FRONT and BACK teams where n is the size of the team
+        O(n * log(n)) complexity for OPTIMISE teams, see _sort_bulk_items()
+        """
+        self.front_team.clear()
+        self.back_team.clear()
+        self.optimised_team.clear()
+        self.optimised_items.clear()
+        self._clear_aggregates()
+        self.sort_direction = - 1
+        self.bulk_items = []
+        for i in range(len(self.spawned)):
+            self.spawned[i] = self.spawned[i].respawn(self.provided_monsters[i])
+            self.add_to_team(self.spawned[i])
+        self._sort_bulk_items()
+
+    def _sort_bulk_items(self) -> None:
+        """
+        Writes the OPTIMISE items collected while the team was being filled into optimised_team,
+        in the order adding them one by one would (equal keys included), without shuffling the sorted list on every add.
+
+        O(n * log(n)) complexity best/worst case where n is the size of the team, see ArraySortedList.fill_reversed()
+        """
+        items = self.bulk_items
+        self.bulk_items = None
+        if len(items) == 0:
+            return
+        self.optimised_team.fill_reversed(items)
+
+    def _spawn(self, monster_class: type[MonsterBase]) -> MonsterBase:
+        """
+        Creates a monster for the team, in the team's pool if it has one.
+
+        O(1) complexity best/worst case (amortised for pools)
+        """
+        if self.pool is None:
+            monster = monster_class()
+        else:
+            monster = self.pool.spawn(monster_class)
+        self.spawned.append(monster)
+        return monster
+
+    def _from_snapshot(self, state: tuple) -> MonsterBase:
+        """MonsterBase.from_snapshot, in the team's pool if it has one. O(1) complexity best/worst case (amortised for pools)"""
+        if self.pool is None:
+            return MonsterBase.from_snapshot(state)
+        monster = self.pool.from_snapshot(state)
+        self.pooled.append(monster)
+        return monster
+
+    def _free_pooled(self) -> None:
+        """
+        Returns the slots of the monsters restored from a snapshot to the pool.
+
+        O(p) complexity best/worst case where p is the number of monsters restore() took from the pool
+        """
+        if self.pool is None:
+            return
+        for monster in self.pooled:
+            self.pool.free(monster)
+        self.pooled = []
+
+    def release(self) -> None:
+        """
+        Returns the slots of the monsters restore() took from the team's pool, for a copy of a team
+        (see Battle.fork) that is no longer needed. The team must be restored or regenerated before it is used again.
+
+        O(p) complexity best/worst case where p is the number of monsters restore() took from the pool
+        """
+        self._free_pooled()
+
+    def __copy__(self) -> MonsterTeam:
+        """
+        A shallow copy sharing the team's mode, sort key, provided monsters, policy and pool (see Battle.fork).
+        The copy owns none of the team's monsters, so restoring, regenerating or releasing it never frees them.
+
+        O(1) complexity best/worst case
+        """
+        copied = object.__new__(type(self))
+        copied.__dict__.update(self.__dict__)
+        copied.pooled = []
+        copied.spawned = []
+        return copied
+
+    def _free_spawned(self) -> None:
+        """
+        Forgets the spawned monsters, returning their slots to the pool if the team has one.
+
+        O(n) complexity best/worst case where n is the size of the team
+        """
+        if self.pool is not None:
+            for monster in self.spawned:
+                self.pool.free(monster)
+        self.spawned = []
+
+    def snapshot(self) -> tuple:
+        """
+        Returns an immutable copy of the monsters currently in the team, in container order.
+
+        The result is (sort_direction, monsters) where monsters is a tuple of MonsterBase.snapshot() states
+        (paired with their sort key for OPTIMISE teams). Snapshots share nothing mutable with the team,
+        so one snapshot can be restored any number of times.
+
+        O(n) complexity best/worst case where n is the number of monsters in the team
+        """
+        if self.team_mode == self.TeamMode.FRONT:
+            # bottom of the stack first
+            monsters = tuple(self.front_team.array[i].snapshot() for i in range(len(self.front_team)))
+        elif self.team_mode == self.TeamMode.BACK:
+            queue = self.back_team
+            monsters = tuple(
+                queue.array[(queue.front + i) % len(queue.array)].snapshot() for i in range(len(queue))
+            )
+        elif self.team_mode == self.TeamMode.OPTIMISE:
+            items = self.optimised_team
+            monsters = tuple((items[i].value.snapshot(), items[i].key) for i in range(len(items)))
+        return (self.sort_direction, monsters)
+
+    def restore(self, state: tuple) -> None:
+        """
+        Replaces the contents of the team with new monster instances built from a snapshot().
+
+        Fresh containers are created, so a shallow copy of a team can be restored
+        without affecting the containers of the original team.
+        The monsters a previous restore() took from the team's pool are returned to it.
+
+        O(n) complexity best/worst case where n is the number of monsters in the snapshot
+            - OPTIMISE items are written straight into the sorted list as they are already in order
+        """
+        sort_direction, monsters = state
+        self._make_containers()
+        # copies have their own list (see __copy__), so these handles are only used by this team
+        self._free_pooled()
+        self.sort_direction = sort_direction
+        self.fresh = False
+
+        if self.team_mode == self.TeamMode.FRONT:
+            for monster in monsters:
+                monster = self._from_snapshot(monster)
+                self._track(monster)
+                self.front_team.push(monster)
+        elif self.team_mode == self.TeamMode.BACK:
+            for monster in monsters:
+                monster = self._from_snapshot(monster)
+                self._track(monster)
+                self.back_team.append(monster)
+        elif self.team_mode == self.TeamMode.OPTIMISE:
+            items = self.optimised_team
+            for monster, key in monsters:
+                if items.is_full():
+                    items._resize()
+                item = ListItem(self._from_snapshot(monster), key)
+                self._track(item.value)
+                items.array[len(items)] = item
+                items.length += 1
+                self.optimised_items[item.value] = item
 
     def select_randomly(self):
-        team_size = RandomGen.randint(1, self.TEAM_LIMIT)
-        monsters = get_all_monsters()
-        n_spawnable = 0
-        for x in range(len(monsters)):
-            if monsters[x].can_be_spawned():
-                n_spawnable += 1
+        """
+        Spawns a random team of 1 to team_limit spawnable monsters.
+        Monsters are drawn in proportion to their catalog spawn_weight, if the catalog has any.
+
+        O(n) complexity best/worst case where n is the size of the team
+            - every pick is O(1), see MonsterRegistry.sample_spawnable()
+        """
+        team_size = RandomGen.randint(1, self.team_limit)
+        registry = get_registry()
 
         for _ in range(team_size):
-            spawner_index = RandomGen.randint(0, n_spawnable-1)
-            cur_index = -1
-            for x in range(len(monsters)):
-                if monsters[x].can_be_spawned():
-                    cur_index += 1
-                    if cur_index == spawner_index:
-                        # Spawn this monster
-                        # adding mosters to provided monsters array for regeneration
-                        self.provided_monsters[self.provided_monsters_index] = monsters[x]
-                        self.provided_monsters_index += 1
-                        self.add_to_team(monsters[x]())
-                        break
-            else:
-                raise ValueError("Spawning logic failed.")
-            
-    
+            monster = registry.sample_spawnable()
+            # adding mosters to provided monsters array for regeneration
+            self.provided_monsters[self.provided_monsters_index] = monster
+            self.provided_monsters_index += 1
+            self.add_to_team(self._spawn(monster))
+
+    @classmethod
+    def random_teams(cls, k: int, team_mode: TeamMode = None, **kwargs) -> Iterator[MonsterTeam]:
+        """
+        Yields k randomly selected teams, drawing from RandomGen in the same order
+        as creating them one by one with SelectionMode.RANDOM.
+
+        :team_mode: The mode of every team. Defaults to BACK.
+        :kwargs: Passed on to every MonsterTeam (e.g. sort_key, policy).
+
+        O(k * n) complexity best/worst case where n is the size of a team
+        """
+        if team_mode is None:
+            team_mode = cls.TeamMode.BACK
+        for _ in range(k):
+            yield cls(team_mode, cls.SelectionMode.RANDOM, **kwargs)
 
     def select_manually(self):
         """
@@ -468,7 +932,7 @@ class MonsterTeam:
         
         # Prompting user for team size
         num_of_user_monsters = int(input("How many monsters are there? "))
-        while num_of_user_monsters < 1 or num_of_user_monsters > self.TEAM_LIMIT:
+        while num_of_user_monsters < 1 or num_of_user_monsters > self.team_limit:
             print("Invalid team size.")
             num_of_user_monsters = int(input("How many monsters are there? "))
 
@@ -492,7 +956,7 @@ class MonsterTeam:
                     # adding mosters to provided monsters array for regeneration 
                     self.provided_monsters[self.provided_monsters_index] = monsters[user_monster-1]
                     self.provided_monsters_index += 1
-                    self.add_to_team(monsters[user_monster-1]())
+                    self.add_to_team(self._spawn(monsters[user_monster-1]))
                     break
                 else:
                     print("This monster cannot be spawned.")
@@ -527,17 +991,16 @@ class MonsterTeam:
                 break
             if monster.can_be_spawned() is False:
                 raise ValueError(f"Monster {monster} cannot be spawned.")
-            self.add_to_team(monster())
+            self.add_to_team(self._spawn(monster))
 
             
 
 
     def choose_action(self, currently_out: MonsterBase, enemy: MonsterBase) -> Battle.Action:
-        # This is just a placeholder function that doesn't matter much for testing.
-        from battle import Battle
-        if currently_out.get_speed() >= enemy.get_speed() or currently_out.get_hp() >= enemy.get_hp():
-            return Battle.Action.ATTACK
-        return Battle.Action.SWAP
+        """
+        Asks the team's policy (policies.HeuristicPolicy unless one was given with policy=...) for an action.
+        """
+        return self.policy.choose_action(currently_out, enemy)
 
 if __name__ == "__main__":
     team = MonsterTeam(
@@ -0,0 +1,139 @@
+"""
+Canonical compact encoding of a team's composition.
+
+Two teams with the same mode, sort key and provided monsters (in the same order)
+fight identically from a fresh regenerate_team(), so they have the same encoding:
+
+    header:     team mode (u8) | sort key (u8, 0 = none) | index width (u8, 2 or 4) | size (u32)
+    monsters:   size x catalog index (u16, or u32 for catalogs of more than 65,536 monsters)
+
+Catalog indices are those of the process-wide registry (see helpers.get_registry()).
+Teams with a monster class that is not in the catalog have no encoding.
+The encoding is the key for every cache of battle results, see MonsterTeam.encoding().
+
+Usage:
+    data = team.encoding()
+    copy = MonsterTeam.from_encoding(data)      # a fresh team with the same composition
+    assert copy == team and hash(copy) == hash(team)
+"""
+from __future__ import annotations
+import struct
+from typing import Optional, TYPE_CHECKING
+
+from data_structures.referential_array import ArrayR
+from helpers import get_registry
+
+if TYPE_CHECKING:
+    from team import MonsterTeam
+
+
+HEADER = struct.Struct("<BBBI")
+NARROW_INDEX = 2
+WIDE_INDEX = 4
+
+_INDEX_FORMATS = {NARROW_INDEX: "H", WIDE_INDEX: "I"}
+
+
+def catalog_indices(team: MonsterTeam) -> Optional[ArrayR[int]]:
+    """
+    The catalog indices of a team's provided monsters, in order, or None if one of them is not in the catalog.
+
+    O(n) complexity best/worst case where n is the number of provided monsters
+    """
+    registry = get_registry()
+    provided = team.provided_monsters
+    size = 0
+    for monster in provided:
+        if monster is None:
+            break
+        size += 1
+
+    indices = ArrayR(size)
+    for i in range(size):
+        index = registry.class_index.get(provided[i])
+        if index is None:
+            return None
+        indices[i] = index
+    return indices
+
+
+def pack(team_mode: int, sort_key: int, monster_indices: ArrayR[int]) -> bytes:
+    """
+    O(n) complexity best/worst case where n is the number of monster indices
+    """
+    width = NARROW_INDEX if len(get_registry()) <= 1 << 16 else WIDE_INDEX
+    size = len(monster_indices)
+    return HEADER.pack(team_mode, sort_key, width, size) + struct.pack(
+        f"<{size}{_INDEX_FORMATS[width]}", *monster_indices
+    )
+
+
+def unpack(data: bytes) -> tuple[int, int, ArrayR[int]]:
+    """
+    Returns (team mode, sort key, catalog indices) of an encoding.
+
+    O(n) complexity best/worst case where n is the size of the team
+    :raises ValueError: if data is not a team encoding
+    """
+    if len(data) < HEADER.size:
+        raise ValueError("Truncated team encoding.")
+    team_mode, sort_key, width, size = HEADER.unpack_from(data)
+    if width not in _INDEX_FORMATS:
+        raise ValueError(f"Unsupported catalog index width {width}.")
+    if len(data) != HEADER.size + width * size:
+        raise ValueError("Team encoding does not match its size.")
+    values = struct.unpack_from(f"<{size}{_INDEX_FORMATS[width]}", data, HEADER.size)
+    indices = ArrayR(size)
+    for i in range(size):
+        indices[i] = values[i]
+    return team_mode, sort_key, indices
+
+
+def encode(team: MonsterTeam) -> Optional[bytes]:
+    """
+    The encoding of a team, or None if one of its provided monsters is not in the catalog.
+
+    O(n) complexity best/worst case where n is the number of provided monsters
+    """
+    indices = catalog_indices(team)
+    if indices is None:
+        return None
+    sort_key = 0 if team.sort_key is None else team.sort_key.value
+    return pack(team.team_mode.value, sort_key, indices)
+
+
+def build_team(team_mode: int, sort_key: int, monster_indices: ArrayR[int], **kwargs) -> MonsterTeam:
+    """
+    Builds a fresh PROVIDED team from its mode, sort key and catalog indices.
+
+    :kwargs: Passed on to MonsterTeam (e.g. policy, pool). team_limit defaults to
+        the larger of TEAM_LIMIT and the size of the team.
+
+    O(n) complexity best/worst case where n is the size of the team
+    """
+    from team import MonsterTeam
+
+    registry = get_registry()
+    provided = ArrayR(len(monster_indices))
+    for i in range(len(monster_indices)):
+        provided[i] = registry[monster_indices[i]]
+
+    kwargs.setdefault("team_limit", max(MonsterTeam.TEAM_LIMIT, len(provided)))
+    return MonsterTeam(
+        team_mode=MonsterTeam.TeamMode(team_mode),
+        selection_mode=MonsterTeam.SelectionMode.PROVIDED,
+        sort_key=MonsterTeam.SortMode(sort_key) if sort_key else None,
+        provided_monsters=provided,
+        **kwargs,
+    )
+
+
+def decode(data: bytes, **kwargs) -> MonsterTeam:
+    """
+    Builds a fresh team from an encoding, see build_team().
+
+    O(n) complexity best/worst case where n is the size of the team
+    :raises ValueError: if data is not a team encoding
+    """
+    team_mode, sort_key, indices = unpack(data)
+    return build_team(team_mode, sort_key, indices, **kwargs)
@@ -0,0 +1,124 @@
+import os
+import tempfile
+from unittest import TestCase
+
+from ed_utils.decorators import number, visibility
+from ed_utils.timeout import timeout
+
+from battle import Battle
+from battle_cache import BattleCache
+from helpers import Flamikin, Aquariuma
+from lookahead import LookaheadPolicy
+from random_gen import RandomGen
+from team import MonsterTeam
+
+from data_structures.referential_array import ArrayR
+
+class TestBattleCache(TestCase):
+
+    @number("16.1")
+    @visibility(visibility.VISIBILITY_SHOW)
+    @timeout()
+    def test_results_and_counters(self):
+        RandomGen.set_seed(21)
+        teams = list(MonsterTeam.random_teams(8, MonsterTeam.TeamMode.BACK))
+        pairs = [(teams[i], teams[j]) for i in range(len(teams)) for j in range(len(teams)) if i != j]
+
+        plain = Battle(verbosity=0)
+        expected = []
+        for team1, team2 in pairs:
+            team1.regenerate_team()
+            team2.regenerate_team()
+            expected.append(plain.battle(team1, team2))
+
+        cache = BattleCache(maxsize=1000)
+        battle = Battle(verbosity=0, cache=cache)
+        for _ in range(2):
+            for (team1, team2), result in zip(pairs, expected):
+                team1.regenerate_team()
+                team2.regenerate_team()
+                self.assertEqual(battle.battle(team1, team2), result)
+        self.assertEqual(cache.misses, len(pairs))
+        self.assertEqual(cache.hits, len(pairs))
+        self.assertEqual(cache.bypassed, 0)
+
+        # least recently used results are evicted
+        small = BattleCache(maxsize=2)
+        battle = Battle(verbosity=0, cache=small)
+        for team1, team2 in pairs[:3] + pairs[:1]:
+            team1.regenerate_team()
+            team2.regenerate_team()
+            battle.battle(team1, team2)
+        self.assertEqual(len(small), 2)
+        self.assertEqual((small.hits, small.misses), (0, 4))
+
+        # teams that are not fresh are played out
+        team1, team2 = pairs[0]
+        team1.regenerate_team()
+        team2.regenerate_team()
+        team1.special()
+        self.assertIsNone(cache.key(battle, team1, team2))
+        team1.regenerate_team()
+        self.assertIsNotNone(cache.key(battle, team1, team2))
+        team1.retrieve_from_team()
+        self.assertIsNone(cache.key(battle, team1, team2))
+
+        # as are teams whose policy has no cache key
+        provided = ArrayR(2)
+        provided[0] = Flamikin
+        provided[1] = Aquariuma
+        searcher = MonsterTeam(MonsterTeam.TeamMode.FRONT, MonsterTeam.SelectionMode.PROVIDED,
+                               provided_monsters=provided, policy=LookaheadPolicy(Battle(), depth=1))
+        team2.regenerate_team()
+        self.assertIsNone(cache.key(battle, searcher, team2))
+
+    @number("16.2")
+    @visibility(visibility.VISIBILITY_SHOW)
+    @timeout()
+    def test_disk_tier(self):
+        RandomGen.set_seed(5)
+        team1, team2 = MonsterTeam.random_teams(2, MonsterTeam.TeamMode.FRONT)
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "battles")
+            with BattleCache(path=path) as cache:
+                result = Battle(verbosity=0, cache=cache).battle(team1, team2)
+                self.assertEqual(cache.misses, 1)
+
+            team1.regenerate_team()
+            team2.regenerate_team()
+            with BattleCache(path=path) as cache:
+                self.assertEqual(Battle(verbosity=0, cache=cache).battle(team1, team2), result)
+                self.assertEqual((cache.disk_hits, cache.misses), (1, 0))
+                # now in memory too
+                self.assertEqual(cache.get(cache.key(Battle(), team1, team2)), result)
+                self.assertEqual(cache.hits, 1)
+
+    @number("16.3")
+    @visibility(visibility.VISIBILITY_SHOW)
+    @timeout()
+    def test_state_after_hit(self):
+        RandomGen.set_seed(13)
+        team1, team2, team3 = MonsterTeam.random_teams(3, MonsterTeam.TeamMode.BACK)
+        plain = Battle(verbosity=0)
+        expected = plain.battle(team1, team2)
+        team1.regenerate_team()
+        team2.regenerate_team()
+
+        battle = Battle(verbosity=0, cache=BattleCache())
+        self.assertEqual(battle.battle(team1, team2), expected)
+        # a miss is played, like a battle without a cache
+        self.assertEqual(battle.turn_number, plain.turn_number)
+        self.assertEqual((str(battle.out1), str(battle.out2)), (str(plain.out1), str(plain.out2)))
+
+        battle.battle(team3, team1)
+        team1.regenerate_team()
+        team2.regenerate_team()
+        self.assertEqual(battle.battle(team1, team2), expected)
+        # a hit is not played: no state is left over from the battle before
+        self.assertEqual(battle.cache.hits, 1)
+        self.assertIs(battle.team1, team1)
+        self.assertIs(battle.team2, team2)
+        self.assertIsNone(battle.out1)
+        self.assertIsNone(battle.out2)
+        self.assertIsNone(battle.turn_number)
+        self.assertTrue(team1.fresh and team2.fresh)
@@ -0,0 +1,134 @@
+import os
+import tempfile
+from unittest import TestCase, mock
+
+import yaml
+
+from ed_utils.decorators import number, visibility
+from ed_utils.timeout import timeout
+
+import bundle
+import elements
+import helpers
+from bundle import GameDataBundle
+from elements import EFFECTIVENESS_CSV, EffectivenessCalculator, Element
+from helpers import CATALOG_PATH, get_registry
+from stats import FORMULA_OPERATORS
+
+class TestBundle(TestCase):
+
+    @number("13.1")
+    @visibility(visibility.VISIBILITY_SHOW)
+    @timeout()
+    def test_bundle_round_trip(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "game_data.bundle")
+            bundle.write(path, CATALOG_PATH, EFFECTIVENESS_CSV)
+            game_data = GameDataBundle(path)
+            registry = game_data.registry()
+            calculator = game_data.effectiveness()
+
+            default = get_registry()
+            self.assertEqual(registry.source_hash, default.source_hash)
+            self.assertEqual(len(registry), len(default))
+            for i in range(len(default)):
+                original, loaded = default[i], registry[i]
+                self.assertEqual(loaded.get_name(), original.get_name())
+                self.assertEqual(loaded.get_description(), original.get_description())
+                self.assertEqual(loaded.get_element(), original.get_element())
+                self.assertEqual(loaded.get_elements(), original.get_elements())
+                self.assertEqual(loaded.can_be_spawned(), original.can_be_spawned())
+                evolution = original.get_evolution()
+                self.assertEqual(
+                    None if loaded.get_evolution() is None else loaded.get_evolution().get_name(),
+                    None if evolution is None else evolution.get_name(),
+                )
+                for level in (1, 2, 5):
+                    a = original.get_complex_stats()
+                    b = loaded.get_complex_stats()
+                    self.assertEqual(
+                        (b.get_attack(level), b.get_defense(level), b.get_speed(level), b.get_max_hp(level)),
+                        (a.get_attack(level), a.get_defense(level), a.get_speed(level), a.get_max_hp(level)),
+                    )
+                # built from the compiled formulas, numbers are not turned back into strings
+                for token in loaded.get_complex_stats().max_hp_formula:
+                    self.assertTrue(isinstance(token, float) or token in FORMULA_OPERATORS)
+                a, b = original(), loaded()
+                self.assertEqual(
+                    (b.get_attack(), b.get_defense(), b.get_speed(), b.get_max_hp()),
+                    (a.get_attack(), a.get_defense(), a.get_speed(), a.get_max_hp()),
+                )
+
+            saved = EffectivenessCalculator.instance
+            try:
+                expected = {}
+                for attacker in Element:
+                    for defender in Element:
+                        expected[attacker.value, defender.value] = EffectivenessCalculator.get_effectiveness(attacker, defender)
+                EffectivenessCalculator.instance = calculator
+                for attacker in Element:
+                    for defender in Element:
+                        self.assertEqual(EffectivenessCalculator.get_effectiveness(attacker, defender), expected[attacker.value, defender.value])
+            finally:
+                EffectivenessCalculator.instance = saved
+            del registry, calculator, game_data
+
+    @number("13.2")
+    @visibility(visibility.VISIBILITY_SHOW)
+    @timeout()
+    def test_rejects_other_files(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "not_a.bundle")
+            with open(path, "wb") as f:
+                f.write(b"MBRL" + bytes(200))
+            self.assertRaises(ValueError, lambda: GameDataBundle(path))
+
+            self.assertRaises(ValueError, lambda: bundle.compile_formula(["1", "level", "divide"]))
+
+    @number("13.3")
+    @visibility(visibility.VISIBILITY_SHOW)
+    @timeout()
+    def test_explicit_and_stale_sources(self):
+        saved = (helpers._registry, EffectivenessCalculator.instance)
+        with tempfile.TemporaryDirectory() as directory:
+            with open(CATALOG_PATH) as f:
+                records = yaml.safe_load(f)
+            catalog = os.path.join(directory, "monsters.yaml")
+            with open(catalog, "w") as f:
+                yaml.safe_dump(records[::-1], f)
+            with open(EFFECTIVENESS_CSV) as f:
+                names = f.readline().strip().split(",")
+            table = os.path.join(directory, "type_effectiveness.csv")
+            with open(table, "w") as f:
+                f.write(",".join(names) + "\n" + "\n".join(",".join("1" for _ in names) for _ in names) + "\n")
+
+            current = os.path.join(directory, "current.bundle")
+            bundle.write(current, CATALOG_PATH, EFFECTIVENESS_CSV)
+            stale = os.path.join(directory, "stale.bundle")
+            bundle.write(stale, catalog, table)
+            try:
+                with mock.patch.object(bundle, "_bundles", {}):
+                    # a bundle of the current data files stands in for them
+                    with mock.patch.object(bundle, "BUNDLE_PATH", current):
+                        helpers._registry = None
+                        registry = get_registry()
+                        self.assertEqual(registry.source_hash, saved[0].source_hash)
+                        self.assertIsInstance(registry[0].get_complex_stats().max_hp_formula[0], float)
+                        EffectivenessCalculator.make_singleton()
+                        self.assertEqual(EffectivenessCalculator.instance.source_hash, GameDataBundle(current).effectiveness_hash)
+
+                    with mock.patch.object(bundle, "BUNDLE_PATH", stale):
+                        # one built from other versions of them is refused
+                        helpers._registry = None
+                        self.assertRaises(ValueError, get_registry)
+                        self.assertRaises(ValueError, EffectivenessCalculator.make_singleton)
+
+                        # explicit paths are read instead of the bundle
+                        with mock.patch.object(helpers, "CATALOG_PATH", catalog):
+                            helpers._registry = None
+                            self.assertIsInstance(get_registry()[0].get_complex_stats().max_hp_formula[0], str)
+                        with mock.patch.object(elements, "EFFECTIVENESS_PATH", table):
+                            EffectivenessCalculator.make_singleton()
+                            self.assertEqual(EffectivenessCalculator.instance.source_hash, GameDataBundle(stale).effectiveness_hash)
+            finally:
+                helpers._registry, EffectivenessCalculator.instance = saved
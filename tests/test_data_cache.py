@@ -0,0 +1,37 @@
+import os
+import tempfile
+from unittest import TestCase
+
+from ed_utils.decorators import number, visibility
+from ed_utils.timeout import timeout
+
+import data_cache
+from data_cache import load_cached
+
+class TestDataCache(TestCase):
+
+    @number("11.1")
+    @visibility(visibility.VISIBILITY_SHOW)
+    @timeout()
+    def test_cache_reused_and_invalidated(self):
+        calls = []
+
+        def parse(source):
+            calls.append(source)
+            return [int(x) for x in source.split()]
+
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "numbers.txt")
+            with open(path, "w") as f:
+                f.write("1 2 3")
+
+            self.assertEqual(load_cached(path, parse), [1, 2, 3])
+            self.assertEqual(load_cached(path, parse), [1, 2, 3])
+            self.assertEqual(len(calls), 1)
+            self.assertTrue(os.path.exists(data_cache.cache_path(path, data_cache.file_hash(path))))
+
+            # changing the source invalidates the cache
+            with open(path, "w") as f:
+                f.write("4 5")
+            self.assertEqual(load_cached(path, parse), [4, 5])
+            self.assertEqual(len(calls), 2)
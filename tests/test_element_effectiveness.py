@@ -1,9 +1,12 @@
+import os
+import tempfile
 from unittest import TestCase
 
 from ed_utils.decorators import number, visibility
 from ed_utils.timeout import timeout
 
-from elements import EffectivenessCalculator, Element
+import effectiveness_matrix
+from elements import EFFECTIVENESS_CSV, EffectivenessCalculator, Element
 
 class TestElementEffectiveness(TestCase):
 
@@ -16,3 +19,64 @@ class TestElementEffectiveness(TestCase):
         self.assertEqual(EffectivenessCalculator.get_effectiveness(Element.NORMAL, Element.GHOST), 0)
         self.assertEqual(EffectivenessCalculator.get_effectiveness(Element.DRAGON, Element.DRAGON), 2)
         self.assertEqual(EffectivenessCalculator.get_effectiveness(Element.WATER, Element.GRASS), 0.5)
+
+    @number("2.2")
+    @visibility(visibility.VISIBILITY_SHOW)
+    @timeout()
+    def test_matrix_file(self):
+        saved = EffectivenessCalculator.instance
+        try:
+            EffectivenessCalculator.make_singleton()
+            from_csv = EffectivenessCalculator.instance
+            with tempfile.TemporaryDirectory() as directory:
+                path = os.path.join(directory, "type_effectiveness.mat")
+                effectiveness_matrix.write(path, EFFECTIVENESS_CSV)
+                EffectivenessCalculator.make_singleton(path)
+                mapped = EffectivenessCalculator.instance
+                self.assertIsNot(mapped, from_csv)
+                self.assertEqual(mapped.source_hash, from_csv.source_hash)
+                self.assertEqual(list(mapped.element_names), list(from_csv.element_names))
+                for attacker in Element:
+                    for defender in Element:
+                        EffectivenessCalculator.instance = from_csv
+                        expected = EffectivenessCalculator.get_effectiveness(attacker, defender)
+                        EffectivenessCalculator.instance = mapped
+                        self.assertEqual(EffectivenessCalculator.get_effectiveness(attacker, defender), expected)
+                del mapped
+                EffectivenessCalculator.instance = None
+
+                with open(path, "r+b") as f:
+                    f.write(b"NOPE")
+                self.assertRaises(ValueError, lambda: effectiveness_matrix.load(path))
+        finally:
+            EffectivenessCalculator.instance = saved
+
+    @number("2.3")
+    @visibility(visibility.VISIBILITY_SHOW)
+    @timeout()
+    def test_batch_queries(self):
+        m = len(Element)
+        matrix = EffectivenessCalculator.matrix()
+        self.assertEqual(len(matrix), m * m)
+        self.assertIs(EffectivenessCalculator.matrix(), matrix)
+
+        attackers = []
+        defenders = []
+        for attacker in Element:
+            for defender in Element:
+                expected = EffectivenessCalculator.get_effectiveness(attacker, defender)
+                self.assertEqual(matrix[(attacker.value - 1) * m + (defender.value - 1)], expected)
+                attackers.append(attacker)
+                defenders.append(defender.value)
+
+        many = EffectivenessCalculator.get_effectiveness_many(attackers, defenders)
+        self.assertEqual(list(many), list(matrix))
+        self.assertEqual(
+            list(EffectivenessCalculator.get_effectiveness_many([Element.FIRE, Element.NORMAL], [Element.WATER, Element.GHOST])),
+            [0.5, 0],
+        )
+        self.assertRaises(ValueError, lambda: EffectivenessCalculator.get_effectiveness_many([Element.FIRE], []))
+
+        # the pair multipliers are built when the table is loaded, not on the first attack
+        self.assertIsNotNone(EffectivenessCalculator.default().combined)
+        self.assertIs(EffectivenessCalculator.combined_matrix(), EffectivenessCalculator.default().combined)
@@ -0,0 +1,68 @@
+from unittest import TestCase
+
+from ed_utils.decorators import number, visibility
+from ed_utils.timeout import timeout
+from random_gen import RandomGen
+
+from battle import Battle
+from lockstep import LockstepBattles
+from policies import ActionPolicy, HeuristicPolicy, TablePolicy
+from team import MonsterTeam
+
+from data_structures.referential_array import ArrayR
+
+class TestLockstep(TestCase):
+
+    @number("7.1")
+    @visibility(visibility.VISIBILITY_SHOW)
+    @timeout(10)
+    def test_matches_scalar_engine(self):
+        RandomGen.set_seed(20231008)
+        modes = [MonsterTeam.TeamMode.FRONT, MonsterTeam.TeamMode.BACK]
+        n = 300
+        pairs = ArrayR(n)
+        for i in range(n):
+            pairs[i] = (
+                MonsterTeam(modes[i % 2], MonsterTeam.SelectionMode.RANDOM),
+                MonsterTeam(modes[(i // 2) % 2], MonsterTeam.SelectionMode.RANDOM),
+            )
+
+        engine = LockstepBattles(pairs)
+        results = engine.run()
+
+        b = Battle(verbosity=0)
+        for i in range(n):
+            team1, team2 = pairs[i]
+            team1.regenerate_team()
+            team2.regenerate_team()
+            expected = b.battle(team1, team2)
+            self.assertEqual(results[i], expected, f"Battle {i}")
+            self.assertEqual(engine.turns[i], b.turn_number, f"Battle {i}")
+
+    @number("7.2")
+    @visibility(visibility.VISIBILITY_SHOW)
+    @timeout()
+    def test_unsupported_mode(self):
+        team = MonsterTeam(
+            MonsterTeam.TeamMode.OPTIMISE,
+            MonsterTeam.SelectionMode.RANDOM,
+            sort_key=MonsterTeam.SortMode.HP,
+        )
+        self.assertRaises(ValueError, lambda: LockstepBattles(ArrayR.from_list([(team, team)])))
+
+    @number("7.3")
+    @visibility(visibility.VISIBILITY_SHOW)
+    @timeout()
+    def test_team_policies(self):
+        class AlwaysAttack(ActionPolicy):
+            def choose_action(self, currently_out, enemy):
+                return Battle.Action.ATTACK
+
+        RandomGen.set_seed(12)
+        team1 = MonsterTeam(MonsterTeam.TeamMode.BACK, MonsterTeam.SelectionMode.RANDOM, policy=TablePolicy())
+        team2 = MonsterTeam(MonsterTeam.TeamMode.FRONT, MonsterTeam.SelectionMode.RANDOM, policy=AlwaysAttack())
+        # a policy deciding like the default one is played, any other is rejected
+        LockstepBattles(ArrayR.from_list([(team1, team1)]))
+        self.assertRaises(ValueError, lambda: LockstepBattles(ArrayR.from_list([(team1, team2)])))
+        # unless the engine is told which policy plays every team
+        LockstepBattles(ArrayR.from_list([(team1, team2)]), policy=HeuristicPolicy())
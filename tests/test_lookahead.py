@@ -0,0 +1,96 @@
+import time
+from unittest import TestCase
+
+from ed_utils.decorators import number, visibility
+from ed_utils.timeout import timeout
+from random_gen import RandomGen
+
+from battle import Battle
+from lookahead import LookaheadPolicy
+from team import MonsterTeam
+
+class TestLookahead(TestCase):
+
+    @number("9.1")
+    @visibility(visibility.VISIBILITY_SHOW)
+    @timeout(10)
+    def test_battle_with_lookahead(self):
+        RandomGen.set_seed(424242)
+        wins = 0
+        for _ in range(10):
+            b = Battle(verbosity=0)
+            policy = LookaheadPolicy(b, depth=3, max_nodes=200)
+            team1 = MonsterTeam(MonsterTeam.TeamMode.BACK, MonsterTeam.SelectionMode.RANDOM, policy=policy)
+            team2 = MonsterTeam(MonsterTeam.TeamMode.BACK, MonsterTeam.SelectionMode.RANDOM)
+            result = b.battle(team1, team2)
+            self.assertIn(result, Battle.Result)
+            self.assertLessEqual(policy.nodes, 200 + len(LookaheadPolicy.ACTIONS))
+            wins += result == Battle.Result.TEAM1
+        self.assertGreater(wins, 0)
+
+    @number("9.2")
+    @visibility(visibility.VISIBILITY_SHOW)
+    @timeout()
+    def test_search_does_not_touch_battle(self):
+        RandomGen.set_seed(77)
+        b = Battle(verbosity=0)
+        team1 = MonsterTeam(MonsterTeam.TeamMode.FRONT, MonsterTeam.SelectionMode.RANDOM)
+        team2 = MonsterTeam(MonsterTeam.TeamMode.OPTIMISE, MonsterTeam.SelectionMode.RANDOM, sort_key=MonsterTeam.SortMode.HP)
+        b.start(team1, team2)
+        out1, out2 = b.out1, b.out2
+        before = (str(team1), str(team2), str(out1), str(out2))
+
+        policy = LookaheadPolicy(b, depth=4, max_nodes=1000, time_budget=1)
+        action = policy.choose_action(b.out2, b.out1)
+        self.assertIn(action, LookaheadPolicy.ACTIONS)
+        self.assertIs(b.out1, out1)
+        self.assertIs(b.out2, out2)
+        self.assertEqual((str(team1), str(team2), str(out1), str(out2)), before)
+        # deeper plies revisit positions (e.g. FRONT swaps keep the same monster out)
+        self.assertGreater(policy.table.hits, 0)
+
+    @number("9.3")
+    @visibility(visibility.VISIBILITY_SHOW)
+    @timeout()
+    def test_one_policy_for_both_teams(self):
+        RandomGen.set_seed(91)
+        b = Battle(verbosity=0)
+        team1 = MonsterTeam(MonsterTeam.TeamMode.FRONT, MonsterTeam.SelectionMode.RANDOM)
+        team2 = MonsterTeam(MonsterTeam.TeamMode.BACK, MonsterTeam.SelectionMode.RANDOM)
+        b.start(team1, team2)
+        snapshot = b.snapshot()
+        hasher = LookaheadPolicy(b).hasher
+        self.assertNotEqual(hasher.hash(snapshot, 1), hasher.hash(snapshot, 2))
+
+        # values searched for team 1 are not reused for team 2
+        shared = LookaheadPolicy(b, depth=3, max_nodes=1000, time_budget=10)
+        shared.choose_action(b.out1, b.out2)
+        entries = shared.table.hits
+        fresh = LookaheadPolicy(b, depth=3, max_nodes=1000, time_budget=10)
+        self.assertEqual(shared.choose_action(b.out2, b.out1), fresh.choose_action(b.out2, b.out1))
+        self.assertEqual(shared.table.hits - entries, fresh.table.hits)
+
+    @number("9.4")
+    @visibility(visibility.VISIBILITY_SHOW)
+    @timeout()
+    def test_truncated_values_not_reused(self):
+        RandomGen.set_seed(2)
+        b = Battle(verbosity=0)
+        team1 = MonsterTeam(MonsterTeam.TeamMode.FRONT, MonsterTeam.SelectionMode.RANDOM)
+        team2 = MonsterTeam(MonsterTeam.TeamMode.BACK, MonsterTeam.SelectionMode.RANDOM)
+        b.start(team1, team2)
+        root = b.snapshot()
+
+        # a search cut short by its node budget, then searches with a budget large enough to finish
+        reused = LookaheadPolicy(b, depth=4, max_nodes=6, time_budget=10)
+        reused.choose_action(b.out1, b.out2)
+        reused.max_nodes = 100_000
+        fresh = LookaheadPolicy(b, depth=4, max_nodes=100_000, time_budget=10)
+        values = []
+        for policy in (reused, fresh):
+            policy.nodes = 0
+            policy.deadline = time.perf_counter() + 10
+            scratch = b.fork(root)
+            values.append(policy._search(scratch, root, 1, 4))
+            scratch.release()
+        self.assertEqual(values[0], values[1])
@@ -3,10 +3,12 @@ from unittest import TestCase
 from ed_utils.decorators import number, visibility
 from ed_utils.timeout import timeout
 
+from elements import EffectivenessCalculator, Element
 from monster_base import MonsterBase
+from registry import MonsterRegistry
 # These classes inherit from MonsterBase,
 # but you don't need to implement them explicitly.
-from helpers import Infernox, Ironclad, Metalhorn
+from helpers import Flamikin, Infernox, Ironclad, Metalhorn
 
 class TestMonsters(TestCase):
 
@@ -72,3 +74,71 @@ class TestMonsters(TestCase):
         self.assertEqual(t.get_max_hp(), 14)
         self.assertEqual(t.get_hp(), 12)
 
+    @number("1.6")
+    @visibility(visibility.VISIBILITY_SHOW)
+    @timeout()
+    def test_dual_elements(self):
+        stats = {"attack": 10, "defense": 1, "speed": 1, "max_hp": 100}
+        registry = MonsterRegistry.from_records([
+            {"name": "Steamling", "description": "", "element": ["Water", "Fire"], "simple": stats, "complex": stats},
+            {"name": "Sprout", "description": "", "element": "Grass", "simple": stats, "complex": stats},
+        ])
+        Steamling = registry.get("Steamling")
+        Sprout = registry.get("Sprout")
+        self.assertEqual(Steamling.get_element(), "Water")
+        self.assertEqual(Steamling.get_elements(), ("Water", "Fire"))
+        self.assertEqual(Sprout.get_elements(), ("Grass", ))
+
+        # Grass vs Water (2) * Grass vs Fire (0.5)
+        self.assertEqual(EffectivenessCalculator.get_combined_effectiveness(Element.GRASS, (Element.WATER, Element.FIRE)), 1)
+        sprout, steamling = Sprout(), Steamling()
+        sprout.attack(steamling)
+        self.assertEqual(steamling.get_hp(), 100 - 9)
+        # attacks only use the first element: Water vs Grass (0.5)
+        steamling.attack(sprout)
+        self.assertEqual(sprout.get_hp(), 100 - 5)
+
+        for attacker in Element:
+            for first in Element:
+                self.assertEqual(
+                    EffectivenessCalculator.get_combined_effectiveness(attacker, (first, )),
+                    EffectivenessCalculator.get_effectiveness(attacker, first),
+                )
+                for second in Element:
+                    self.assertEqual(
+                        EffectivenessCalculator.get_combined_effectiveness(attacker, (first, second)),
+                        EffectivenessCalculator.get_effectiveness(attacker, first) * EffectivenessCalculator.get_effectiveness(attacker, second),
+                    )
+
+        stats_record = {"name": "Trio", "description": "", "element": ["Fire", "Water", "Grass"], "simple": stats, "complex": stats}
+        self.assertRaises(ValueError, lambda: MonsterRegistry.from_records([stats_record]))
+
+    @number("1.8")
+    @visibility(visibility.VISIBILITY_SHOW)
+    @timeout()
+    def test_evolve_in_place(self):
+        monster = Flamikin()
+        copy = Flamikin()
+        for m in (monster, copy):
+            m.set_hp(2)
+            m.level_up()
+        evolved = copy.evolve()
+        self.assertIs(monster.evolve_in_place(), monster)
+        self.assertIs(type(monster), type(evolved))
+        self.assertEqual(monster.snapshot(), evolved.snapshot())
+        self.assertEqual(monster.get_attack(), evolved.get_attack())
+        self.assertEqual(monster.get_elements(), evolved.get_elements())
+        # evolve_ready was reset, so it does not evolve again until it levels up
+        self.assertIs(monster.evolve_in_place(), monster)
+        self.assertIs(type(monster), type(evolved))
+
+        # a subclass with a __dict__ cannot change class, it gets a new instance instead
+        class Pet(Flamikin):
+            def __init__(self):
+                super().__init__()
+                self.owner = "Ash"
+        pet = Pet()
+        pet.level_up()
+        evolved = pet.evolve_in_place()
+        self.assertIsNot(evolved, pet)
+        self.assertIs(type(evolved), Flamikin.get_evolution())
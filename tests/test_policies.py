@@ -0,0 +1,138 @@
+import os
+import tempfile
+from array import array
+from unittest import TestCase
+
+import yaml
+
+from ed_utils.decorators import number, visibility
+from ed_utils.timeout import timeout
+from random_gen import RandomGen
+
+from battle import Battle
+from catalog import CatalogColumns
+import helpers
+from helpers import CATALOG_PATH, get_all_monsters, get_registry
+from lockstep import LockstepBattles
+from policies import DEFAULT_POLICY, HeuristicPolicy, TablePolicy
+from team import MonsterTeam
+
+from data_structures.referential_array import ArrayR
+
+class AlwaysSwap(HeuristicPolicy):
+
+    def choose_action(self, currently_out, enemy):
+        return Battle.Action.SWAP
+
+class NoBatch(HeuristicPolicy):
+
+    def supports_batch(self):
+        return False
+
+class TestPolicies(TestCase):
+
+    @number("10.1")
+    @visibility(visibility.VISIBILITY_SHOW)
+    @timeout()
+    def test_batch_matches_single(self):
+        RandomGen.set_seed(5)
+        columns = CatalogColumns()
+        monsters = get_all_monsters()
+        n = 500
+        out_cls, out_hp, enemy_cls, enemy_hp = (array("i", [0]) * n for _ in range(4))
+        pairs = []
+        for i in range(n):
+            out = monsters[RandomGen.randint(0, len(monsters) - 1)]()
+            enemy = monsters[RandomGen.randint(0, len(monsters) - 1)]()
+            out.set_hp(RandomGen.randint(1, out.get_max_hp()))
+            enemy.set_hp(RandomGen.randint(1, enemy.get_max_hp()))
+            out_cls[i], out_hp[i] = monsters.index(type(out)), out.get_hp()
+            enemy_cls[i], enemy_hp[i] = monsters.index(type(enemy)), enemy.get_hp()
+            pairs.append((out, enemy))
+
+        heuristic = HeuristicPolicy(columns)
+        table = TablePolicy(columns)
+        expected = [heuristic.choose_action(out, enemy).value for out, enemy in pairs]
+        self.assertListEqual([table.choose_action(out, enemy).value for out, enemy in pairs], expected)
+        self.assertListEqual(list(heuristic.choose_actions(out_cls, out_hp, enemy_cls, enemy_hp)), expected)
+        self.assertListEqual(list(table.choose_actions(out_cls, out_hp, enemy_cls, enemy_hp)), expected)
+
+    @number("10.2")
+    @visibility(visibility.VISIBILITY_SHOW)
+    @timeout()
+    def test_team_policy(self):
+        RandomGen.set_seed(6)
+        team = MonsterTeam(MonsterTeam.TeamMode.BACK, MonsterTeam.SelectionMode.RANDOM, policy=AlwaysSwap())
+        enemy = MonsterTeam(MonsterTeam.TeamMode.BACK, MonsterTeam.SelectionMode.RANDOM)
+        a, b = team.retrieve_from_team(), enemy.retrieve_from_team()
+        self.assertEqual(team.choose_action(a, b), Battle.Action.SWAP)
+        self.assertEqual(enemy.choose_action(b, a), HeuristicPolicy().choose_action(b, a))
+
+    @number("10.3")
+    @visibility(visibility.VISIBILITY_SHOW)
+    @timeout()
+    def test_lockstep_with_table_policy(self):
+        RandomGen.set_seed(7)
+        pairs = ArrayR(50)
+        for i in range(50):
+            pairs[i] = (
+                MonsterTeam(MonsterTeam.TeamMode.BACK, MonsterTeam.SelectionMode.RANDOM),
+                MonsterTeam(MonsterTeam.TeamMode.FRONT, MonsterTeam.SelectionMode.RANDOM),
+            )
+        by_table = LockstepBattles(pairs, policy=TablePolicy()).run()
+        by_default = LockstepBattles(pairs).run()
+        self.assertListEqual(by_table.to_list(), by_default.to_list())
+        self.assertRaises(ValueError, lambda: LockstepBattles(pairs, policy=NoBatch()))
+
+    @number("10.4")
+    @visibility(visibility.VISIBILITY_SHOW)
+    @timeout()
+    def test_catalog_change(self):
+        RandomGen.set_seed(8)
+        n = 300
+        columns = CatalogColumns()
+        given = HeuristicPolicy(columns)
+        table = TablePolicy()
+        pairs = [array("i", [RandomGen.randint(0, len(columns.speed) - 1) for _ in range(n)]) for _ in range(2)]
+        hp = array("i", [RandomGen.randint(1, 20) for _ in range(n)])
+        DEFAULT_POLICY.choose_actions(pairs[0], hp, pairs[1], hp[::-1])
+
+        with open(CATALOG_PATH) as f:
+            records = yaml.safe_load(f)
+        saved = (helpers.CATALOG_PATH, helpers._registry)
+        with tempfile.TemporaryDirectory() as directory:
+            # the same monsters in the opposite order, so every catalog index changes
+            path = os.path.join(directory, "reversed.yaml")
+            with open(path, "w") as f:
+                yaml.safe_dump(records[::-1], f)
+            try:
+                helpers.set_catalog_path(path)
+                expected = HeuristicPolicy(CatalogColumns()).choose_actions(pairs[0], hp, pairs[1], hp[::-1])
+                self.assertEqual(DEFAULT_POLICY.choose_actions(pairs[0], hp, pairs[1], hp[::-1]), expected)
+                self.assertIs(DEFAULT_POLICY.registry, get_registry())
+                self.assertEqual(table.choose_actions(pairs[0], hp, pairs[1], hp[::-1]), expected)
+                # columns given to a policy are always the ones it uses
+                given.choose_actions(pairs[0], hp, pairs[1], hp[::-1])
+                self.assertIs(given.speed, columns.speed)
+            finally:
+                helpers.CATALOG_PATH, helpers._registry = saved
+        # and back to the original catalog
+        DEFAULT_POLICY.choose_actions(pairs[0], hp, pairs[1], hp[::-1])
+        self.assertIs(DEFAULT_POLICY.registry, get_registry())
+
+    @number("10.5")
+    @visibility(visibility.VISIBILITY_SHOW)
+    @timeout()
+    def test_speed_only(self):
+        columns = CatalogColumns()
+        n = len(columns.speed)
+        cls = array("i", range(n))
+        hp = array("i", [1]) * n
+        # deciding only needs speeds, the damage table is built the first time it is used
+        HeuristicPolicy(columns).choose_actions(cls, hp, cls[::-1], hp)
+        TablePolicy(columns).choose_actions(cls, hp, cls[::-1], hp)
+        self.assertIsNone(columns._damage_table)
+        self.assertEqual(len(columns.damage), n * n)
+        self.assertIs(columns.damage, columns.damage)
+        self.assertEqual(HeuristicPolicy().choose_actions(cls, hp, cls[::-1], hp),
+                         HeuristicPolicy(columns).choose_actions(cls, hp, cls[::-1], hp))
@@ -0,0 +1,164 @@
+from unittest import TestCase
+
+from ed_utils.decorators import number, visibility
+from ed_utils.timeout import timeout
+
+from battle import Battle
+from helpers import Flamikin, Aquariuma, Vineon, Thundrake, Rockodile, Strikeon
+from lookahead import LookaheadPolicy
+from pool import MonsterPool
+from random_gen import RandomGen
+from team import MonsterTeam
+
+from data_structures.referential_array import ArrayR
+
+class TestPool(TestCase):
+
+    @number("15.1")
+    @visibility(visibility.VISIBILITY_SHOW)
+    @timeout()
+    def test_handle_api(self):
+        pool = MonsterPool()
+        pooled = pool.spawn(Flamikin)
+        pooled_enemy = pool.spawn(Aquariuma)
+        monster = Flamikin()
+        enemy = Aquariuma()
+
+        self.assertEqual(str(pooled), str(monster))
+        self.assertEqual(pooled.get_attack(), monster.get_attack())
+        self.assertEqual(pooled.get_max_hp(), monster.get_max_hp())
+
+        pooled.attack(pooled_enemy)
+        monster.attack(enemy)
+        self.assertEqual(pooled_enemy.get_hp(), enemy.get_hp())
+
+        pooled.set_hp(3)
+        monster.set_hp(3)
+        pooled.level_up()
+        monster.level_up()
+        self.assertTrue(pooled.ready_to_evolve())
+        # evolving changes the slot's class, the handle stays the same
+        self.assertIs(pooled.evolve(), pooled)
+        evolved = monster.evolve()
+        self.assertIs(pooled.get_class(), type(evolved))
+        self.assertEqual(pooled.snapshot(), evolved.snapshot())
+        self.assertEqual(str(pooled), str(evolved))
+
+    @number("15.2")
+    @visibility(visibility.VISIBILITY_SHOW)
+    @timeout()
+    def test_heal_and_reuse(self):
+        pool = MonsterPool()
+        monsters = [pool.spawn(monster) for monster in (Flamikin, Vineon, Thundrake)]
+        for monster in monsters:
+            monster.set_hp(1)
+        pool.heal_all()
+        for monster in monsters:
+            self.assertEqual(monster.get_hp(), monster.get_max_hp())
+
+        pool.free(monsters[1])
+        self.assertEqual(len(pool), 2)
+        self.assertRaises(ValueError, lambda: pool.free(monsters[1]))
+        # the freed slot is reused, so the pool does not grow
+        reused = pool.spawn(Aquariuma)
+        self.assertIs(reused, monsters[1])
+        self.assertEqual(reused.get_name(), "Aquariuma")
+        self.assertEqual(len(pool.cls), 3)
+
+    @number("15.3")
+    @visibility(visibility.VISIBILITY_SHOW)
+    @timeout()
+    def test_pooled_battles(self):
+        for mode in MonsterTeam.TeamMode:
+            pool = MonsterPool()
+            provided = ArrayR.from_list([Flamikin, Vineon, Thundrake])
+            enemies = ArrayR.from_list([Aquariuma, Thundrake])
+            kwargs = {"sort_key": MonsterTeam.SortMode.HP} if mode == MonsterTeam.TeamMode.OPTIMISE else {}
+            results = []
+            for team_pool in (None, pool):
+                RandomGen.set_seed(123)
+                team1 = MonsterTeam(mode, MonsterTeam.SelectionMode.PROVIDED, provided_monsters=provided, pool=team_pool, **kwargs)
+                team2 = MonsterTeam(mode, MonsterTeam.SelectionMode.PROVIDED, provided_monsters=enemies, pool=team_pool, **kwargs)
+                results.append(Battle(verbosity=0).battle(team1, team2))
+            self.assertEqual(results[0], results[1])
+
+            # regenerating gives the slots back to the pool before taking new ones
+            team1.regenerate_team()
+            team2.regenerate_team()
+            self.assertEqual(len(pool), 5)
+            self.assertEqual(len(pool.cls), 5)
+            self.assertEqual(len(team1), 3)
+
+    @number("15.4")
+    @visibility(visibility.VISIBILITY_SHOW)
+    @timeout()
+    def test_fork_and_restore_free_slots(self):
+        pool = MonsterPool()
+        team1 = MonsterTeam(MonsterTeam.TeamMode.BACK, MonsterTeam.SelectionMode.PROVIDED,
+                            provided_monsters=ArrayR.from_list([Flamikin, Vineon, Thundrake, Rockodile, Strikeon]), pool=pool)
+        team2 = MonsterTeam(MonsterTeam.TeamMode.FRONT, MonsterTeam.SelectionMode.PROVIDED,
+                            provided_monsters=ArrayR.from_list([Aquariuma, Thundrake, Vineon, Flamikin, Rockodile]), pool=pool)
+        battle = Battle(verbosity=0)
+        battle.start(team1, team2)
+        battle.process_turn()
+        snapshot = battle.snapshot()
+        live = len(pool)
+
+        for _ in range(100):
+            fork = battle.fork(snapshot)
+            fork.process_turn()
+            fork.release()
+        self.assertEqual(len(pool), live)
+
+        # restoring returns the monsters of the previous restore
+        battle.restore(snapshot)
+        restored = len(pool)
+        for _ in range(100):
+            battle.restore(snapshot)
+            battle.process_turn()
+        self.assertEqual(len(pool), restored)
+        # a fork's restores do not free the original's monsters
+        fork = battle.fork(snapshot)
+        fork.restore(snapshot)
+        fork.release()
+        self.assertEqual(len(pool), restored)
+        team1.regenerate_team()
+        team2.regenerate_team()
+        self.assertEqual(len(pool), live)
+
+        # searching restores at every node
+        RandomGen.set_seed(4)
+        battle = Battle(verbosity=0)
+        team1 = MonsterTeam(MonsterTeam.TeamMode.BACK, MonsterTeam.SelectionMode.RANDOM, pool=pool,
+                            policy=LookaheadPolicy(battle, depth=2))
+        team2 = MonsterTeam(MonsterTeam.TeamMode.BACK, MonsterTeam.SelectionMode.RANDOM, pool=pool)
+        live = len(pool)
+        battle.battle(team1, team2)
+        self.assertEqual(len(pool), live)
+
+    @number("15.5")
+    @visibility(visibility.VISIBILITY_SHOW)
+    @timeout()
+    def test_heal_tells_teams(self):
+        for mode in MonsterTeam.TeamMode:
+            pool = MonsterPool()
+            team = MonsterTeam(mode, MonsterTeam.SelectionMode.PROVIDED, provided_monsters=ArrayR.from_list([Flamikin, Vineon, Thundrake]),
+                               sort_key=MonsterTeam.SortMode.HP, pool=pool)
+            full = team.total_hp
+            out = team.retrieve_from_team()
+            benched = [team.retrieve_from_team() for _ in range(2)]
+            for monster in benched:
+                monster.set_hp(0)
+                team.add_to_team(monster)
+            self.assertEqual(team.alive_count, 0)
+
+            pool.heal(benched[:1])
+            self.assertEqual(team.alive_count, 1)
+            self.assertEqual(team.total_hp, benched[0].get_max_hp())
+            pool.heal_all()
+            self.assertEqual(team.alive_count, 2)
+            self.assertEqual(team.total_hp, full - out.get_max_hp())
+            if mode == MonsterTeam.TeamMode.OPTIMISE:
+                # still sorted by HP
+                hp = [team.retrieve_from_team().get_hp() for _ in range(2)]
+                self.assertEqual(hp, sorted(hp, reverse=True))
@@ -0,0 +1,176 @@
+import json
+import os
+import tempfile
+from unittest import TestCase
+
+from ed_utils.decorators import number, visibility
+from ed_utils.timeout import timeout
+
+import helpers
+from helpers import get_registry, load_catalog
+from random_gen import RandomGen
+from registry import MonsterRegistry
+
+SMALL_CATALOG = """
+- name: Flamikin
+  description: A different Flamikin.
+  element: Fire
+  evolution: Blazikin
+  can_be_spawned: true
+  simple: {attack: 9, defense: 9, speed: 9, max_hp: 9}
+  complex: {attack: 1, defense: 1, speed: 1, max_hp: 1}
+- name: Blazikin
+  description: Its evolution.
+  element: Fire
+  simple: {attack: 10, defense: 10, speed: 10, max_hp: 10}
+  complex: {attack: 1, defense: 1, speed: 1, max_hp: 1}
+"""
+
+WEIGHTED_CATALOG = [
+    {"name": name, "description": "", "element": "Normal", "can_be_spawned": spawnable, "spawn_weight": weight,
+     "simple": {"attack": 1, "defense": 1, "speed": 1, "max_hp": 1},
+     "complex": {"attack": 1, "defense": 1, "speed": 1, "max_hp": 1}}
+    for name, spawnable, weight in [("Common", True, 6), ("Hidden", False, 100), ("Uncommon", True, 3), ("Rare", True, 1)]
+]
+
+class TestRegistry(TestCase):
+
+    @number("12.1")
+    @visibility(visibility.VISIBILITY_SHOW)
+    @timeout()
+    def test_lookups(self):
+        registry = get_registry()
+        self.assertIs(registry.get("Flamikin"), helpers.Flamikin)
+        for i in range(len(registry)):
+            monster = registry[i]
+            self.assertEqual(registry.index_of(monster), i)
+            self.assertIs(registry.get(monster.get_name()), monster)
+
+        self.assertEqual(len(registry.spawnable) + len(registry.non_spawnable), len(registry))
+        for i in registry.spawnable:
+            self.assertTrue(registry[i].can_be_spawned())
+        for i in registry.non_spawnable:
+            self.assertFalse(registry[i].can_be_spawned())
+
+        self.assertRaises(KeyError, lambda: registry.get("Missingno"))
+        self.assertRaises(ValueError, lambda: registry.index_of(int))
+
+    @number("12.2")
+    @visibility(visibility.VISIBILITY_SHOW)
+    @timeout()
+    def test_catalogs_side_by_side(self):
+        default_flamikin = helpers.Flamikin
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "small.yaml")
+            with open(path, "w") as f:
+                f.write(SMALL_CATALOG)
+            small = load_catalog(path)
+
+        self.assertEqual(len(small), 2)
+        flamikin = small.get("Flamikin")
+        self.assertIsNot(flamikin, default_flamikin)
+        self.assertEqual(flamikin.get_simple_stats().get_attack(), 9)
+        self.assertIs(flamikin.get_evolution(), small.get("Blazikin"))
+        self.assertEqual(len(small.spawnable), 1)
+
+        # the default catalog is untouched
+        self.assertIs(helpers.Flamikin, default_flamikin)
+        self.assertIs(get_registry().get("Flamikin"), default_flamikin)
+        self.assertNotIn(flamikin, get_registry())
+
+    @number("12.3")
+    @visibility(visibility.VISIBILITY_SHOW)
+    @timeout()
+    def test_weighted_spawns(self):
+        # the default catalog has no weights, so spawns stay uniform
+        self.assertIsNone(get_registry().spawn_table)
+
+        registry = MonsterRegistry.from_records(WEIGHTED_CATALOG)
+        expected = {"Common": 0.6, "Uncommon": 0.3, "Rare": 0.1}
+        for s in range(len(registry.spawnable)):
+            name = registry[registry.spawnable[s]].get_name()
+            self.assertAlmostEqual(registry.spawn_table.probability(s), expected[name], places=6)
+
+        RandomGen.set_seed(20240601)
+        samples = 30000
+        counts = {name: 0 for name in expected}
+        for _ in range(samples):
+            counts[registry.sample_spawnable().get_name()] += 1
+
+        # chi-squared with 2 degrees of freedom, 13.8 is the 0.001 critical value
+        chi_squared = 0
+        for name in expected:
+            chi_squared += (counts[name] - samples * expected[name]) ** 2 / (samples * expected[name])
+        self.assertLess(chi_squared, 13.8)
+
+    @number("12.4")
+    @visibility(visibility.VISIBILITY_SHOW)
+    @timeout()
+    def test_streaming_loader(self):
+        streamed = MonsterRegistry.stream_file(helpers.CATALOG_PATH)
+        default = get_registry()
+        self.assertEqual(len(streamed), len(default))
+        for i in range(len(default)):
+            self.assertEqual(streamed[i].get_name(), default[i].get_name())
+            evolution = default[i].get_evolution()
+            if evolution is None:
+                self.assertIsNone(streamed[i].get_evolution())
+            else:
+                self.assertIs(streamed[i].get_evolution(), streamed.get(evolution.get_name()))
+
+        with tempfile.TemporaryDirectory() as directory:
+            # a synthetic catalog where every monster evolves into the one defined after it
+            path = os.path.join(directory, "huge.jsonl")
+            n = 3000
+            with open(path, "w") as f:
+                for i in range(n):
+                    record = dict(WEIGHTED_CATALOG[0], name=f"Monster{i}", spawn_weight=None)
+                    if i + 1 < n:
+                        record["evolution"] = f"Monster{i + 1}"
+                    f.write(json.dumps(record) + "\n")
+            registry = MonsterRegistry.stream_file(path)
+            self.assertEqual(len(registry), n)
+            self.assertIs(registry[0].get_evolution(), registry[1])
+            self.assertIsNone(registry[n - 1].get_evolution())
+
+            # an evolution that is never defined
+            with open(path, "w") as f:
+                f.write(json.dumps(dict(WEIGHTED_CATALOG[0], evolution="Nobody")) + "\n")
+            self.assertRaises(ValueError, lambda: MonsterRegistry.stream_file(path))
+
+    @number("12.5")
+    @visibility(visibility.VISIBILITY_SHOW)
+    @timeout()
+    def test_evolution_chains(self):
+        registry = get_registry()
+        flamikin = registry.get("Flamikin")
+        infernoth = registry.get("Infernoth")
+        infernox = registry.get("Infernox")
+        self.assertIs(registry.evolution_of(flamikin), infernoth)
+        self.assertIsNone(registry.evolution_of(infernox))
+        self.assertIs(registry.final_form_of(flamikin), infernox)
+        self.assertIs(registry.final_form_of(infernox), infernox)
+        self.assertEqual(registry.chain_depth[registry.index_of(flamikin)], 2)
+        self.assertEqual(registry.chain_depth[registry.index_of(infernox)], 0)
+
+        for i in range(len(registry)):
+            # walking the chain one evolution at a time agrees with the table
+            monster, depth = registry[i], 0
+            while monster.get_evolution() is not None:
+                monster = monster.get_evolution()
+                depth += 1
+            self.assertEqual(registry.chain_depth[i], depth)
+            self.assertIs(registry[registry.final_form[i]], monster)
+
+        cycle = [dict(WEIGHTED_CATALOG[0], name="Egg", evolution="Chicken"),
+                 dict(WEIGHTED_CATALOG[0], name="Chicken", evolution="Egg")]
+        self.assertRaises(ValueError, lambda: MonsterRegistry.from_records(cycle))
+
+    @number("12.6")
+    @visibility(visibility.VISIBILITY_SHOW)
+    @timeout()
+    def test_duplicate_elements(self):
+        twice = dict(WEIGHTED_CATALOG[0], element=["Fire", "Fire"])
+        self.assertRaises(ValueError, lambda: MonsterRegistry.from_records([twice]))
+        registry = MonsterRegistry.from_records([dict(WEIGHTED_CATALOG[0], element=["Fire", "Water"])])
+        self.assertEqual(len(registry), 1)
@@ -0,0 +1,111 @@
+from io import BytesIO
+from unittest import TestCase
+
+from ed_utils.decorators import number, visibility
+from ed_utils.timeout import timeout
+from random_gen import RandomGen
+
+from battle import Battle
+from replay import BattleRecorder, BattleLogReader
+from team import MonsterTeam
+from helpers import Flamikin, Aquariuma, Vineon, Strikeon
+
+from data_structures.referential_array import ArrayR
+
+class TestReplay(TestCase):
+
+    @number("6.1")
+    @visibility(visibility.VISIBILITY_SHOW)
+    @timeout()
+    def test_record_and_verify(self):
+        RandomGen.set_seed(123456789)
+        stream = BytesIO()
+        recorder = BattleRecorder(stream)
+        b = Battle(verbosity=0, recorder=recorder)
+        results = []
+        for _ in range(5):
+            team1 = MonsterTeam(MonsterTeam.TeamMode.BACK, MonsterTeam.SelectionMode.RANDOM)
+            team2 = MonsterTeam(MonsterTeam.TeamMode.FRONT, MonsterTeam.SelectionMode.RANDOM)
+            results.append(b.battle(team1, team2))
+        self.assertEqual(recorder.battles_recorded, 5)
+
+        stream.seek(0)
+        records = list(BattleLogReader(stream))
+        self.assertEqual(len(records), 5)
+        for record, result in zip(records, results):
+            self.assertEqual(record.get_result(), result)
+            self.assertGreater(len(record), 0)
+            self.assertTrue(record.verify())
+
+    @number("6.2")
+    @visibility(visibility.VISIBILITY_SHOW)
+    @timeout()
+    def test_turns(self):
+        stream = BytesIO()
+        team1 = MonsterTeam(
+            team_mode=MonsterTeam.TeamMode.BACK,
+            selection_mode=MonsterTeam.SelectionMode.PROVIDED,
+            provided_monsters=ArrayR.from_list([Flamikin, Aquariuma, Vineon, Strikeon]),
+        )
+        team2 = MonsterTeam(
+            team_mode=MonsterTeam.TeamMode.FRONT,
+            selection_mode=MonsterTeam.SelectionMode.PROVIDED,
+            provided_monsters=ArrayR.from_list([Flamikin, Aquariuma, Vineon, Strikeon]),
+        )
+        Battle(recorder=BattleRecorder(stream)).battle(team1, team2)
+        stream.seek(0)
+        record = next(iter(BattleLogReader(stream)))
+        # Flamikin and Strikeon attack each other, then both lose 1 HP.
+        action1, action2, delta1, delta2 = record.get_turn(0)
+        self.assertEqual(action1, Battle.Action.ATTACK)
+        self.assertEqual(action2, Battle.Action.ATTACK)
+        self.assertEqual((delta1, delta2), (-5, -2))
+        self.assertEqual(record.team1.to_team().provided_monsters.to_list(), [Flamikin, Aquariuma, Vineon, Strikeon])
+
+        # A tampered log no longer verifies.
+        record.turns = record.turns[:-1] + bytes([record.turns[-1] ^ 1])
+        self.assertFalse(record.verify())
+
+    @number("6.3")
+    @visibility(visibility.VISIBILITY_SHOW)
+    @timeout()
+    def test_bad_stream(self):
+        self.assertRaises(ValueError, lambda: BattleLogReader(BytesIO(b"nope!")))
+
+    @number("6.4")
+    @visibility(visibility.VISIBILITY_SHOW)
+    @timeout()
+    def test_replay_keeps_seed(self):
+        self.assertIsNone(Battle().last_actions)
+        RandomGen.set_seed(31)
+        stream = BytesIO()
+        team1, team2 = MonsterTeam.random_teams(2)
+        Battle(recorder=BattleRecorder(stream)).battle(team1, team2)
+        stream.seek(0)
+        record = next(iter(BattleLogReader(stream)))
+
+        RandomGen.set_seed(8)
+        expected = RandomGen.random()
+        RandomGen.set_seed(8)
+        self.assertTrue(record.verify())
+        self.assertEqual(record.replay(), record.get_result())
+        self.assertEqual(RandomGen.random(), expected)
+
+    @number("6.5")
+    @visibility(visibility.VISIBILITY_SHOW)
+    @timeout()
+    def test_large_teams(self):
+        monsters = [Flamikin, Aquariuma, Vineon, Strikeon]
+        provided = ArrayR.from_list([monsters[i % 4] for i in range(300)])
+        team1 = MonsterTeam(MonsterTeam.TeamMode.BACK, MonsterTeam.SelectionMode.PROVIDED,
+                            provided_monsters=provided, team_limit=300)
+        team2 = MonsterTeam(MonsterTeam.TeamMode.FRONT, MonsterTeam.SelectionMode.PROVIDED,
+                            provided_monsters=provided, team_limit=300)
+        stream = BytesIO()
+        result = Battle(recorder=BattleRecorder(stream)).battle(team1, team2)
+        stream.seek(0)
+        record = next(iter(BattleLogReader(stream)))
+        self.assertEqual(record.get_result(), result)
+        self.assertEqual(record.team1.to_team().provided_monsters.to_list(), provided.to_list())
+        self.assertEqual(record.team2.to_team().team_mode, MonsterTeam.TeamMode.FRONT)
+        self.assertTrue(record.verify())
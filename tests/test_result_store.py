@@ -0,0 +1,94 @@
+import os
+import tempfile
+from unittest import TestCase, mock
+
+from ed_utils.decorators import number, visibility
+from ed_utils.timeout import timeout
+
+from elements import EFFECTIVENESS_CSV, EffectivenessCalculator
+from random_gen import RandomGen
+from result_store import ResultStore
+from rules_comparison import compare_rules
+from team import MonsterTeam
+
+from data_structures.referential_array import ArrayR
+
+class TestResultStore(TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, "results.sqlite")
+        # every element is neutral against every other element
+        with open(EFFECTIVENESS_CSV) as f:
+            names = f.readline().strip().split(",")
+        self.neutral_path = os.path.join(self.directory.name, "neutral.csv")
+        with open(self.neutral_path, "w") as f:
+            f.write(",".join(names) + "\n")
+            for _ in names:
+                f.write(",".join("1" for _ in names) + "\n")
+        self.saved_rule_sets = dict(EffectivenessCalculator.rule_sets)
+
+    def tearDown(self):
+        EffectivenessCalculator.rule_sets = self.saved_rule_sets
+        self.directory.cleanup()
+
+    @number("17.1")
+    @visibility(visibility.VISIBILITY_SHOW)
+    @timeout()
+    def test_reuse_and_invalidation(self):
+        default = ArrayR.from_list([EffectivenessCalculator.default()])
+        expected = compare_rules(default, n_battles=40, seed=3)[0].to_list()
+
+        with ResultStore(self.path) as store:
+            self.assertEqual(compare_rules(default, n_battles=40, seed=3, store=store)[0].to_list(), expected)
+            stored = len(store)
+            self.assertEqual(store.misses, stored)
+            # a matchup drawn twice is only fought once
+            self.assertEqual(store.hits + store.misses, 40)
+
+        # a later run reuses every result, also when fighting in lockstep
+        with ResultStore(self.path) as store:
+            self.assertEqual(compare_rules(default, n_battles=40, seed=3, store=store)[0].to_list(), expected)
+            self.assertEqual(compare_rules(default, n_battles=40, seed=3, store=store, lockstep=True)[0].to_list(), expected)
+            self.assertEqual((store.hits, store.misses), (80, 0))
+
+            # another rule set is a new input
+            neutral = EffectivenessCalculator.load_rules("neutral-store-test", self.neutral_path)
+            both = ArrayR.from_list([EffectivenessCalculator.default(), neutral])
+            results = compare_rules(both, n_battles=40, seed=3, store=store)
+            self.assertEqual(results[0].to_list(), expected)
+            self.assertEqual(results[1].to_list(), compare_rules(ArrayR.from_list([neutral]), n_battles=40, seed=3)[0].to_list())
+            self.assertEqual(store.hits + store.misses, 160)
+            self.assertGreaterEqual(store.hits, 120)
+            self.assertGreater(len(store), stored)
+
+            # as is a new engine version
+            with mock.patch("result_store.ENGINE_VERSION", 2):
+                self.assertIsNone(store.get_battle(*MonsterTeam.random_teams(2)))
+                entries = len(store)
+                self.assertEqual(store.prune(), entries)
+                self.assertEqual(len(store), 0)
+
+    @number("17.2")
+    @visibility(visibility.VISIBILITY_SHOW)
+    @timeout()
+    def test_tower(self):
+        def player_team():
+            RandomGen.set_seed(99)
+            return MonsterTeam(MonsterTeam.TeamMode.BACK, MonsterTeam.SelectionMode.RANDOM)
+
+        with ResultStore(self.path) as store:
+            results = store.tower(seed=11, my_team=player_team(), n_teams=4).to_list()
+            seed_after = RandomGen.seed
+            self.assertGreater(len(results), 0)
+            self.assertEqual(store.misses, 1)
+
+        with ResultStore(self.path) as store:
+            self.assertEqual(store.tower(seed=11, my_team=player_team(), n_teams=4).to_list(), results)
+            self.assertEqual(RandomGen.seed, seed_after)
+            self.assertEqual(store.hits, 1)
+            store.tower(seed=12, my_team=player_team(), n_teams=4)
+            self.assertEqual(store.misses, 1)
+            # the default rule set, catalog and engine version are still current
+            self.assertEqual(store.prune(), 0)
+            self.assertEqual(len(store), 2)
@@ -0,0 +1,84 @@
+import os
+import tempfile
+from unittest import TestCase
+
+from ed_utils.decorators import number, visibility
+from ed_utils.timeout import timeout
+
+from battle import Battle
+from elements import EFFECTIVENESS_CSV, EffectivenessCalculator, Element
+from helpers import Flamikin, Vineon
+from rules_comparison import compare_rules, summarise
+from team import MonsterTeam
+
+from data_structures.referential_array import ArrayR
+
+class TestRulesComparison(TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        # every element is neutral against every other element
+        with open(EFFECTIVENESS_CSV) as f:
+            names = f.readline().strip().split(",")
+        self.neutral_path = os.path.join(self.directory.name, "neutral.csv")
+        with open(self.neutral_path, "w") as f:
+            f.write(",".join(names) + "\n")
+            for _ in names:
+                f.write(",".join("1" for _ in names) + "\n")
+        self.saved_rule_sets = dict(EffectivenessCalculator.rule_sets)
+
+    def tearDown(self):
+        EffectivenessCalculator.rule_sets = self.saved_rule_sets
+        self.directory.cleanup()
+
+    @number("14.1")
+    @visibility(visibility.VISIBILITY_SHOW)
+    @timeout()
+    def test_rule_sets_side_by_side(self):
+        neutral = EffectivenessCalculator.load_rules("neutral-test", self.neutral_path)
+        self.assertIs(EffectivenessCalculator.load_rules("neutral-test", self.neutral_path), neutral)
+        self.assertIs(EffectivenessCalculator.get_rules("neutral-test"), neutral)
+        self.assertEqual(neutral.name, "neutral-test")
+        self.assertRaises(KeyError, lambda: EffectivenessCalculator.get_rules("missing"))
+
+        self.assertEqual(neutral.effectiveness(Element.FIRE, Element.GRASS), 1)
+        self.assertEqual(neutral.combined_effectiveness(Element.FIRE, (Element.GRASS, Element.BUG)), 1)
+        # the default rule set is untouched
+        self.assertEqual(EffectivenessCalculator.get_effectiveness(Element.FIRE, Element.GRASS), 2)
+        self.assertEqual(EffectivenessCalculator.default().effectiveness(Element.FIRE, Element.GRASS), 2)
+
+        # Flamikin (3 attack, Fire) against Vineon (Grass)
+        attacker, defender = Flamikin(), Vineon()
+        hp = defender.get_hp()
+        attacker.attack(defender)
+        default_damage = hp - defender.get_hp()
+        defender.set_hp(hp)
+        attacker.attack(defender, neutral)
+        self.assertEqual(default_damage, 2 * (hp - defender.get_hp()))
+
+        battle = Battle(rules=neutral)
+        battle.start(
+            MonsterTeam(MonsterTeam.TeamMode.FRONT, MonsterTeam.SelectionMode.PROVIDED, provided_monsters=ArrayR.from_list([Flamikin])),
+            MonsterTeam(MonsterTeam.TeamMode.FRONT, MonsterTeam.SelectionMode.PROVIDED, provided_monsters=ArrayR.from_list([Vineon])),
+        )
+        self.assertIs(battle.fork().rules, neutral)
+
+    @number("14.2")
+    @visibility(visibility.VISIBILITY_SHOW)
+    @timeout()
+    def test_compare_rules(self):
+        neutral = EffectivenessCalculator.load_rules("neutral-test", self.neutral_path)
+        rules = ArrayR.from_list([EffectivenessCalculator.default(), neutral, EffectivenessCalculator.default()])
+        results = compare_rules(rules, n_battles=40, seed=2024)
+        self.assertEqual(len(results), 3)
+        self.assertEqual(list(results[0]), list(results[2]))
+        self.assertNotEqual(list(results[0]), list(results[1]))
+        self.assertEqual(sum(summarise(results[1])), 40)
+
+        # the same comparison in the lockstep engine
+        lockstep = compare_rules(rules, n_battles=40, seed=2024, lockstep=True)
+        for r in range(len(rules)):
+            self.assertEqual(list(lockstep[r]), list(results[r]))
+
+        # same seed, same battles
+        self.assertEqual(list(compare_rules(rules, n_battles=40, seed=2024)[1]), list(results[1]))
@@ -0,0 +1,55 @@
+from unittest import TestCase
+
+from ed_utils.decorators import number, visibility
+from ed_utils.timeout import timeout
+from random_gen import RandomGen
+
+from battle import Battle
+from team import MonsterTeam
+
+class TestSnapshot(TestCase):
+
+    def _start(self, team_mode1, team_mode2, **kwargs):
+        b = Battle(verbosity=0)
+        team1 = MonsterTeam(team_mode1, MonsterTeam.SelectionMode.RANDOM, **kwargs)
+        team2 = MonsterTeam(team_mode2, MonsterTeam.SelectionMode.RANDOM, **kwargs)
+        b.start(team1, team2)
+        return b
+
+    @number("8.1")
+    @visibility(visibility.VISIBILITY_SHOW)
+    @timeout()
+    def test_fork_matches_original(self):
+        RandomGen.set_seed(987654321)
+        for mode in MonsterTeam.TeamMode:
+            for _ in range(20):
+                b = self._start(mode, MonsterTeam.TeamMode.BACK, sort_key=MonsterTeam.SortMode.SPEED)
+                result = None
+                for _ in range(2):
+                    result = result or b.process_turn()
+                if result is not None:
+                    continue
+                forked = b.fork()
+                self.assertIsNot(forked.out1, b.out1)
+                self.assertEqual(str(forked.out1), str(b.out1))
+                self.assertEqual(str(forked.team1), str(b.team1))
+                forked_result = forked.resume()
+                self.assertEqual(b.resume(), forked_result)
+                self.assertEqual(b.turn_number, forked.turn_number)
+
+    @number("8.2")
+    @visibility(visibility.VISIBILITY_SHOW)
+    @timeout()
+    def test_restore(self):
+        RandomGen.set_seed(13)
+        b = self._start(MonsterTeam.TeamMode.OPTIMISE, MonsterTeam.TeamMode.FRONT, sort_key=MonsterTeam.SortMode.HP)
+        snapshot = b.snapshot()
+        before = (str(b.team1), str(b.team2), str(b.out1), str(b.out2))
+        first = b.resume()
+        turns = b.turn_number
+
+        b.restore(snapshot)
+        self.assertEqual((str(b.team1), str(b.team2), str(b.out1), str(b.out2)), before)
+        self.assertEqual(b.turn_number, 0)
+        self.assertEqual(b.resume(), first)
+        self.assertEqual(b.turn_number, turns)
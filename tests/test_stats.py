@@ -59,3 +59,26 @@ class TestStats(TestCase):
         self.assertEqual(cs.get_defense(1), 8)
         self.assertEqual(cs.get_speed(5), 250)
         self.assertEqual(cs.get_max_hp(41), 6)
+
+    @number("1.7")
+    @visibility(visibility.VISIBILITY_SHOW)
+    @timeout()
+    def test_shared_immutable_stats(self):
+        import copy
+        from helpers import Flamikin
+
+        stats = SimpleStats(1, 2, 3, 4)
+        self.assertRaises(AttributeError, lambda: setattr(stats, "attack", 10))
+        self.assertRaises(AttributeError, lambda: setattr(stats, "extra", 10))
+        self.assertEqual(stats.get_attack(), 1)
+        self.assertIs(copy.deepcopy(stats), stats)
+
+        complex_stats = ComplexStats(ArrayR.from_list(["1"]), ArrayR.from_list(["2"]), ArrayR.from_list(["level"]), ArrayR.from_list(["4"]))
+        self.assertRaises(AttributeError, lambda: setattr(complex_stats, "attack_formula", ("5", )))
+        self.assertEqual(complex_stats.get_speed(7), 7)
+
+        # every monster of a class shares its class's stats, and keeps no __dict__
+        a, b = Flamikin(), Flamikin()
+        self.assertIs(a.stats, b.stats)
+        self.assertIs(a.stats, Flamikin.get_simple_stats())
+        self.assertFalse(hasattr(a, "__dict__"))
@@ -7,8 +7,12 @@ from ed_utils.decorators import number, visibility
 from ed_utils.timeout import timeout
 from random_gen import RandomGen
 
+from battle import Battle
+from pool import MonsterPool
+
+from elements import Element
 from team import MonsterTeam
-from helpers import Flamikin, Aquariuma, Vineon, Normake, Thundrake, Rockodile, Mystifly, Strikeon, Faeboa, Soundcobra
+from helpers import Flamikin, Aquariuma, Vineon, Normake, Thundrake, Rockodile, Mystifly, Strikeon, Faeboa, Soundcobra, Gustwing, Frostbite
 
 from data_structures.referential_array import ArrayR
 
@@ -260,3 +264,265 @@ class TestTeam(TestCase):
 
         self.assertEqual(len(team), 1)
         self.assertIsInstance(team.retrieve_from_team(), Flamikin)
+
+    @number("3.8")
+    @visibility(visibility.VISIBILITY_SHOW)
+    @timeout()
+    def test_random_teams(self):
+        RandomGen.set_seed(123456789)
+        expected = []
+        for _ in range(5):
+            team = MonsterTeam(MonsterTeam.TeamMode.FRONT, MonsterTeam.SelectionMode.RANDOM)
+            expected.append([m for m in team.provided_monsters if m is not None])
+
+        RandomGen.set_seed(123456789)
+        teams = list(MonsterTeam.random_teams(5, MonsterTeam.TeamMode.FRONT))
+        self.assertEqual(len(teams), 5)
+        for team, classes in zip(teams, expected):
+            self.assertEqual(team.team_mode, MonsterTeam.TeamMode.FRONT)
+            self.assertEqual([m for m in team.provided_monsters if m is not None], classes)
+            for monster in team.provided_monsters:
+                if monster is not None:
+                    self.assertTrue(monster.can_be_spawned())
+
+    @number("3.9")
+    @visibility(visibility.VISIBILITY_SHOW)
+    @timeout()
+    def test_recycled_teams(self):
+        provided = ArrayR.from_list([Flamikin, Vineon, Thundrake])
+        enemies = ArrayR.from_list([Strikeon, Mystifly, Aquariuma])
+        for team_pool in (None, MonsterPool()):
+            RandomGen.set_seed(2024)
+            fresh = [MonsterTeam(MonsterTeam.TeamMode.BACK, MonsterTeam.SelectionMode.PROVIDED, provided_monsters=p) for p in (provided, enemies)]
+            RandomGen.set_seed(2024)
+            recycled = [MonsterTeam(MonsterTeam.TeamMode.BACK, MonsterTeam.SelectionMode.PROVIDED, provided_monsters=p, recycle=True, pool=team_pool) for p in (provided, enemies)]
+            containers = recycled[0].back_team
+            monsters = list(recycled[0].spawned)
+
+            for seed in range(5):
+                results = []
+                for team1, team2 in (fresh, recycled):
+                    team1.regenerate_team()
+                    team2.regenerate_team()
+                    RandomGen.set_seed(seed)
+                    results.append(Battle(verbosity=0).battle(team1, team2))
+                self.assertEqual(results[0], results[1])
+
+            # the monsters fought, regenerating puts everything back in place
+            self.assertTrue(any(m.get_hp() < m.get_max_hp() or m.get_level() > 1 for m in monsters))
+            monsters[0].level_up()
+            self.assertIs(monsters[0].evolve_in_place(), monsters[0])
+            recycled[0].regenerate_team()
+            self.assertIs(recycled[0].back_team, containers)
+            for i in range(len(monsters)):
+                monster = recycled[0].back_team.serve()
+                self.assertIs(monster, monsters[i])
+                self.assertEqual(monster.snapshot(), (provided[i], True, 1, monster.get_max_hp(), False))
+
+    @number("3.10")
+    @visibility(visibility.VISIBILITY_SHOW)
+    @timeout()
+    def test_optimise_rekeying(self):
+        RandomGen.set_seed(99)
+        provided = ArrayR.from_list([Flamikin, Aquariuma, Vineon, Thundrake, Rockodile, Mystifly])
+        for sort_key in (MonsterTeam.SortMode.HP, MonsterTeam.SortMode.LEVEL):
+            for team_pool in (None, MonsterPool()):
+                team = MonsterTeam(MonsterTeam.TeamMode.OPTIMISE, MonsterTeam.SelectionMode.PROVIDED,
+                                   provided_monsters=provided, sort_key=sort_key, pool=team_pool)
+                for step in range(200):
+                    if step == 100:
+                        team.special()
+                    monster = team.optimised_team[RandomGen.randint(0, len(team) - 1)].value
+                    if RandomGen.randint(0, 1):
+                        monster.set_hp(RandomGen.randint(1, 20))
+                    else:
+                        monster.level_up()
+                    # the keys always match the monsters and stay sorted
+                    for i in range(len(team)):
+                        item = team.optimised_team[i]
+                        self.assertEqual(item.key, team._item_key(item.value))
+                        if i > 0:
+                            self.assertLessEqual(team.optimised_team[i - 1].key, item.key)
+
+                # monsters that left the team no longer move its items
+                out = team.retrieve_from_team()
+                self.assertIsNone(out.observer)
+                out.set_hp(1000)
+                self.assertEqual(len(team), len(provided) - 1)
+                self.assertNotIn(out, team.optimised_items)
+
+    @number("3.11")
+    @visibility(visibility.VISIBILITY_SHOW)
+    @timeout()
+    def test_team_aggregates(self):
+        def members(team):
+            if team.team_mode == MonsterTeam.TeamMode.FRONT:
+                return [team.front_team.array[i] for i in range(len(team))]
+            if team.team_mode == MonsterTeam.TeamMode.BACK:
+                queue = team.back_team
+                return [queue.array[(queue.front + i) % len(queue.array)] for i in range(len(team))]
+            return [team.optimised_team[i].value for i in range(len(team))]
+
+        def check(team):
+            monsters = members(team)
+            self.assertEqual(team.total_hp, sum(m.get_hp() for m in monsters))
+            self.assertEqual(team.alive_count, sum(1 for m in monsters if m.alive()))
+            self.assertEqual(team.max_speed, max((m.get_speed() for m in monsters), default=None))
+            mask = 0
+            for m in monsters:
+                for element in m.get_elements():
+                    mask |= 1 << (Element.from_string(element).value - 1)
+            self.assertEqual(team.element_mask, mask)
+
+        RandomGen.set_seed(31337)
+        for _ in range(30):
+            teams = []
+            for _ in range(2):
+                mode = list(MonsterTeam.TeamMode)[RandomGen.randint(0, 2)]
+                teams.append(MonsterTeam(mode, MonsterTeam.SelectionMode.RANDOM, sort_key=MonsterTeam.SortMode.SPEED))
+            battle = Battle(verbosity=0)
+            battle.start(*teams)
+            result = None
+            while result is None:
+                # benched monsters change too
+                for team in teams:
+                    check(team)
+                    if len(team) > 0:
+                        monster = members(team)[RandomGen.randint(0, len(team) - 1)]
+                        change = RandomGen.randint(0, 2)
+                        if change == 0:
+                            monster.set_hp(monster.get_hp() - RandomGen.randint(0, 3))
+                        elif change == 1:
+                            monster.level_up()
+                        else:
+                            monster.level_up()
+                            self.assertIs(monster.evolve_in_place(), monster)
+                        check(team)
+                result = battle.process_turn()
+            for team in teams:
+                check(team)
+                team.regenerate_team()
+                check(team)
+
+    @number("3.12")
+    @visibility(visibility.VISIBILITY_SHOW)
+    @timeout()
+    def test_large_teams(self):
+        spawnable = [Flamikin, Aquariuma, Vineon, Thundrake, Rockodile, Mystifly, Strikeon, Faeboa, Soundcobra]
+        n = 2000
+        provided = ArrayR(n)
+        for i in range(n):
+            provided[i] = spawnable[(i * 7) % len(spawnable)]
+
+        for mode in MonsterTeam.TeamMode:
+            team = MonsterTeam(mode, MonsterTeam.SelectionMode.PROVIDED, provided_monsters=provided,
+                               sort_key=MonsterTeam.SortMode.SPEED, team_limit=n)
+            self.assertEqual(len(team), n)
+            self.assertEqual(team.total_hp, sum(provided[i]().get_max_hp() for i in range(n)))
+            team.special()
+            team.regenerate_team()
+            speeds = []
+            while len(team) > 0:
+                speeds.append(team.retrieve_from_team().get_speed())
+            self.assertEqual(team.total_hp, 0)
+            self.assertIsNone(team.max_speed)
+            if mode == MonsterTeam.TeamMode.OPTIMISE:
+                self.assertEqual(speeds, sorted(speeds, reverse=True))
+            elif mode == MonsterTeam.TeamMode.BACK:
+                self.assertEqual(speeds, [provided[i].get_simple_stats().get_speed() for i in range(n)])
+
+        # the limit still applies
+        self.assertRaises(ValueError, lambda: MonsterTeam(
+            MonsterTeam.TeamMode.BACK, MonsterTeam.SelectionMode.PROVIDED, provided_monsters=provided, team_limit=n - 1,
+        ))
+        RandomGen.set_seed(7)
+        team = MonsterTeam(MonsterTeam.TeamMode.FRONT, MonsterTeam.SelectionMode.RANDOM, team_limit=500)
+        self.assertLessEqual(len(team), 500)
+        self.assertEqual(len(team.provided_monsters), 500)
+
+    @number("3.13")
+    @visibility(visibility.VISIBILITY_SHOW)
+    @timeout()
+    def test_encoding(self):
+        def make(mode, monsters, sort_key=None):
+            provided = ArrayR(len(monsters))
+            for i, monster in enumerate(monsters):
+                provided[i] = monster
+            return MonsterTeam(mode, MonsterTeam.SelectionMode.PROVIDED, provided_monsters=provided, sort_key=sort_key,
+                               team_limit=max(MonsterTeam.TEAM_LIMIT, len(monsters)))
+
+        team = make(MonsterTeam.TeamMode.OPTIMISE, [Flamikin, Vineon, Strikeon], MonsterTeam.SortMode.SPEED)
+        same = make(MonsterTeam.TeamMode.OPTIMISE, [Flamikin, Vineon, Strikeon], MonsterTeam.SortMode.SPEED)
+        # the state of the monsters does not matter
+        same.retrieve_from_team()
+        self.assertEqual(team, same)
+        self.assertEqual(hash(team), hash(same))
+        self.assertEqual(len({team: 1, same: 2}), 1)
+
+        self.assertNotEqual(team, make(MonsterTeam.TeamMode.OPTIMISE, [Flamikin, Vineon, Strikeon], MonsterTeam.SortMode.HP))
+        self.assertNotEqual(team, make(MonsterTeam.TeamMode.OPTIMISE, [Vineon, Flamikin, Strikeon], MonsterTeam.SortMode.SPEED))
+        self.assertNotEqual(team, make(MonsterTeam.TeamMode.BACK, [Flamikin, Vineon, Strikeon]))
+        self.assertNotEqual(
+            make(MonsterTeam.TeamMode.BACK, [Flamikin, Vineon]), make(MonsterTeam.TeamMode.BACK, [Flamikin, Vineon, Strikeon])
+        )
+
+        # round trip, including random teams (provided_monsters has empty slots) and large teams
+        RandomGen.set_seed(11)
+        teams = [team, make(MonsterTeam.TeamMode.FRONT, [Aquariuma] * 300)] + list(MonsterTeam.random_teams(20))
+        for original in teams:
+            decoded = MonsterTeam.from_encoding(original.encoding())
+            self.assertEqual(decoded, original)
+            self.assertEqual(decoded.encoding(), original.encoding())
+            self.assertEqual(len(decoded), len(original))
+            self.assertEqual(decoded.team_mode, original.team_mode)
+            self.assertEqual(decoded.sort_key, original.sort_key)
+        self.assertRaises(ValueError, lambda: MonsterTeam.from_encoding(team.encoding()[:-1]))
+
+        # monsters outside the catalog: no encoding, only equal to itself
+        class Custom(Flamikin):
+            pass
+        custom = make(MonsterTeam.TeamMode.BACK, [Custom])
+        twin = make(MonsterTeam.TeamMode.BACK, [Custom])
+        self.assertIsNone(custom.encoding())
+        self.assertEqual(custom, custom)
+        self.assertNotEqual(custom, twin)
+        self.assertEqual(len({custom, twin}), 2)
+
+    @number("3.14")
+    @visibility(visibility.VISIBILITY_SHOW)
+    @timeout()
+    def test_optimise_tie_order(self):
+        # monsters with equal keys come out in the order of the original ArraySortedList.add()
+        expected = [
+            (MonsterTeam.SortMode.HP, "Frostbite Aquariuma", "Strikeon Flamikin Vineon Gustwing"),
+            (MonsterTeam.SortMode.ATTACK, "Gustwing Strikeon", "Aquariuma Flamikin Frostbite Vineon"),
+            (MonsterTeam.SortMode.DEFENSE, "Strikeon Frostbite", "Gustwing Flamikin Aquariuma Vineon"),
+            (MonsterTeam.SortMode.SPEED, "Gustwing Strikeon", "Frostbite Flamikin Aquariuma Vineon"),
+            (MonsterTeam.SortMode.LEVEL, "Vineon Gustwing", "Aquariuma Flamikin Strikeon Frostbite"),
+        ]
+        for sort_key, before, after in expected:
+            team = MonsterTeam(
+                team_mode=MonsterTeam.TeamMode.OPTIMISE,
+                selection_mode=MonsterTeam.SelectionMode.PROVIDED,
+                provided_monsters=ArrayR.from_list([Flamikin, Aquariuma, Vineon, Strikeon, Gustwing, Frostbite]),
+                sort_key=sort_key,
+            )
+            self.assertEqual(" ".join(team.retrieve_from_team().get_name() for _ in range(2)), before)
+            team.special()
+            self.assertEqual(" ".join(team.retrieve_from_team().get_name() for _ in range(4)), after)
+
+        # results of the original implementation, in every mode and sort key
+        baseline = (
+            "2111121111122222122212212212112312221112221212111211212121112212211211111121211122212121121211111221"
+            "1221212122121122112222122121122111112111122211211222122211111322122321122221222121221222122121222212"
+            "1212111211121222111212111112212121112121222111222222112222212121112221122212121221112121211212112112"
+        )
+        RandomGen.set_seed(2024)
+        modes = list(MonsterTeam.TeamMode)
+        sort_keys = list(MonsterTeam.SortMode)
+        results = []
+        for i in range(len(baseline)):
+            team1 = MonsterTeam(modes[i % 3], MonsterTeam.SelectionMode.RANDOM, sort_key=sort_keys[i % 5])
+            team2 = MonsterTeam(modes[(i // 3) % 3], MonsterTeam.SelectionMode.RANDOM, sort_key=sort_keys[(i // 5) % 5])
+            results.append(str(Battle(verbosity=0).battle(team1, team2).value))
+        self.assertEqual("".join(results), baseline)
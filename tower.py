@@ -59,9 +59,11 @@ class BattleTower:
         self.enemy_teams_lives = CircularQueue(n)
 
         for i in range(n):
+            # recycled teams are reset in place by regenerate_team() before every battle
             self.enemy_teams.append(MonsterTeam(
                 team_mode=MonsterTeam.TeamMode.BACK,
-                selection_mode=MonsterTeam.SelectionMode.RANDOM
+                selection_mode=MonsterTeam.SelectionMode.RANDOM,
+                recycle=True,
             ))
             self.enemy_teams_lives.append(RandomGen.randint(BattleTower.MIN_LIVES, BattleTower.MAX_LIVES))
 